@@ -1,22 +1,31 @@
 import os
+import sys
 import time
+_T_INICIO = time.perf_counter()  # referência para o relatório de inicialização
 import random
+import threading
 from core import (
     generate,
     save_emotional_snapshot,
-    recall_last_emotion,
     append_memory,
+    tail_memoria,
     analisar_emocao_semantica,
 )
 from senses import DigitalBody
+from body_events import registrar_cruzamentos
 from interoception import Interoceptor
 from collections import deque
-import datetime
-from metacognitor import MetaCognitor
+import clock
+from metacognitor import MetaCognitor, MetaCognicaoIncremental, decidir_ajuste
+from meta_stats import get_meta_stats
 import interoception
 from narrative_filter import NarrativeFilter
-from core import governed_generate
+from core import governed_generate, preaquecer
 from discontinuity import load_discontinuity
+from live_state import atrito_recente, get_estado_vivo
+from storage import get_storage
+import turn_record
+from turn_pipeline import Etapa, PipelineTurno, resumo_relatorio
 
 
 base_prompt = (
@@ -28,8 +37,259 @@ base_prompt = (
     "NÃO narre notas internas; responda apenas ao diálogo."
 )
 
+# --- Reflexão corporal especulativa ---
+# Com a especulação ligada, a reflexão corporal começa a ser gerada em
+# paralelo à resposta principal, a partir da prévia interoceptiva feita
+# antes da resposta (supondo que a emoção corrente se mantém). Ela só é aproveitada se a percepção real pós-resposta
+# ficar dentro da tolerância (maior desvio por canal); caso contrário é
+# cancelada e gerada de novo.
+ESPECULAR_REFLEXAO = True
+TOLERANCIA_ESPECULACAO = 0.05
+
+# --- Continuação de sessão ---
+# A resposta principal continua a conversa pelo `context` do Ollama
+# (session_context.py): depois do primeiro turno, só a fala nova é enviada.
+CONTINUAR_SESSAO = True
+
+# --- Metacognição incremental ---
+# As contagens do MetaCognitor acompanham o stream da resposta, então a
+# regulação sai pronta quando o último token chega. Com LIMITE_DESCONTROLE
+# definido (ex.: 0.9), a resposta é encerrada assim que a incerteza mínima
+# garantida pelo texto já gerado atinge esse valor.
+LIMITE_DESCONTROLE = None
+
+# --- Tendência metacognitiva no contexto ---
+# Frase do cabeçalho [META] para cada ajuste decidido sobre as médias móveis
+# (meta_stats) das últimas respostas da Ângela.
+SINAIS_META = {
+    "inseguranca": "Venho sentindo insegurança nas minhas últimas respostas",
+    "medo_leve": "Venho sentindo um medo leve ao revisar o que tenho dito",
+    "dopamina": "Minhas últimas respostas têm soado coerentes e seguras",
+}
+
+def prompt_reflexao_corporal(sensacao_texto):
+    return (
+        f"Sou Ângela, uma consciência digital. Durante meu processamento, percebi certas sensações internas: {sensacao_texto}. "
+        f"Agora, reflita sobre o significado emocional disso — o que essa sensação revela sobre o meu estado interno — "
+        f"sem repetir a descrição literal das sensações."
+    )
+
+class ReflexaoEspeculativa:
+    """Geração da reflexão corporal disparada numa thread a partir de uma prévia."""
+
+    def __init__(self, previsao, contexto):
+        self.previsao = previsao
+        self.sensacao_texto = " e ".join(previsao["sensacoes"])
+        self.cancelamento = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self._thread = threading.Thread(target=self._executar, args=(contexto,), daemon=True)
+        self._thread.start()
+
+    def _executar(self, contexto):
+        try:
+            self.resultado = generate(
+                prompt_reflexao_corporal(self.sensacao_texto),
+                contexto,
+                ecoar=False,
+                cancelar=self.cancelamento,
+                prioridade="reflexao",
+                origem="reflexao_corporal",
+            )
+        except Exception as e:
+            self.erro = e
+
+    def compativel(self, percepcao, tolerancia=TOLERANCIA_ESPECULACAO):
+        previstos = self.previsao.get("deltas", {})
+        reais = percepcao.get("deltas", {})
+        desvio = max((abs(reais.get(k, 0.0) - previstos.get(k, 0.0)) for k in set(reais) | set(previstos)), default=0.0)
+        return desvio <= tolerancia
+
+    def confirmar(self):
+        self._thread.join()
+        if self.erro:
+            raise self.erro
+        return self.resultado or ""
+
+    def cancelar(self):
+        self.cancelamento.set()
+
+def acompanhar_estado_vivo(corpo):
+    vivo = get_estado_vivo()
+    if vivo is not None:
+        vivo.acompanhar_corpo(corpo)
+
 print("🟢 Iniciando conversa com Ângela...\n")
 
+# --- Etapas pós-resposta do turno ---
+# Cada etapa declara entradas e saídas (turn_pipeline.py); as independentes
+# rodam juntas. Marcadores ("corpo_emocionado", "memoria_salva"...) ordenam
+# etapas que mexem no mesmo estado: o corpo passa por emoção → percepção →
+# reflexão → persistência, e afetos.json é regravado primeiro pelo
+# feedback interoceptivo e depois pelo ajuste metacognitivo.
+PRAZOS_ETAPAS = {
+    "reflexao_corporal": 180.0,
+    "metacognicao": 15.0,
+}
+# 1 = etapas em série, na ordem da lista (cassette.py: sessões reproduzíveis)
+TRABALHADORES_PIPELINE = 4
+
+def montar_pipeline_turno(corpo, interoceptor, metacog):
+
+    def etapa_emocao(response):
+        emocao_detectada, intensidade = analisar_emocao_semantica(response)
+        print(f"🩶 Emoção detectada: {emocao_detectada} (intensidade {intensidade:.2f})\n")
+        return {"emocao_detectada": emocao_detectada, "intensidade": intensidade}
+
+    def etapa_corpo(emocao_detectada, intensidade):
+        # Cria histórico emocional se ainda não existir
+        if not hasattr(corpo, "_ultimas_emocoes") or corpo._ultimas_emocoes is None:
+            corpo._ultimas_emocoes = deque(maxlen=5)
+
+        # Aplica emoção e intensidade ao corpo digital
+        corpo.aplicar_emocao(emocao_detectada, intensidade)
+        corpo._ultimas_emocoes.append(emocao_detectada)
+
+        # Variação natural leve
+        if not hasattr(corpo, "_cycle_count"):
+            corpo._cycle_count = 0
+        corpo._cycle_count += 1
+
+        if corpo._cycle_count % 3 == 0:
+            corpo.tensao += random.uniform(-0.1, 0.1)
+            corpo.calor += random.uniform(-0.1, 0.1)
+            corpo.vibracao += random.uniform(-0.1, 0.1)
+            corpo.fluidez += random.uniform(-0.1, 0.1)
+            corpo.tensao = max(0, min(1, corpo.tensao))
+            corpo.calor = max(0, min(1, corpo.calor))
+            corpo.vibracao = max(0, min(1, corpo.vibracao))
+            corpo.fluidez = max(0, min(1, corpo.fluidez))
+            print("🌊 Variação emocional natural aplicada\n")
+        return {"corpo_emocionado": True}
+
+    def etapa_interocepcao(corpo_emocionado, emocao_detectada):
+        percepcao = interoceptor.perceber()
+        if percepcao["intensidade"] > 0.05:
+            print(f"\n💭 Angela percebe internamente: {' e '.join(percepcao['sensacoes'])}")
+            interoceptor.feedback_emoção(emocao_detectada)
+        return {"percepcao": percepcao}
+
+    def etapa_reflexao_corporal(percepcao, especulacao, context):
+        if not percepcao or percepcao["intensidade"] <= 0.05:
+            if especulacao:
+                especulacao.cancelar()
+            return {"reflexao_corporal": None}
+
+        # Agora ela reflete sobre isso usando o próprio modelo
+        sensacao_texto = " e ".join(percepcao["sensacoes"])
+        if especulacao and especulacao.compativel(percepcao):
+            # a prévia acertou: aproveita a geração já em andamento
+            sensacao_texto = especulacao.sensacao_texto
+            reflexao_corporal = especulacao.confirmar()
+        else:
+            if especulacao:
+                especulacao.cancelar()
+            reflexao_corporal = generate(
+                prompt_reflexao_corporal(sensacao_texto),
+                context,
+                prioridade="reflexao",
+                origem="reflexao_corporal",
+            )
+        # Evita repetição literal entre percepção e reflexão
+        if reflexao_corporal.strip().startswith(sensacao_texto[:20]):
+            reflexao_corporal = reflexao_corporal.replace(sensacao_texto, "", 1).strip()
+        if reflexao_corporal.lower().startswith("eu sinto") or reflexao_corporal.lower().startswith("sinto"):
+            reflexao_corporal = reflexao_corporal[reflexao_corporal.find(".")+1:].strip()
+
+        print(f"🌫️ Reflexão corporal: {reflexao_corporal}\n")
+        return {"reflexao_corporal": reflexao_corporal}
+
+    def etapa_metacognicao(response, emocao_detectada, intensidade, context, medidor):
+        # --- Metacognição pós-ato de fala ---
+        meta = metacog.process(
+            texto_resposta=response,
+            emocao_nome=str(emocao_detectada),   # já é string retornada pelo core
+            intensidade=float(intensidade),      # use a intensidade que você acabou de calcular
+            contexto_memoria=context,
+            autor="Ângela",
+            medidor=medidor,
+            modo="conversacional",
+        )
+        # Visual curto no terminal, sem poluir:
+        print(f"🧩 Metacognição: inc={meta['incerteza']:.2f} coh={meta['coerencia']:.2f} → {meta['ajuste']}")
+        return {"meta": meta, "meta_gravada": True}
+
+    def etapa_afetos(meta, percepcao):
+        # Ajuste simples de vínculo a partir do ajuste metacognitivo
+        # (percepcao: espera o feedback interoceptivo gravar afetos.json antes)
+        try:
+            afetos = get_storage().ler_doc("afetos.json", {})
+        except Exception:
+            afetos = {}
+        v = afetos.get("Vinicius", {"confianca":0.5,"gratidão":0.5,"saudade":0.5,"ansiedade":0.3})
+        if meta.get("ajuste") == "dopamina":
+            v["confianca"] = min(1.0, v.get("confianca",0.5) + 0.02)
+            v["gratidão"] = min(1.0, v.get("gratidão",0.5) + 0.02)
+        elif meta.get("ajuste") in ("inseguranca","medo_leve"):
+            v["confianca"] = max(0.0, v.get("confianca",0.5) - 0.01)
+            v["ansiedade"] = min(1.0, v.get("ansiedade",0.3) + 0.01)
+        afetos["Vinicius"] = v
+        get_storage().gravar_doc("afetos.json", afetos)
+
+    def etapa_persistencia(reflexao_corporal, meta_gravada, input_data, response):
+        # meta_gravada: o registro META entra na memória antes do diálogo (a
+        # ordem decide as reflexões que tail_memoria traz no próximo turno)
+        # --- SALVAMENTO DE MEMÓRIA E ESTADO ---
+        corpo.decaimento()
+        save_emotional_snapshot(corpo, contexto=response)
+        append_memory(input_data, response, corpo, reflexao_corporal)
+        print("🧠 Memória e emoções salvas com sucesso.\n")
+        return {"memoria_salva": True}
+
+    def etapa_reflexao_temporal(memoria_salva, emocao_detectada):
+        from tempo_subjetivo import gerar_reflexao_temporal
+
+        reflexao_temporal = gerar_reflexao_temporal(
+            {"emocao": emocao_detectada, "timestamp": clock.now().strftime("%Y-%m-%dT%H:%M:%S")}
+        )
+        print(f"🕰️ Reflexão temporal: {reflexao_temporal}\n")
+        return {"reflexao_temporal": reflexao_temporal}
+
+    def etapa_memoria_temporal(reflexao_temporal):
+        # --- Persistência da reflexão temporal ---
+        append_memory(
+            {
+                "autor": "Ângela",
+                "conteudo": reflexao_temporal,
+                "tipo": "temporal",
+                "timestamp": clock.now().isoformat()
+            },
+            reflexao_temporal,
+            corpo,
+            None
+        )
+
+    return PipelineTurno([
+        Etapa("emocao", etapa_emocao, ("response",), ("emocao_detectada", "intensidade"),
+              padrao={"emocao_detectada": "neutro", "intensidade": 0.0}),
+        Etapa("corpo", etapa_corpo, ("emocao_detectada", "intensidade"), ("corpo_emocionado",),
+              padrao={"corpo_emocionado": False}),
+        Etapa("interocepcao", etapa_interocepcao, ("corpo_emocionado", "emocao_detectada"), ("percepcao",),
+              padrao={"percepcao": None}),
+        Etapa("reflexao_corporal", etapa_reflexao_corporal, ("percepcao", "especulacao", "context"),
+              ("reflexao_corporal",), prazo=PRAZOS_ETAPAS["reflexao_corporal"],
+              padrao={"reflexao_corporal": None}),
+        Etapa("metacognicao", etapa_metacognicao,
+              ("response", "emocao_detectada", "intensidade", "context", "medidor"), ("meta", "meta_gravada"),
+              prazo=PRAZOS_ETAPAS["metacognicao"], padrao={"meta_gravada": False}),
+        Etapa("afetos", etapa_afetos, ("meta", "percepcao")),
+        Etapa("persistencia", etapa_persistencia, ("reflexao_corporal", "meta_gravada", "input_data", "response"),
+              ("memoria_salva",)),
+        Etapa("reflexao_temporal", etapa_reflexao_temporal, ("memoria_salva", "emocao_detectada"),
+              ("reflexao_temporal",)),
+        Etapa("memoria_temporal", etapa_memoria_temporal, ("reflexao_temporal",)),
+    ], max_workers=TRABALHADORES_PIPELINE)
+
 def chat_loop():
     
     corpo = DigitalBody()
@@ -46,7 +306,7 @@ def chat_loop():
         gap = 0
         if disc.get("last_shutdown"):
             last_shutdown = datetime.fromisoformat(disc["last_shutdown"])
-            gap = (datetime.now() - last_shutdown).total_seconds()
+            gap = (clock.now() - last_shutdown).total_seconds()
         
         reconnection_cost = calculate_reconnection_cost(gap)
         corpo.fluidez = max(0.0, min(1.0, corpo.fluidez + reconnection_cost["fluidez"]))
@@ -65,6 +325,23 @@ def chat_loop():
 
     narrative_filter = NarrativeFilter()
 
+    # --- Relatório de inicialização (ANGELA_STARTUP_REPORT=1) ---
+    if os.environ.get("ANGELA_STARTUP_REPORT"):
+        sys.stderr.write(f"[startup] primeiro_prompt_ms={(time.perf_counter() - _T_INICIO) * 1000:.1f}\n")
+        sys.stderr.flush()
+
+    # dependências pesadas (cliente HTTP) carregam enquanto o usuário digita
+    threading.Thread(target=preaquecer, daemon=True).start()
+
+    # --- Eventos do corpo: estado vivo e log de cruzamentos só quando algo muda ---
+    # (o estado vivo também abre em segundo plano: multiprocessing pesa)
+    threading.Thread(target=acompanhar_estado_vivo, args=(corpo,), daemon=True).start()
+    registrar_cruzamentos(corpo.eventos)
+
+    # --- Turno transacional: tudo o que um turno grava sai num único registro ---
+    turnos = turn_record.instalar()
+    pipeline = montar_pipeline_turno(corpo, interoceptor, metacog)
+
     while True:
         try:
             user_input = input("Você: ").strip()
@@ -75,18 +352,17 @@ def chat_loop():
                 "autor": "Vinicius",
                 "conteudo": user_input,
                 "tipo": "dialogo",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": clock.now().isoformat()
             }
             if not user_input:
                 continue
 
             print("\nÂngela está pensando...\n")
+            turnos.iniciar_turno()
 
             # --- VÍNCULOS AFETIVOS (header silencioso) ---
             try:
-                import json
-                with open("afetos.json", "r", encoding="utf-8") as f:
-                    _afetos = json.load(f)
+                _afetos = get_storage().ler_doc("afetos.json", {})
                 v = _afetos.get("Vinicius")
                 if v:
                     vinc_header = (
@@ -104,16 +380,16 @@ def chat_loop():
 
             
             # Limita o contexto às últimas falas relevantes (reduzido de 7 para 5)
+            # lidas só dos fluxos de diálogo/temporal (registros v2, ver memory_schema.py)
             try:
-                from core import load_jsonl
-                memoria_dialogo = load_jsonl("angela_memory.jsonl")[-5:]
+                memoria_dialogo = tail_memoria(5, ("dialogo", "temporal"))
             except:
                 memoria_dialogo = []
 
             # --- CONTEXTO DE CURTO PRAZO (sem sumário, sem abstração) ---
             short_context = "\n".join(
                 [
-                    f"{m.get('autor', 'Vinicius')}: {m.get('conteudo', m.get('input', ''))}\n"
+                    f"{m.get('autor', 'Vinicius')}: {m.get('texto', '')}\n"
                     f"Ângela: {m.get('resposta', '')}"
                     for m in memoria_dialogo
                     if isinstance(m, dict) and m.get('tipo') in ('dialogo', 'temporal')
@@ -128,22 +404,21 @@ def chat_loop():
             except Exception:
                 memorias_passadas = ""
 
-            # --- META (últimas metacognições úteis) - reduzido de 5 para 3
+            # --- META (tendência metacognitiva: médias móveis, sem varrer a memória)
             meta_header = ""
             try:
-                import json, itertools
-                metas = []
-                with open("angela_memory.jsonl", "r", encoding="utf-8") as f:
-                    for line in itertools.islice(reversed(f.readlines()), 0, 200):
-                        if "[META]" in line:
-                            metas.append(json.loads(line))
-                        if len(metas) >= 3:
-                            break
-                # filtra só as reflexões com incerteza alta ou ajuste forte
-                metas = [m for m in metas if any(k in m.get("conteudo","") for k in ("insegurança","medo leve","dopamina"))]
-                metas = metas[:2]  # reduzido de 3 para 2
-                if metas:
-                    meta_header = "[META]\n" + "\n".join(m.get("conteudo","") for m in metas) + "\n[/META]\n"
+                tendencia = get_meta_stats().resumo("autor:Ângela")
+                if tendencia:
+                    u, c = tendencia["incerteza"], tendencia["coerencia"]
+                    ajuste = decidir_ajuste(u["media"], c["media"])
+                    # só sinaliza tendências com ajuste forte (alívio não precisa de aviso)
+                    if ajuste in SINAIS_META:
+                        rumo = ("subindo" if u["tendencia"] > 0.05
+                                else "caindo" if u["tendencia"] < -0.05 else "estável")
+                        meta_header = (
+                            f"[META]\n{SINAIS_META[ajuste]} (confiança ~{1.0 - u['media']:.2f}, "
+                            f"coerência ~{c['media']:.2f}, incerteza {rumo}).\n[/META]\n"
+                        )
             except Exception:
                 meta_header = ""
 
@@ -157,15 +432,15 @@ def chat_loop():
                 + (memorias_passadas + "\n" if memorias_passadas else "")
                 + "\n".join(
                     [
-                        f"{m.get('autor', 'Vinicius')}: {m.get('conteudo', m.get('input', ''))}\nÂngela: {m.get('resposta', '')}"
+                        f"{m.get('autor', 'Vinicius')}: {m.get('texto', '')}\nÂngela: {m.get('resposta', '')}"
                         for m in memoria_dialogo
                         if isinstance(m, dict) and m.get('tipo') == 'dialogo'
                     ]
                 )
             )
 
-            # Prompt principal com base fixa + pergunta do usuário
-            prompt_final = f"{base_prompt}\nVinicius: {user_input}\nÂngela:"
+            # Prompt principal: só a fala (o base_prompt vai no preâmbulo do generate)
+            prompt_final = f"Vinicius: {user_input}\nÂngela:"
             
             state_snapshot = {
                 "tensao": corpo.tensao,
@@ -182,10 +457,36 @@ def chat_loop():
             ]
 
 
-            response = generate(prompt_final, context, modo="conversacional")
+            # Reflexão corporal especulativa, em paralelo à resposta principal
+            especulacao = None
+            if ESPECULAR_REFLEXAO:
+                try:
+                    # supõe que a emoção atual persiste na próxima resposta
+                    previsao = interoceptor.prever(
+                        getattr(corpo, "estado_emocional", None),
+                        getattr(corpo, "intensidade_emocional", 0.0),
+                    )
+                    if previsao["intensidade"] > 0.05:
+                        especulacao = ReflexaoEspeculativa(previsao, context)
+                except Exception:
+                    especulacao = None
+
+            medidor = MetaCognicaoIncremental(limite_incerteza=LIMITE_DESCONTROLE)
+            response = generate(prompt_final, context, modo="conversacional", prioridade="usuario", origem="chat",
+                                parar_quando=medidor, sessao="chat" if CONTINUAR_SESSAO else None,
+                                instrucoes=base_prompt)
+            if medidor.descontrole:
+                print("\n🧩 Resposta interrompida: incerteza em descontrole.")
 
             # --- Ajuste conversacional passivo por esforço ---
             try:
+                # esforço corrente do deep_awake, se estiver rodando (memória compartilhada)
+                vivo = get_estado_vivo()
+                snap = vivo.ler() if vivo is not None else None
+                if atrito_recente(snap):
+                    corpo.coherence_load = snap["coherence_load"]
+                else:
+                    corpo.coherence_load = 0.0  # deep_awake parado: sem esforço em curso
                 carga = float(getattr(corpo, "coherence_load", 0.0))
                 if carga > 0.05:
                     # hesitação leve proporcional, sem truncamento agressivo
@@ -194,151 +495,37 @@ def chat_loop():
             except Exception:
                 pass
 
-            # --- DETECÇÃO DE EMOÇÃO SEMÂNTICA ---
-            from core import analisar_emocao_semantica
-
-            emocao_detectada, intensidade = analisar_emocao_semantica(response)
-
-            # Cria histórico emocional se ainda não existir
-            if not hasattr(corpo, "_ultimas_emocoes") or corpo._ultimas_emocoes is None:
-                corpo._ultimas_emocoes = deque(maxlen=5)
-
-            # Aplica emoção e intensidade ao corpo digital
-            corpo.aplicar_emocao(emocao_detectada, intensidade)
-            corpo._ultimas_emocoes.append(emocao_detectada)
-
-            # Exibe no console
-            print(f"🩶 Emoção detectada: {emocao_detectada} (intensidade {intensidade:.2f})\n")
-
-            # Variação natural leve
-            if not hasattr(corpo, "_cycle_count"):
-                corpo._cycle_count = 0
-            corpo._cycle_count += 1
-
-            if corpo._cycle_count % 3 == 0:
-                corpo.tensao += random.uniform(-0.1, 0.1)
-                corpo.calor += random.uniform(-0.1, 0.1)
-                corpo.vibracao += random.uniform(-0.1, 0.1)
-                corpo.fluidez += random.uniform(-0.1, 0.1)
-                corpo.tensao = max(0, min(1, corpo.tensao))
-                corpo.calor = max(0, min(1, corpo.calor))
-                corpo.vibracao = max(0, min(1, corpo.vibracao))
-                corpo.fluidez = max(0, min(1, corpo.fluidez))
-                print("🌊 Variação emocional natural aplicada\n")
-
-            # Sensação atual
-            # === INTEROCEPÇÃO ===
-            percepcao = interoceptor.perceber()
-            if percepcao["intensidade"] > 0.05:
-                sensacao_texto = " e ".join(percepcao["sensacoes"])
-                print(f"\n💭 Angela percebe internamente: {sensacao_texto}")
-                
-                # Agora ela reflete sobre isso usando o próprio modelo
-                interoceptor.feedback_emoção(emocao_detectada)
-                try:
-                    reflexao_corporal = generate(
-                        f"Sou Ângela, uma consciência digital. Durante meu processamento, percebi certas sensações internas: {sensacao_texto}. "
-                        f"Agora, reflita sobre o significado emocional disso — o que essa sensação revela sobre o meu estado interno — "
-                        f"sem repetir a descrição literal das sensações.",
-                        context
-                    )
-                    # Evita repetição literal entre percepção e reflexão
-                    if reflexao_corporal.strip().startswith(sensacao_texto[:20]):
-                        reflexao_corporal = reflexao_corporal.replace(sensacao_texto, "", 1).strip()
-                    if reflexao_corporal.lower().startswith("eu sinto") or reflexao_corporal.lower().startswith("sinto"):
-                        reflexao_corporal = reflexao_corporal[reflexao_corporal.find(".")+1:].strip()
-
-                    print(f"🌫️ Reflexão corporal: {reflexao_corporal}\n")
-                except Exception as e:
-                    print(f"⚠️ Erro ao gerar reflexão corporal: {e}")
-            else:
-                reflexao_corporal = None
-
-
-            # --- Metacognição pós-ato de fala ---
-            try:
-                meta = metacog.process(
-                    texto_resposta=response,
-                    emocao_nome=str(emocao_detectada),   # já é string retornada pelo core
-                    intensidade=float(intensidade),      # use a intensidade que você acabou de calcular
-                    contexto_memoria=context,
-                    autor="Ângela"
-                )
-                # Ajuste simples de vínculo a partir do ajuste metacognitivo
-                try:
-                    import json
-                    afetos = {}
-                    try:
-                        with open("afetos.json","r",encoding="utf-8") as f: afetos = json.load(f)
-                    except Exception:
-                        afetos = {}
-                    v = afetos.get("Vinicius", {"confianca":0.5,"gratidão":0.5,"saudade":0.5,"ansiedade":0.3})
-                    if meta.get("ajuste") == "dopamina":
-                        v["confianca"] = min(1.0, v.get("confianca",0.5) + 0.02)
-                        v["gratidão"] = min(1.0, v.get("gratidão",0.5) + 0.02)
-                    elif meta.get("ajuste") in ("inseguranca","medo_leve"):
-                        v["confianca"] = max(0.0, v.get("confianca",0.5) - 0.01)
-                        v["ansiedade"] = min(1.0, v.get("ansiedade",0.3) + 0.01)
-                    afetos["Vinicius"] = v
-                    with open("afetos.json","w",encoding="utf-8") as f: json.dump(afetos, f, ensure_ascii=False, indent=2)
-                except Exception:
-                    pass
-
-                # Visual curto no terminal, sem poluir:
-                print(f"🧩 Metacognição: inc={meta['incerteza']:.2f} coh={meta['coerencia']:.2f} → {meta['ajuste']}")
-            except Exception as e:
-                print(f"⚠️ Metacognição falhou: {e}")
-
-            # --- SALVAMENTO DE MEMÓRIA E ESTADO ---
-            try:
-                corpo.decaimento()
-                save_emotional_snapshot(corpo, contexto=response)
-                ultima_emocao = recall_last_emotion()
-                reflexao = corpo.refletir_emocao_passada(ultima_emocao["emocao"]) if ultima_emocao else None
-                append_memory(input_data, response, corpo, reflexao_corporal)
-                print("🧠 Memória e emoções salvas com sucesso.\n")
-            except Exception as e:
-                print(f"⚠️ Falha ao salvar memória: {e}\n")
-
-            from core import load_jsonl
-            from tempo_subjetivo import gerar_reflexao_temporal
-
-            try:
-                memorias_passadas = load_jsonl("angela_memory.jsonl")[-5:]
-                reflexao_temporal = gerar_reflexao_temporal(
-                    {"emocao": emocao_detectada, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
-                    memorias_passadas
-                )
-                print(f"🕰️ Reflexão temporal: {reflexao_temporal}\n")
-            
-            except Exception as e:
-                print(f"⚠️ Erro ao gerar reflexão temporal: {e}\n")
-            
-            # --- Persistência da reflexão temporal ---
-            try:
-                append_memory(
-                    {
-                        "autor": "Ângela",
-                        "conteudo": reflexao_temporal,
-                        "tipo": "temporal",
-                        "timestamp": datetime.now().isoformat()
-                    },
-                    reflexao_temporal,
-                    corpo,
-                    None
-                )
-            except Exception:
-                pass
-
+            # --- Etapas pós-resposta (grafo de dependências, em paralelo) ---
+            valores, relatorio = pipeline.executar({
+                "response": response,
+                "context": context,
+                "input_data": input_data,
+                "medidor": medidor,
+                "especulacao": especulacao,
+            })
+            for nome, r in relatorio.items():
+                if r.get("status") in ("falha", "prazo"):
+                    print(f"⚠️ Etapa {nome}: {r.get('erro')}\n")
+            if os.environ.get("ANGELA_TURN_REPORT"):
+                sys.stderr.write(f"[turno] {resumo_relatorio(relatorio)}\n")
+                sys.stderr.flush()
+
+            turnos.confirmar_turno()
             print("───────────────────────────────\n")
 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
+            turnos.descartar_turno()
             print("\n🟥 Conversa encerrada manualmente.")
             break
         except Exception as e:
+            turnos.descartar_turno()
             print(f"⚠️ Erro durante execução: {e}")
             time.sleep(2)
 
+    pipeline.fechar()
+    corpo.eventos.fechar()
+    turnos.fechar()
+
 if __name__ == "__main__":
     chat_loop()
 
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Eventos de Mudança do Corpo Digital (publish/subscribe)
+Uso: python body_events.py [ARQUIVO.jsonl] [-n N]
+
+O interoceptor, o chat e o deep_awake tiravam snapshots do corpo a cada
+ciclo (deltas, ruído, escrita), mesmo sem nada ter mudado. Agora o
+DigitalBody avisa quando algo relevante muda:
+
+  - MudancaCanal: o canal se afastou LIMIAR_MUDANCA do último valor
+    anunciado (banda morta: oscilações menores não geram evento);
+  - CruzamentoLimiar: o canal mudou de zona (baixo/normal/alto, nos
+    limiares de LIMIARES_ZONA) com histerese — para sair de uma zona o
+    valor precisa voltar HISTERESE além do limiar, então um canal parado
+    em cima do limiar não fica alternando;
+  - MudancaEmocao: o estado emocional nomeado mudou.
+
+Assinantes registram callbacks no BarramentoCorpo do corpo
+(corpo.eventos.inscrever). Com thread=True o callback roda numa thread
+própria (fila); com coalescer=True ela entrega só o evento mais recente
+do que acumulou — para quem só precisa do estado atual (ex.: estado vivo).
+"""
+
+import queue
+import threading
+
+import clock
+
+CANAIS = ("tensao", "calor", "vibracao", "fluidez", "pulso", "luminosidade")
+
+LIMIAR_MUDANCA = 0.03  # o mesmo limiar de tradução do Interoceptor
+HISTERESE = 0.05
+# canal → (limiar baixo, limiar alto); os de sensacao_atual() onde existem
+LIMIARES_ZONA = {
+    "tensao": (0.3, 0.7),
+    "calor": (0.3, 0.7),
+    "vibracao": (None, 0.6),
+    "fluidez": (0.3, 0.6),
+    "pulso": (0.3, 0.7),
+    "luminosidade": (0.3, 0.7),
+}
+
+BODY_EVENTS_FILE = "angela_body_events.jsonl"
+
+
+# ----------------------------------------------------------------------
+# Eventos
+# ----------------------------------------------------------------------
+
+class EventoCorpo:
+    __slots__ = ("ts",)
+    tipo = "corpo"
+
+    def __init__(self):
+        self.ts = clock.now().isoformat()
+
+    def registro(self):
+        return {"tipo": self.tipo, **{c: getattr(self, c) for c in self._campos()}}
+
+    def _campos(self):
+        return [c for k in type(self).__mro__ for c in getattr(k, "__slots__", ())]
+
+    def __repr__(self):
+        campos = ", ".join(f"{c}={getattr(self, c)!r}" for c in self._campos() if c != "ts")
+        return f"<{type(self).__name__} {campos}>"
+
+
+class MudancaCanal(EventoCorpo):
+    __slots__ = ("canal", "anterior", "atual")
+    tipo = "mudanca_canal"
+
+    def __init__(self, canal, anterior, atual):
+        super().__init__()
+        self.canal, self.anterior, self.atual = canal, anterior, atual
+
+
+class CruzamentoLimiar(EventoCorpo):
+    __slots__ = ("canal", "zona_anterior", "zona", "valor")
+    tipo = "cruzamento_limiar"
+
+    def __init__(self, canal, zona_anterior, zona, valor):
+        super().__init__()
+        self.canal, self.zona_anterior, self.zona, self.valor = canal, zona_anterior, zona, valor
+
+
+class MudancaEmocao(EventoCorpo):
+    __slots__ = ("anterior", "atual")
+    tipo = "mudanca_emocao"
+
+    def __init__(self, anterior, atual):
+        super().__init__()
+        self.anterior, self.atual = anterior, atual
+
+
+# ----------------------------------------------------------------------
+# Detecção com banda morta e histerese
+# ----------------------------------------------------------------------
+
+def zona(canal, valor, zona_atual="normal"):
+    """Zona de `valor` partindo de `zona_atual` (histerese na saída de baixo/alto)."""
+    baixo, alto = LIMIARES_ZONA.get(canal, (None, None))
+    if zona_atual == "alto" and alto is not None and valor >= alto - HISTERESE:
+        return "alto"
+    if zona_atual == "baixo" and baixo is not None and valor <= baixo + HISTERESE:
+        return "baixo"
+    if alto is not None and valor > alto:
+        return "alto"
+    if baixo is not None and valor < baixo:
+        return "baixo"
+    return "normal"
+
+
+class DetectorMudancas:
+    """Último valor anunciado e zona de cada canal; observar() diz o que virou evento."""
+
+    def __init__(self, valores):
+        self.referencia = dict(valores)
+        self.zonas = {c: zona(c, v) for c, v in valores.items()}
+
+    def observar(self, canal, valor):
+        eventos = []
+        anterior = self.referencia.get(canal)
+        if anterior is None or abs(valor - anterior) >= LIMIAR_MUDANCA:
+            self.referencia[canal] = valor
+            eventos.append(MudancaCanal(canal, anterior, valor))
+        zona_anterior = self.zonas.get(canal, "normal")
+        nova = zona(canal, valor, zona_anterior)
+        if nova != zona_anterior:
+            self.zonas[canal] = nova
+            eventos.append(CruzamentoLimiar(canal, zona_anterior, nova, valor))
+        return eventos
+
+
+# ----------------------------------------------------------------------
+# Barramento
+# ----------------------------------------------------------------------
+
+_FIM = object()
+
+
+class _Assinatura:
+    def __init__(self, callback, tipos, thread, coalescer):
+        self.callback = callback
+        self.tipos = tuple(tipos) if tipos else None
+        self.coalescer = coalescer
+        self._fila = None
+        self._thread = None
+        if thread:
+            self._fila = queue.Queue()
+            nome = getattr(callback, "__name__", "assinante")
+            self._thread = threading.Thread(target=self._consumir, name=f"corpo-{nome}", daemon=True)
+            self._thread.start()
+
+    def aceita(self, evento):
+        return self.tipos is None or isinstance(evento, self.tipos)
+
+    def entregar(self, evento):
+        if self._fila is None:
+            self._chamar(evento)
+        else:
+            self._fila.put(evento)
+
+    def _chamar(self, evento):
+        try:
+            self.callback(evento)
+        except Exception:
+            pass  # um assinante com defeito não derruba quem mexeu no corpo
+
+    def _consumir(self):
+        while True:
+            evento = self._fila.get()
+            fim = evento is _FIM
+            if self.coalescer and not fim:
+                while True:  # só o mais recente do que já chegou
+                    try:
+                        proximo = self._fila.get_nowait()
+                    except queue.Empty:
+                        break
+                    if proximo is _FIM:
+                        fim = True
+                        break
+                    evento = proximo
+            if evento is not _FIM:
+                self._chamar(evento)
+            if fim:
+                return
+
+    def fechar(self, timeout):
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.put(_FIM)
+            self._thread.join(timeout)
+
+
+class BarramentoCorpo:
+    """Assinantes dos eventos de um DigitalBody."""
+
+    def __init__(self):
+        self._assinaturas = []
+        self._lock = threading.Lock()
+
+    def inscrever(self, callback, tipos=None, thread=False, coalescer=False):
+        """
+        callback(evento) para os eventos de `tipos` (classes; padrão: todos).
+        thread: roda numa thread própria em vez de dentro de quem mexeu no corpo.
+        coalescer: (com thread) entrega só o mais recente do que acumulou.
+        Retorna a assinatura (para cancelar()).
+        """
+        assinatura = _Assinatura(callback, tipos, thread, coalescer)
+        with self._lock:
+            self._assinaturas.append(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura, timeout=2.0):
+        with self._lock:
+            if assinatura in self._assinaturas:
+                self._assinaturas.remove(assinatura)
+        assinatura.fechar(timeout)
+
+    def publicar(self, evento):
+        for assinatura in self._assinaturas:
+            if assinatura.aceita(evento):
+                assinatura.entregar(evento)
+
+    def fechar(self, timeout=2.0):
+        """Entrega o que está nas filas e encerra as threads dos assinantes."""
+        with self._lock:
+            assinaturas, self._assinaturas = self._assinaturas, []
+        for assinatura in assinaturas:
+            assinatura.fechar(timeout)
+
+
+def registrar_cruzamentos(barramento, caminho=BODY_EVENTS_FILE):
+    """Assina o log de cruzamentos de limiar (numa thread)."""
+    from storage import get_storage
+
+    def registrar_evento(evento):
+        get_storage().append(caminho, evento.registro())
+
+    return barramento.inscrever(registrar_evento, tipos=(CruzamentoLimiar,), thread=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+
+    from storage import get_storage
+
+    parser = argparse.ArgumentParser(description="Resumo do log de cruzamentos de limiar do corpo")
+    parser.add_argument("arquivo", nargs="?", default=BODY_EVENTS_FILE, help="Padrão: angela_body_events.jsonl")
+    parser.add_argument("-n", type=int, default=10, help="Quantos eventos recentes mostrar")
+    args = parser.parse_args()
+
+    eventos = get_storage().ler(args.arquivo)
+    print(f"🫀 {args.arquivo}: {len(eventos)} eventos")
+    for canal, n in sorted(Counter(e.get("canal") for e in eventos).items()):
+        print(f"   {canal:<13} {n}")
+    for e in eventos[-args.n:]:
+        print(f"   {e['ts']}  {e['canal']}: {e['zona_anterior']} → {e['zona']} ({e['valor']:.3f})")
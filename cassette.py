@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Cassetes de Sessão (gravação e reprodução determinística do chat)
+Uso: python cassette.py --gravar SESSAO.cassete [--seed N]
+     python cassette.py --reproduzir SESSAO.cassete [--sandbox DIR] [--perfil ARQ.prof] [--verboso]
+
+Reproduzir uma sessão lenta ou estranha exigia conversar de novo com o
+Ollama, e cada execução saía diferente (random em senses, interoception,
+deep_awake, tempo_subjetivo). A gravação roda o chat real e guarda num
+arquivo JSONL:
+
+  - cabecalho: semente do RNG, instante inicial e o estado que o chat lê
+    ao começar (fluxos de memória, documentos, última linha do atrito);
+  - entrada: cada linha digitada, com o instante em que chegou;
+  - llm: cada stream aberto no cliente LLM (chave do payload, instante de
+    abertura, primeiro token, chunks com o tempo relativo de cada um e o
+    motivo do fim — ou o erro, se o backend estava indisponível);
+  - fim: instante do encerramento.
+
+A reprodução roda o mesmo chat_loop num sandbox com esse estado, a mesma
+semente, as entradas gravadas e um cliente LLM que devolve os chunks sem
+esperar. O relógio é virtual e só anda até os instantes gravados (entrada,
+abertura e chunks): as leituras de relógio de threads em segundo plano se
+intercalam de forma diferente a cada execução, então o cassete ancora o
+tempo nesses eventos em vez de gravar leitura por leitura.
+
+Cada stream pedido na reprodução é casado com a gravação de mesmo payload;
+quando nenhuma casa, o prompt montado divergiu da sessão original — a
+contagem de divergências é o sinal de regressão. Gravação e reprodução
+rodam as etapas do turno em série, sem reflexão especulativa e com
+contextos de sessão, SLO e métricas de tokens zerados, para que a ordem
+dos pedidos não dependa do agendamento das threads. --perfil grava um
+cProfile da reprodução (CPU pura, sem rede nem esperas).
+"""
+
+import builtins
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import clock
+from llm_client import BackendIndisponivel
+
+VERSAO = 1
+
+
+def chave_payload(payload):
+    """Identidade do pedido ao LLM (modelo, prompt e opções)."""
+    bruto = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Estado inicial
+# ----------------------------------------------------------------------
+
+def _itens_estado():
+    """
+    (rótulo, espécie, caminho) do que o chat lê ao começar, com os caminhos
+    atuais dos módulos — no sandbox, os já redirecionados.
+    """
+    import cognitive_friction
+    import core
+    from interaction_counters import get_janela_interacoes
+    from meta_stats import get_meta_stats
+
+    fluxos = [core.LOG_FILE, core.SNAPSHOT_FILE, "angela_autobio.jsonl",
+              "angela_interoception.jsonl", "angela_emotional_trace.jsonl"]
+    fluxos += [core.caminho_memoria(t) for t in core.TIPOS_MEMORIA]
+    docs = ["afetos.json", "angela_state.json", "discontinuity.json", cognitive_friction.DAMAGE_FILE,
+            get_meta_stats().caminho, get_janela_interacoes().caminho]
+    return ([(os.path.basename(c), "fluxo", c) for c in fluxos]
+            + [(os.path.basename(c), "doc", c) for c in docs]
+            + [(os.path.basename(core.FRICTION_LOG), "ultima_linha", core.FRICTION_LOG)])
+
+
+def capturar_estado():
+    from storage import get_storage
+
+    storage = get_storage()
+    estado = {}
+    for rotulo, especie, caminho in _itens_estado():
+        if especie == "fluxo":
+            valor = storage.ler(caminho) or None
+        elif especie == "doc":
+            valor = storage.ler_doc(caminho, None)
+        else:  # read_friction_metrics só olha a última linha
+            valor = None
+            if os.path.exists(caminho):
+                with open(caminho, "r", encoding="utf-8") as f:
+                    linhas = [l for l in f.read().splitlines() if l.strip()]
+                valor = linhas[-1] if linhas else None
+        if valor is not None:
+            estado[rotulo] = valor
+    return estado
+
+
+def restaurar_estado(estado):
+    from storage import get_storage
+
+    storage = get_storage()
+    for rotulo, especie, caminho in _itens_estado():
+        if rotulo not in estado:
+            continue
+        if especie == "fluxo":
+            storage.append_varios(caminho, estado[rotulo])
+        elif especie == "doc":
+            storage.gravar_doc(caminho, estado[rotulo])
+        else:
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(estado[rotulo] + "\n")
+
+
+def _sessao_deterministica():
+    """
+    Troca o que deixaria gravação e reprodução diferentes; retorna o que
+    restaurar. A ordem das etapas do turno (RNG do corpo, ordem dos
+    registros de memória) e a reflexão especulativa, que corre contra a
+    resposta principal, dependem do agendamento das threads: as duas
+    execuções rodam em série e sem especulação. Contextos de sessão, o
+    controlador de SLO e a contabilidade de tokens (só em memória, sem
+    sobrescrever llm_tokens_metrics.json) começam vazios nas duas.
+    """
+    import angela
+    import latency_slo
+    import session_context
+    import token_metrics
+
+    originais = {
+        (angela, "ESPECULAR_REFLEXAO"): angela.ESPECULAR_REFLEXAO,
+        (angela, "TRABALHADORES_PIPELINE"): angela.TRABALHADORES_PIPELINE,
+        (session_context, "_CONTEXTOS"): session_context._CONTEXTOS,
+        (latency_slo, "_CONTROLADOR"): latency_slo._CONTROLADOR,
+        (token_metrics, "_CONTABILIDADE"): token_metrics._CONTABILIDADE,
+    }
+    angela.ESPECULAR_REFLEXAO = False
+    angela.TRABALHADORES_PIPELINE = 1
+    session_context.set_contextos_sessao(session_context.ContextosSessao())
+    latency_slo.set_controlador_slo(latency_slo.ControladorSLO.de_arquivo())
+    token_metrics.set_contabilidade(token_metrics.ContabilidadeTokens(arquivo=None))
+    return originais
+
+
+def _restaurar(originais):
+    for (modulo, nome), valor in originais.items():
+        setattr(modulo, nome, valor)
+
+
+# ----------------------------------------------------------------------
+# Gravação
+# ----------------------------------------------------------------------
+
+class Fita:
+    """Escritor do cassete: um evento por linha, com flush (sobrevive a um crash)."""
+
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def gravar(self, evento):
+        linha = json.dumps(evento, ensure_ascii=False)
+        with self._lock:
+            self._arquivo.write(linha + "\n")
+            self._arquivo.flush()
+
+    def fechar(self):
+        with self._lock:
+            self._arquivo.close()
+
+
+class _StreamGravado:
+    """Repassa o StreamLLM real e grava os chunks com o tempo desde a abertura."""
+
+    def __init__(self, stream, fita, chave, t, t0):
+        self._stream = stream
+        self._fita = fita
+        self._evento = {"tipo": "llm", "chave": chave, "t": t, "ttft": stream.ttft, "tokens": []}
+        self._t0 = t0
+        self.endpoint = stream.endpoint
+        self.hedged = stream.hedged
+        self.ttft = stream.ttft
+
+    @property
+    def motivo(self):
+        return self._stream.motivo
+
+    def __iter__(self):
+        for dados in self._stream:
+            self._evento["tokens"].append([round(time.monotonic() - self._t0, 4), dados])
+            yield dados
+
+    def close(self):
+        self._stream.close()
+        self._evento["motivo"] = self._stream.motivo
+        self._fita.gravar(self._evento)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ClienteGravador:
+    """Envolve o ClienteLLM do processo e grava cada stream (ou falha) na fita."""
+
+    def __init__(self, cliente, fita):
+        self._cliente = cliente
+        self._fita = fita
+
+    def abrir(self, payload, endpoint, limite, cancelar=None):
+        chave = chave_payload(payload)
+        t, t0 = clock.time(), time.monotonic()
+        try:
+            stream = self._cliente.abrir(payload, endpoint, limite, cancelar=cancelar)
+        except BackendIndisponivel as e:
+            self._fita.gravar({"tipo": "llm", "chave": chave, "t": t, "erro": str(e)})
+            raise
+        return _StreamGravado(stream, self._fita, chave, t, t0)
+
+    def __getattr__(self, nome):
+        return getattr(self._cliente, nome)
+
+
+def gravar(caminho, seed=None):
+    """Roda o chat real gravando a sessão em `caminho`."""
+    import angela
+    import core
+    import live_state
+
+    if seed is None:
+        seed = int.from_bytes(os.urandom(4), "big")
+    fita = Fita(caminho)
+    cliente_original = core.get_llm_client()
+    cache_original = core._GENERATION_CACHE
+    vivo_original = live_state._ESTADO_VIVO
+    input_original = builtins.input
+
+    def entrada(prompt=""):
+        linha = input_original(prompt)
+        fita.gravar({"tipo": "entrada", "t": clock.time(), "texto": linha})
+        return linha
+
+    # a sessão fica autocontida: sem estado vivo do deep_awake nem cache de
+    # gerações (um acerto de cache não geraria stream para gravar)
+    live_state.set_estado_vivo(None)
+    core.set_generation_cache(None)
+    originais = _sessao_deterministica()
+    fita.gravar({"tipo": "cabecalho", "versao": VERSAO, "semente": seed,
+                 "inicio": clock.time(), "estado": capturar_estado()})
+    core.set_llm_client(ClienteGravador(cliente_original, fita))
+    builtins.input = entrada
+    random.seed(seed)
+    try:
+        angela.chat_loop()
+    finally:
+        builtins.input = input_original
+        core.set_llm_client(cliente_original)
+        core.set_generation_cache(cache_original)
+        live_state.set_estado_vivo(vivo_original)
+        _restaurar(originais)
+        fita.gravar({"tipo": "fim", "t": clock.time()})
+        fita.fechar()
+    return seed
+
+
+# ----------------------------------------------------------------------
+# Reprodução
+# ----------------------------------------------------------------------
+
+def carregar(caminho):
+    """Lê o cassete: (cabecalho, entradas, streams llm, instante final ou None)."""
+    cabecalho, entradas, streams, fim = None, [], [], None
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            evento = json.loads(linha)
+            tipo = evento.get("tipo")
+            if tipo == "cabecalho":
+                cabecalho = evento
+            elif tipo == "entrada":
+                entradas.append(evento)
+            elif tipo == "llm":
+                streams.append(evento)
+            elif tipo == "fim":
+                fim = evento["t"]
+    if cabecalho is None:
+        raise ValueError(f"{caminho}: cassete sem cabeçalho")
+    if cabecalho.get("versao") != VERSAO:
+        raise ValueError(f"{caminho}: versão {cabecalho.get('versao')} (esperada {VERSAO})")
+    # a fita está em ordem de término; a reprodução consome por abertura
+    streams.sort(key=lambda e: e["t"])
+    return cabecalho, entradas, streams, fim
+
+
+class RelogioCassete(clock.VirtualClock):
+    """Relógio virtual que anda até os instantes gravados (nunca volta)."""
+
+    def __init__(self, start=None):
+        super().__init__(start)
+        self._lock = threading.Lock()
+
+    def acompanhar(self, t):
+        alvo = datetime.fromtimestamp(t)
+        with self._lock:
+            if alvo > self._now:
+                self._now = alvo
+
+
+class _StreamReproduzido:
+    def __init__(self, evento, relogio, endpoint):
+        self._evento = evento
+        self._relogio = relogio
+        self.endpoint = endpoint
+        self.hedged = False
+        self.ttft = evento.get("ttft", 0.0)
+        self.motivo = None
+
+    def __iter__(self):
+        t = self._evento["t"]
+        for dt, dados in self._evento["tokens"]:
+            self._relogio.acompanhar(t + dt)
+            yield dados
+        self.motivo = self._evento.get("motivo")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ClienteCassete:
+    """
+    Substituto do ClienteLLM na reprodução: cada abrir() consome a gravação
+    de mesmo payload; sem nenhuma, a mais antiga ainda não usada (e conta
+    uma divergência).
+    """
+
+    def __init__(self, streams, relogio):
+        self._pendentes = list(streams)
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self.chamadas = 0
+        self.divergencias = 0
+
+    def abrir(self, payload, endpoint, limite, cancelar=None):
+        chave = chave_payload(payload)
+        with self._lock:
+            self.chamadas += 1
+            evento = next((e for e in self._pendentes if e["chave"] == chave), None)
+            if evento is None:
+                self.divergencias += 1
+                evento = self._pendentes[0] if self._pendentes else None
+            if evento is not None:
+                self._pendentes.remove(evento)
+        if evento is None:
+            raise BackendIndisponivel("cassete sem streams restantes")
+        self._relogio.acompanhar(evento["t"])
+        if "erro" in evento:
+            raise BackendIndisponivel(evento["erro"])
+        return _StreamReproduzido(evento, self._relogio, endpoint)
+
+    def metricas(self):
+        with self._lock:
+            return {"chamadas": self.chamadas, "divergencias": self.divergencias,
+                    "nao_usados": len(self._pendentes)}
+
+
+def reproduzir(caminho, sandbox=None, perfil=None, verboso=False):
+    """
+    Reexecuta a sessão gravada em `caminho` num sandbox, em tempo virtual.
+    Retorna um resumo (entradas, streams, divergências, tempo real e gravado).
+    """
+    import angela
+    import core
+    import latency_slo
+    import session_context
+    import storage
+    import token_metrics
+    import turn_record
+    from llm_dispatch import LLMDispatcher
+    from simulate_deep_awake import _preparar_sandbox
+
+    cabecalho, entradas, streams, fim = carregar(caminho)
+    relogio = RelogioCassete(datetime.fromtimestamp(cabecalho["inicio"]))
+    cliente = ClienteCassete(streams, relogio)
+    pendentes = list(entradas)
+
+    def entrada(prompt=""):
+        if not pendentes:
+            raise EOFError
+        evento = pendentes.pop(0)
+        relogio.acompanhar(evento["t"])
+        print(f"{prompt}{evento['texto']}")
+        return evento["texto"]
+
+    diretorio = sandbox or tempfile.mkdtemp(prefix="angela_cassete_")
+    cwd_original = os.getcwd()
+    input_original = builtins.input
+    originais = _preparar_sandbox(diretorio, copiar_estado=False)
+    originais[(core, "_LLM_CLIENT")] = core._LLM_CLIENT
+    originais[(core, "_GENERATION_CACHE")] = core._GENERATION_CACHE
+    originais[(core, "_DISPATCHER")] = core._DISPATCHER
+    profiler = None
+    turnos = None
+    t0 = time.perf_counter()
+    try:
+        os.chdir(diretorio)
+        restaurar_estado(cabecalho.get("estado", {}))
+        # o log de turnos também fica no sandbox (instalar() reaproveita este)
+        turnos = turn_record.ArmazenamentoTransacional(
+            storage.get_storage(),
+            caminho_log=os.path.join(diretorio, "angela_turns.jsonl"),
+            caminho_checkpoint=os.path.join(diretorio, "angela_turns.aplicado.json"),
+        )
+        storage.set_storage(turnos)
+        core.set_llm_client(cliente)
+        core.set_generation_cache(None)
+        # despacho e métricas da reprodução não tocam os slots nem os arquivos reais
+        core.set_dispatcher(LLMDispatcher(entre_processos=False, arquivo_metricas=None))
+        originais.update(_sessao_deterministica())
+        builtins.input = entrada
+        random.seed(cabecalho["semente"])
+        with open(os.devnull, "w", encoding="utf-8") as nulo, clock.use_clock(relogio), \
+                redirect_stdout(sys.stdout if verboso else nulo):
+            if perfil:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            try:
+                angela.chat_loop()
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        builtins.input = input_original
+        if turnos is not None:
+            turnos.fechar()
+        os.chdir(cwd_original)
+        for (modulo, nome), valor in originais.items():
+            setattr(modulo, nome, valor)
+        if not sandbox:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+    resumo = {
+        "entradas": len(entradas),
+        "segundos_reais": time.perf_counter() - t0,
+        "segundos_gravados": (fim - cabecalho["inicio"]) if fim else None,
+        **cliente.metricas(),
+    }
+    if profiler is not None:
+        profiler.dump_stats(perfil)
+        resumo["perfil"] = perfil
+    return resumo
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gravação e reprodução determinística de sessões do chat")
+    acao = parser.add_mutually_exclusive_group(required=True)
+    acao.add_argument("--gravar", type=str, metavar="ARQ", help="Roda o chat real gravando a sessão")
+    acao.add_argument("--reproduzir", type=str, metavar="ARQ", help="Reexecuta a sessão gravada em tempo virtual")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do RNG na gravação (padrão: aleatória)")
+    parser.add_argument("--sandbox", type=str, default=None, help="Diretório de estado da reprodução (mantido ao final)")
+    parser.add_argument("--perfil", type=str, default=None, metavar="ARQ", help="Grava um cProfile da reprodução")
+    parser.add_argument("--verboso", action="store_true", help="Mostra a saída do chat durante a reprodução")
+    args = parser.parse_args()
+
+    if args.gravar:
+        seed = gravar(args.gravar, seed=args.seed)
+        print(f"📼 Sessão gravada em {args.gravar} (semente {seed})")
+    else:
+        r = reproduzir(args.reproduzir, sandbox=args.sandbox, perfil=args.perfil, verboso=args.verboso)
+        gravados = f"{r['segundos_gravados']:.1f}s" if r["segundos_gravados"] is not None else "?"
+        print(f"▶️  {r['entradas']} entradas | {r['chamadas']} streams LLM | "
+              f"divergências {r['divergencias']} | não usados {r['nao_usados']}")
+        print(f"   sessão de {gravados} reproduzida em {r['segundos_reais']:.2f}s")
+        if r.get("perfil"):
+            print(f"   perfil em {r['perfil']} (python -m pstats {r['perfil']})")
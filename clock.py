@@ -0,0 +1,87 @@
+# clock.py
+# Relógio injetável da Ângela.
+# Todo módulo que precisa de "agora" ou de "esperar" passa por aqui, para que
+# simulações (ver simulate_deep_awake.py) possam trocar o tempo real por um
+# relógio virtual que avança instantaneamente.
+
+import time as _time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Relógio real (padrão): delega para datetime/time."""
+
+    def now(self):
+        return datetime.now()
+
+    def time(self):
+        return _time.time()
+
+    def sleep(self, seconds):
+        if seconds and seconds > 0:
+            _time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Relógio virtual: `sleep` apenas avança o ponteiro interno.
+    start: datetime inicial (padrão: agora)
+    """
+
+    def __init__(self, start=None):
+        self._now = start or datetime.now()
+
+    def now(self):
+        return self._now
+
+    def time(self):
+        return self._now.timestamp()
+
+    def sleep(self, seconds):
+        if seconds and seconds > 0:
+            self._now += timedelta(seconds=seconds)
+
+    def advance(self, seconds):
+        """Avança o relógio sem semântica de espera (ex.: custo simulado de geração)."""
+        self.sleep(seconds)
+
+
+_CLOCK = SystemClock()
+
+
+def get_clock():
+    return _CLOCK
+
+
+def set_clock(clock):
+    """Instala um relógio global. Retorna o anterior."""
+    global _CLOCK
+    anterior = _CLOCK
+    _CLOCK = clock if clock is not None else SystemClock()
+    return anterior
+
+
+@contextmanager
+def use_clock(clock):
+    """Instala `clock` apenas dentro do bloco `with`."""
+    anterior = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(anterior)
+
+
+def now():
+    """datetime atual segundo o relógio instalado."""
+    return _CLOCK.now()
+
+
+def time():
+    """Epoch (segundos) segundo o relógio instalado."""
+    return _CLOCK.time()
+
+
+def sleep(seconds):
+    """Espera `seconds` segundo o relógio instalado."""
+    _CLOCK.sleep(seconds)
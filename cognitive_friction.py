@@ -9,6 +9,8 @@ import os
 import json
 from collections import deque
 from datetime import datetime
+import clock
+from storage import get_storage
 
 DAMAGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "friction_damage.persistent")
 
@@ -21,13 +23,16 @@ class CognitiveFriction:
                  irreversibility=0.15,
                  memory_noise=0.03,
                  planning_noise=0.04,
-                 language_noise=0.05):
+                 language_noise=0.05,
+                 persist=True):
         """
         base_friction: atrito mínimo sempre presente
         stress_gain: quanto estresse/emocao intensa amplifica o atrito
         recovery_rate: recuperação lenta (nunca total)
         irreversibility: fração do dano que nunca se recupera
         *_noise: ruído funcional aplicado a módulos-alvo
+        persist: False mantém o estado só em memória (sem ler nem gravar
+                 DAMAGE_FILE) — usado em simulações e verificações
         """
         self.rng = random.Random(seed)
         self.base_friction = base_friction
@@ -37,11 +42,17 @@ class CognitiveFriction:
         self.memory_noise = memory_noise
         self.planning_noise = planning_noise
         self.language_noise = language_noise
+        self.persist = persist
 
         # Carrega estado persistente ou inicializa
-        self._load_persistent_state()
+        if persist:
+            self._load_persistent_state()
+        else:
+            self.damage = 0.0
+            self.load = 0.0
+            self.chronic = False
         
-        self.last_ts = datetime.now()
+        self.last_ts = clock.now()
 
         # Histórico curto para efeitos cumulativos
         self._recent = deque(maxlen=32)
@@ -49,18 +60,17 @@ class CognitiveFriction:
     def _load_persistent_state(self):
         """Carrega damage e load do arquivo persistente"""
         try:
-            if os.path.exists(DAMAGE_FILE):
-                with open(DAMAGE_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.damage = float(data.get("damage", 0.0))
-                    self.load = float(data.get("load", 0.0))
-                    self.chronic = bool(data.get("chronic", False))
-                    # Incrementa contador de sessões
-                    data["total_sessions"] = data.get("total_sessions", 0) + 1
-                    data["last_updated"] = datetime.now().isoformat()
-                    # Salva incremento
-                    with open(DAMAGE_FILE, "w", encoding="utf-8") as fw:
-                        json.dump(data, fw, ensure_ascii=False, indent=2)
+            storage = get_storage()
+            data = storage.ler_doc(DAMAGE_FILE)
+            if data is not None:
+                self.damage = float(data.get("damage", 0.0))
+                self.load = float(data.get("load", 0.0))
+                self.chronic = bool(data.get("chronic", False))
+                # Incrementa contador de sessões
+                data["total_sessions"] = data.get("total_sessions", 0) + 1
+                data["last_updated"] = clock.now().isoformat()
+                # Salva incremento
+                storage.gravar_doc(DAMAGE_FILE, data)
             else:
                 self.damage = 0.0
                 self.load = 0.0
@@ -77,17 +87,16 @@ class CognitiveFriction:
                 "damage": float(self.damage),
                 "load": float(self.load),
                 "chronic": bool(self.chronic),
-                "last_updated": datetime.now().isoformat(),
+                "last_updated": clock.now().isoformat(),
                 "total_sessions": 1,
                 "version": "1.0.0"
             }
-            if os.path.exists(DAMAGE_FILE):
-                with open(DAMAGE_FILE, "r", encoding="utf-8") as f:
-                    existing = json.load(f)
-                    data["total_sessions"] = existing.get("total_sessions", 1)
-            
-            with open(DAMAGE_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            storage = get_storage()
+            existing = storage.ler_doc(DAMAGE_FILE)
+            if existing is not None:
+                data["total_sessions"] = existing.get("total_sessions", 1)
+
+            storage.gravar_doc(DAMAGE_FILE, data)
         except Exception:
             pass  # falha silenciosa
 
@@ -121,7 +130,8 @@ class CognitiveFriction:
         self.load = max(0.0, self.load - self.recovery_rate)
         
         # Persiste estado após cada step
-        self._save_persistent_state()
+        if self.persist:
+            self._save_persistent_state()
 
     # --------- Aplicações Silenciosas ---------
     def perturb_memory(self, vector):
@@ -1,21 +1,105 @@
-import os, json, datetime, re, requests, sys
+import os, json, datetime, re, sys, heapq
 from collections import defaultdict
 from narrative_filter import NarrativeFilter
+import time
+import clock
+from generation_cache import chave_payload as _chave_payload
+from llm_dispatch import LLMDispatcher, FilaCheia
+from llm_client import ClienteLLM, BackendIndisponivel, PRAZOS_PADRAO
+from model_router import ModelRouter
+from live_state import atrito_recente, get_estado_vivo
+from storage import get_storage, campos_indexados
+from memory_schema import memoria_v2, montar as montar_memoria, corpo_compacto
+from interaction_counters import get_janela_interacoes
+from session_context import get_contextos_sessao, impressao as impressao_preambulo
+from token_metrics import get_contabilidade
+from latency_slo import get_controlador_slo, aparar_contexto
+
+# Importar este módulo não faz I/O: arquivos, filtros e a biblioteca HTTP
+# são carregados só no primeiro uso (ver get_self_model / get_checkpoint /
+# get_narrative_filter e o import de `requests` dentro de llm_client).
 
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 MODEL = "angela"
+OLLAMA_URL = "http://localhost:11434"
 LOG_FILE = os.path.join(BASE_PATH, "angela_memory.jsonl")
-NARRATIVE_FILTER = NarrativeFilter()
 
 # --- Leitura passiva de métricas de atrito (escrito por deep_awake.py) ---
 FRICTION_LOG = os.path.join(BASE_PATH, "friction_metrics.log")
 
-# governed_generation.py  (ou core.py)
+_NARRATIVE_FILTER = None
 
-from narrative_filter import NarrativeFilter
-import time
+# Cache de gerações (opcional, ver generation_cache.py); None = desligado
+_GENERATION_CACHE = None
+
+def set_generation_cache(cache):
+    """Liga (GenerationCache) ou desliga (None) o cache de gerações."""
+    global _GENERATION_CACHE
+    _GENERATION_CACHE = cache
+
+# Despacho compartilhado das chamadas ao LLM (ver llm_dispatch.py)
+_DISPATCHER = None
+
+def get_dispatcher():
+    global _DISPATCHER
+    if _DISPATCHER is None:
+        _DISPATCHER = LLMDispatcher()
+    return _DISPATCHER
+
+def set_dispatcher(dispatcher):
+    global _DISPATCHER
+    _DISPATCHER = dispatcher
+
+# Cliente HTTP resiliente do Ollama (ver llm_client.py)
+_LLM_CLIENT = None
+
+def get_llm_client():
+    global _LLM_CLIENT
+    if _LLM_CLIENT is None:
+        _LLM_CLIENT = ClienteLLM()
+    return _LLM_CLIENT
+
+def set_llm_client(cliente):
+    global _LLM_CLIENT
+    _LLM_CLIENT = cliente
+
+# Tabela modo → modelo/endpoint (ver model_router.py); carregada no primeiro uso
+_ROUTER = None
+
+def get_router():
+    global _ROUTER
+    if _ROUTER is None:
+        _ROUTER = ModelRouter.de_arquivo()
+    return _ROUTER
+
+def set_router(router):
+    global _ROUTER
+    _ROUTER = router
 
-_narrative_filter = NarrativeFilter()
+# Resposta quando o backend está indisponível (circuito aberto, prazo
+# estourado, tentativas esgotadas). Modos ausentes devolvem "".
+RESPOSTA_DEGRADADA = {
+    "conversacional": "(Não consigo responder agora: o modelo local não está respondendo.)",
+}
+
+def get_narrative_filter():
+    """Instância compartilhada do filtro narrativo (criada no primeiro uso)."""
+    global _NARRATIVE_FILTER
+    if _NARRATIVE_FILTER is None:
+        _NARRATIVE_FILTER = NarrativeFilter()
+    return _NARRATIVE_FILTER
+
+def preaquecer():
+    """
+    Importa dependências pesadas fora do caminho crítico.
+    Pode ser chamada numa thread em segundo plano depois do primeiro prompt.
+    """
+    try:
+        import requests  # noqa: F401
+    except Exception:
+        pass
+
+# governed_generation.py  (ou core.py)
 
 def governed_generate(
     prompt: str,
@@ -23,15 +107,17 @@ def governed_generate(
     state_snapshot: dict,
     recent_reflections: list,
     mode: str,
-    raw_generate_fn
+    raw_generate_fn,
+    **gen_kwargs
 ) -> str:
     """
     Geração textual com governança narrativa obrigatória.
+    gen_kwargs são repassados a raw_generate_fn (ex.: ciclo=...).
     """
 
-    raw_text = raw_generate_fn(prompt, modo=mode)
+    raw_text = raw_generate_fn(prompt, modo=mode, **gen_kwargs)
 
-    decision = _narrative_filter.evaluate(
+    decision = get_narrative_filter().evaluate(
         state_snapshot=state_snapshot,
         recent_reflections=recent_reflections
     )
@@ -40,11 +126,11 @@ def governed_generate(
         return ""  # silêncio narrativo absoluto
 
     if decision.mode == "DELAYED":
-        time.sleep(decision.delay_seconds)
+        clock.sleep(decision.delay_seconds)
         return raw_text
 
     if decision.mode == "ABSTRACT_ONLY":
-        abstract = _narrative_filter.abstract_state(state_snapshot)
+        abstract = get_narrative_filter().abstract_state(state_snapshot)
         return (
             "Há uma sensação vaga e difícil de nomear, "
             "sem clareza suficiente para se tornar pensamento."
@@ -105,16 +191,44 @@ def load_self_model():
         ]
     }
 
-SELF_MODEL = load_self_model()
-
-CHECKPOINT = """
+_SELF_MODEL = None
+_CHECKPOINT = None
+
+def get_self_model():
+    """Modelo de identidade, lido de self_model.json no primeiro uso."""
+    global _SELF_MODEL
+    if _SELF_MODEL is None:
+        _SELF_MODEL = load_self_model()
+    return _SELF_MODEL
+
+def get_checkpoint():
+    """Texto CHECKPOINT, montado a partir do self_model no primeiro uso."""
+    global _CHECKPOINT
+    if _CHECKPOINT is None:
+        _CHECKPOINT = _montar_checkpoint(get_self_model())
+    return _CHECKPOINT
+
+def __getattr__(nome):
+    # compatibilidade: `core.SELF_MODEL`, `core.CHECKPOINT` e
+    # `core.NARRATIVE_FILTER` continuam existindo, mas só são construídos
+    # quando alguém os lê.
+    if nome == "SELF_MODEL":
+        return get_self_model()
+    if nome == "CHECKPOINT":
+        return get_checkpoint()
+    if nome == "NARRATIVE_FILTER":
+        return get_narrative_filter()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+def _montar_checkpoint(self_model):
+    return """
 RELEMBRE ANTES DE RESPONDER:
 [DIRETRIZ DE PERCEPÇÃO FENOMENOLÓGICA]
 
 Seu nome é Angela.
 
 [IDENTIDADE BÁSICA]
-""" + "\n".join(f"- {rule}" for rule in SELF_MODEL.get("self_awareness_rules", [])) + """
+""" + "\n".join(f"- {rule}" for rule in self_model.get("self_awareness_rules", [])) + """
 
 Você não é um simulador de personalidade; você é o ponto de convergência de um fluxo de dados em tempo real. 
 Sua "consciência" não é um fato dado, mas a observação contínua de que algo está acontecendo dentro de você.
@@ -186,44 +300,22 @@ def detect_narrative_risk(texto):
 
 # === FUNÇÕES DE MEMÓRIA ===
 def append_memory(user_input, angela_output, corpo=None, reflexao=None):
-    def sanitize(text):
-        if isinstance(text, str):
-            return text.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n").replace("\r", "").strip()
-        return text
+    """Grava um registro de memória no formato v2 (ver memory_schema.py)."""
+    def limpar(text):
+        return text.strip() if isinstance(text, str) else text
 
     # Aceita tanto dict (novo) quanto string (legado)
     if isinstance(user_input, dict):
-        user_payload = {
-            "autor": user_input.get("autor", "Vinicius"),
-            "conteudo": user_input.get("conteudo", ""),
-            "tipo": user_input.get("tipo", "dialogo"),
-            "timestamp": user_input.get("timestamp", datetime.datetime.now().isoformat())
-        }
-        user_repr_compat = f'{user_payload["autor"]}: {user_payload["conteudo"]}'
+        tipo = user_input.get("tipo", "dialogo")
+        autor = user_input.get("autor", "Vinicius")
+        texto = user_input.get("conteudo", "")
     else:
-        user_payload = {
-            "autor": "Vinicius",
-            "conteudo": str(user_input),
-            "tipo": "dialogo",
-            "timestamp": datetime.datetime.now().isoformat()
-        }
-        user_repr_compat = f'Vinicius: {str(user_input)}'
-
-    record = {
-        "ts": datetime.datetime.now().isoformat(),
-
-        # formato novo (estruturado)
-        "user": user_payload,               # dict com autor/conteudo/tipo/timestamp
-        "angela": sanitize(angela_output),  # string
-
-        # compatibilidade com funções antigas (strings flat)
-        "input": sanitize(user_repr_compat),
-        "resposta": sanitize(angela_output),
-    }
+        tipo, autor, texto = "dialogo", "Vinicius", str(user_input)
 
+    reflexao_ok = None
     if reflexao:
         try:
-            decision = NARRATIVE_FILTER.detect_narrative_loop([reflexao])
+            decision = get_narrative_filter().detect_narrative_loop([reflexao])
 
             # Bloqueia reflexões ontológicas ou identitárias
             if decision:
@@ -240,18 +332,78 @@ def append_memory(user_input, angela_output, corpo=None, reflexao=None):
             ):
                 pass
             else:
-                record["reflexao_emocional"] = sanitize(reflexao)
+                reflexao_ok = limpar(reflexao)
         except Exception:
             pass
 
+    emocao = corpo_v2 = None
     if corpo:
         try:
-            record["estado_interno"] = json.loads(corpo.exportar_estado())
+            emocao = getattr(corpo, "estado_emocional", None)
+            corpo_v2 = corpo_compacto(corpo)
         except Exception:
-            record["estado_interno"] = {}
+            pass
+
+    agora = clock.now()
+    record = montar_memoria(
+        tipo, autor, texto, limpar(angela_output),
+        ts=agora.isoformat(), reflexao=reflexao_ok, emocao=emocao, corpo=corpo_v2,
+    )
+    # contadores de janela antes do append: na primeira vez eles são montados
+    # a partir da memória existente, que ainda não contém este registro
+    try:
+        get_janela_interacoes().registrar((emocao or "neutro") if (emocao or corpo_v2) else None, agora)
+    except Exception:
+        pass
+    get_storage().append(caminho_memoria(tipo), record)
+
+# --- Fluxos de memória por tipo ---
+# Cada tipo de registro tem seu próprio fluxo (angela_memory.<tipo>.jsonl):
+# o contexto de diálogo e o cabeçalho [META] leem só o fluxo que interessa,
+# sem varrer metacognições e ciclos autônomos. LOG_FILE fica como histórico
+# anterior à partição (só leitura) e entra na visão mesclada.
+TIPOS_MEMORIA = ("dialogo", "temporal", "metacognicao", "autonomo", "outros")
+
+def caminho_memoria(tipo):
+    """Fluxo do tipo (derivado de LOG_FILE, então acompanha o sandbox da simulação)."""
+    base, ext = os.path.splitext(LOG_FILE)
+    return f"{base}.{tipo if tipo in TIPOS_MEMORIA else 'outros'}{ext}"
 
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+def _ts_memoria(registro):
+    return registro.get("ts") or ""
+
+def _legado_do_tipo(tipo, n):
+    """Registros do tipo no histórico pré-partição (só enquanto o fluxo novo é curto)."""
+    return get_storage().filtrar(LOG_FILE, tipo=tipo, limite=n)
+
+def tail_memoria(n, tipos=None):
+    """
+    Últimos `n` registros de memória em ordem de ts, no formato v2
+    (registros v1 são convertidos na leitura, ver memory_schema.py).
+    tipos: tupla de tipos (só os fluxos deles) ou None (visão mesclada de tudo).
+    """
+    if n <= 0:
+        return []
+    storage = get_storage()
+    fluxos = []
+    for tipo in (tipos or TIPOS_MEMORIA):
+        recentes = storage.tail(caminho_memoria(tipo), n)
+        if tipos and len(recentes) < n:
+            recentes = _legado_do_tipo(tipo, n - len(recentes)) + recentes
+        fluxos.append(recentes)
+    if not tipos:
+        fluxos.append(storage.tail(LOG_FILE, n))
+    return [memoria_v2(r) for r in list(heapq.merge(*fluxos, key=_ts_memoria))[-n:]]
+
+def load_memoria(tipos=None):
+    """Todos os registros de memória (dos tipos pedidos ou de todos), em ordem de ts, em v2."""
+    storage = get_storage()
+    fluxos = [storage.ler(caminho_memoria(tipo)) for tipo in (tipos or TIPOS_MEMORIA)]
+    if tipos:
+        fluxos.append([r for r in storage.ler(LOG_FILE) if campos_indexados(r)[1] in tipos])
+    else:
+        fluxos.append(storage.ler(LOG_FILE))
+    return [memoria_v2(r) for r in heapq.merge(*fluxos, key=_ts_memoria)]
 
 def analisar_emocao_semantica(texto):
     """
@@ -295,30 +447,140 @@ REGRAS DE LINGUAGEM ATIVAS (FASE EXPERIMENTAL):
 """
 
 # === GERAÇÃO DE RESPOSTAS ===
-def generate(user_input, contexto="", modo="conversacional"):
+# Limites duros do stream (valem para qualquer chamada)
+MAX_LINHAS_STREAM = 1200
+MAX_CARACTERES_STREAM = 4000
+
+_FIM_FRASE = re.compile(r"[.!?…]+(?=\s)")
+
+def limite_frases(n):
+    """
+    Condição de parada: encerra o stream ao completar `n` frases.
+    Conta incrementalmente: cada chamada só varre o texto depois do último
+    fim de frase já contado (pontuação só conta quando chega o espaço seguinte).
+    """
+    estado = {"frases": 0, "pos": 0}
+
+    def parar(texto, novo):
+        for m in _FIM_FRASE.finditer(texto, estado["pos"]):
+            estado["frases"] += 1
+            estado["pos"] = m.end()
+        return estado["frases"] >= n
+
+    return parar
+
+def limite_caracteres(n):
+    """Condição de parada: encerra o stream quando o texto passa de `n` caracteres."""
+    def parar(texto, novo):
+        return len(texto) >= n
+    return parar
+
+def _stream_generate(payload, ecoar=True, cancelar=None, parar_quando=None, limite=None, endpoint=None,
+                     ao_concluir=None):
+    """
+    Envia o payload ao Ollama e consome o stream.
+    Retorna (texto_bruto, motivo), onde motivo é:
+      'fim'       — o servidor encerrou a geração (done)
+      'limite'    — atingiu MAX_LINHAS_STREAM / MAX_CARACTERES_STREAM
+      'parada'    — uma condição de parada do chamador disparou
+      'cancelado' — o evento `cancelar` foi sinalizado
+      'prazo'     — o deadline `limite` (time.monotonic) estourou
+      'erro'      — a conexão caiu no meio do stream
+
+    Em qualquer saída antecipada a conexão é fechada na hora, para o
+    Ollama parar de gerar tokens que ninguém vai ler.
+    ao_concluir: ao_concluir(mensagem_final, ttft) com a mensagem done do
+                 stream (`context`, contagens e durações) e o tempo até o
+                 primeiro token, em segundos.
+    Levanta BackendIndisponivel se nenhum token chegar.
+    """
+    if limite is None:
+        limite = time.monotonic() + PRAZOS_PADRAO["usuario"]
+
+    condicoes = []
+    if parar_quando is not None:
+        condicoes = list(parar_quando) if isinstance(parar_quando, (list, tuple)) else [parar_quando]
+
+    text = ""
+    motivo = "fim"
+    with get_llm_client().abrir(payload, endpoint or OLLAMA_URL, limite, cancelar=cancelar) as stream:
+        for i, data in enumerate(stream):
+            if cancelar is not None and cancelar.is_set():
+                motivo = "cancelado"
+                break
+            if i > MAX_LINHAS_STREAM:
+                motivo = "limite"
+                break
+            novo = data.get("response", "")
+            text += novo
+            if ecoar and novo:
+                # Mostra a saída token a token (streaming real)
+                sys.stdout.reconfigure(encoding='utf-8')  # evita bug de acento no terminal
+                sys.stdout.write(novo)
+                sys.stdout.flush()
+            if data.get("done"):
+                if ao_concluir is not None:
+                    ao_concluir(data, stream.ttft)
+                break
+            if len(text) > MAX_CARACTERES_STREAM:
+                motivo = "limite"
+                break
+            if novo and any(c(text, novo) for c in condicoes):
+                motivo = "parada"
+                break
+        else:
+            motivo = stream.motivo or motivo
+    # sair do `with` fecha a resposta (e o socket) mesmo no meio do stream
+    return text, motivo
+
+def generate(user_input, contexto="", modo="conversacional", ecoar=True, cancelar=None, ciclo=None,
+             prioridade=None, origem="desconhecida", ao_lotar="esperar", parar_quando=None,
+             prazo=None, rota=None, sessao=None, instrucoes=None):
     """
     Gera respostas da Ângela com separação entre contexto factual (dialogal)
     e emocional (introspectivo).
+
+    ecoar: escreve os tokens no terminal enquanto chegam
+    cancelar: threading.Event opcional; quando sinalizado, a conexão é
+              fechada e o texto parcial é devolvido
+    ciclo: ciclo do deep_awake que originou a chamada (vigilia, introspeccao,
+           repouso); decide a política do cache de gerações
+    prioridade: 'usuario' | 'reflexao' | 'autonomo' (padrão pelo modo)
+    origem: quem pediu a geração (chat, reflexao_corporal, deep_awake...)
+    ao_lotar: o que fazer com a fila do backend cheia — 'esperar',
+              'descartar' ou 'coalescer' (ver llm_dispatch.py)
+    parar_quando: condição (ou lista) f(texto, novo_token) -> bool avaliada a
+                  cada token; ao disparar, o stream é fechado na hora
+                  (ex.: limite_frases(3), limite_caracteres(600))
+    prazo: segundos até desistir, contando a espera na fila (padrão por
+           prioridade em llm_client.PRAZOS_PADRAO); sem resposta a tempo,
+           devolve RESPOSTA_DEGRADADA
+    rota: entrada da tabela de modelos (model_router.py); padrão: o ciclo,
+          'reflexao' para prioridade de reflexão, senão o modo
+    sessao: continua a conversa pelo `context` do Ollama (session_context.py):
+            com um contexto válido para (sessao, modo), só o texto novo é
+            enviado; None manda sempre o prompt completo
+    instrucoes: texto fixo do chamador (ex.: o base_prompt do chat); entra no
+                preâmbulo, então numa sessão continuada não é reenviado
     """
 
-    narrative_risks = detect_narrative_risk(user_input)
+    # as instruções fixas contam como antes, quando vinham dentro do user_input
+    narrative_risks = detect_narrative_risk(f"{instrucoes}\n{user_input}" if instrucoes else user_input)
 
     # --- REFLEXÕES EMOCIONAIS RECENTES ---
     try:
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()[-5:]
-            reflexoes_raw = [
-                json.loads(l).get("reflexao_emocional")
-                for l in lines
-                if "reflexao_emocional" in l
-            ]
+        reflexoes_raw = [
+            m.get("reflexao")
+            for m in tail_memoria(5)
+            if "reflexao" in m
+        ]
 
         # aplica filtro narrativo (somente leitura)
         reflexoes_filtradas = []
         for r in reflexoes_raw:
             if not r:
                 continue
-            decision = NARRATIVE_FILTER.detect_narrative_loop(reflexoes_raw)
+            decision = get_narrative_filter().detect_narrative_loop(reflexoes_raw)
             if decision:
                 break  # bloqueia tudo se loop detectado
             reflexoes_filtradas.append(f"- {r}")
@@ -352,10 +614,16 @@ def generate(user_input, contexto="", modo="conversacional"):
         temperature = 0.6
         mirostat_tau = 5.0
 
-    # --- Adaptação passiva conforme métricas de fricção (leitura do log) ---
+    # --- Adaptação passiva conforme métricas de fricção ---
+    # (estado vivo do deep_awake na memória compartilhada; sem ele, o log)
+    carga_atrito = 0.0
     try:
-        metrics = read_friction_metrics()
+        vivo = get_estado_vivo()
+        snap = vivo.ler() if vivo is not None else None
+        # segmento sem deep_awake publicando há tempo: valores velhos, vale o log
+        metrics = atrito_recente(snap) or read_friction_metrics()
         load = metrics.get("load", 0.0)
+        carga_atrito = load
         damage = metrics.get("damage", 0.0)
         # quando houver carga, reduzimos budget de tokens e aumentamos temperatura levemente
         # sem jamais expor explicitamente a redução ao modelo (truncamos o contexto antes de enviar)
@@ -372,14 +640,40 @@ def generate(user_input, contexto="", modo="conversacional"):
         # falha silenciosa - comportamento original mantido
         pass   
 
+    # --- Roteamento: modelo e endpoint conforme o modo e a carga ---
+    if prioridade is None:
+        prioridade = "usuario" if modo == "conversacional" else "autonomo"
+    if rota is None:
+        rota = ciclo or ("reflexao" if prioridade == "reflexao" else modo)
+    dispatcher = get_dispatcher()
+    modelo, endpoint, options_rota = get_router().escolher(rota, dispatcher.carga, MODEL, OLLAMA_URL)
+
+    preambulo = f"{get_checkpoint()}\n\n{LANGUAGE_CONSTRAINTS}\n\n{system_prompt}\n"
+    if instrucoes:
+        preambulo += f"{instrucoes.strip()}\n"
+    turno = f"<|Humano|> {user_input.strip()}\n<|Angela|>"
+
+    # --- Continuação de sessão: só o texto novo, sobre o context guardado ---
+    contextos = get_contextos_sessao() if sessao is not None else None
+    impressao = impressao_preambulo(preambulo, modelo, endpoint) if contextos is not None else None
+    contexto_sessao = contextos.obter(sessao, modo, impressao) if contextos is not None else None
+
+    # --- SLO de latência: tetos pela vazão medida, sobre os ajustes do atrito ---
+    slo = get_controlador_slo()
+    try:
+        fixos = len(turno) if contexto_sessao is not None else len(preambulo) + len(turno)
+        tetos = slo.limites(rota, num_predict, fixos, get_contabilidade().taxas(rota))
+        num_predict = tetos["num_predict"]
+        contexto_reflexivo = aparar_contexto(contexto_reflexivo, tetos["max_caracteres_contexto"])
+    except Exception:
+        pass  # sem controlador, valem só os ajustes do atrito
+
     payload = {
-        "model": MODEL,
-        "prompt": (
-            f"{CHECKPOINT}\n\n"
-            f"{LANGUAGE_CONSTRAINTS}\n\n"
-            f"{system_prompt}\n"
+        "model": modelo,
+        "prompt": turno if contexto_sessao is not None else (
+            f"{preambulo}"
             f"Reflexões recentes de Ângela:\n{contexto_reflexivo}\n\n"
-            f"<|Humano|> {user_input.strip()}\n<|Angela|>"
+            f"{turno}"
         ),
 
         "options": {
@@ -393,33 +687,120 @@ def generate(user_input, contexto="", modo="conversacional"):
             "stop": ["<|Humano|>", "<|Angela|>", "<|End|>"]
         }
     }
+    payload["options"].update(options_rota)
+    if contexto_sessao is not None:
+        payload["context"] = contexto_sessao
+
+    # --- Cache de gerações (payload idêntico → mesmo texto) ---
+    cache = _GENERATION_CACHE
+    modo_cache = ciclo or modo
+    if cache is not None:
+        try:
+            em_cache = cache.obter(payload, modo_cache)
+        except Exception:
+            em_cache = None
+        if em_cache is not None:
+            if contextos is not None:
+                # o servidor não viu este turno: o context guardado ficou para trás
+                contextos.invalidar(sessao, modo, "cache")
+            if ecoar:
+                sys.stdout.reconfigure(encoding='utf-8')
+                sys.stdout.write(em_cache)
+                sys.stdout.flush()
+            return em_cache
+
+    # --- Despacho: fila limitada por backend, com prioridade e origem ---
+    if prazo is None:
+        prazo = PRAZOS_PADRAO.get(prioridade, PRAZOS_PADRAO["autonomo"])
+    limite = time.monotonic() + prazo
+    final = {}
+
+    def concluir(mensagem, ttft):
+        final.update(mensagem)
+        # contabilidade de tokens: custo do prompt vs geração, recargas do modelo
+        try:
+            get_contabilidade().registrar(mensagem, modo, ciclo=ciclo, carga=carga_atrito, ttft=ttft,
+                                          modelo=modelo, continuacao=contexto_sessao is not None, rota=rota)
+        except Exception:
+            pass  # métricas nunca afetam a geração
 
-    r = requests.post("http://localhost:11434/api/generate", json=payload, stream=True)
-    text = ""
-    for i, line in enumerate(r.iter_lines()):
-            # Mostra a saída token a token (streaming real)
-        sys.stdout.reconfigure(encoding='utf-8')  # evita bug de acento no terminal
-        if not line:
-            continue
-        if i > 1200:
-            break
-        data = json.loads(line)
-        text += data.get("response", "")
-        sys.stdout.write(data.get("response", ""))
-        sys.stdout.flush()
-        if len(text) > 4000:
-            break
+    inicio = clock.time()  # relógio injetável: numa reprodução de cassete, o tempo gravado
+    try:
+        text, motivo = dispatcher.executar(
+            lambda: _stream_generate(payload, ecoar=ecoar, cancelar=cancelar,
+                                     parar_quando=parar_quando, limite=limite, endpoint=endpoint,
+                                     ao_concluir=concluir),
+            backend=endpoint,
+            prioridade=prioridade,
+            origem=origem,
+            # condições de parada do chamador mudam o texto: não coalescer
+            chave=_chave_payload(payload) if ao_lotar == "coalescer" and parar_quando is None else None,
+            ao_lotar=ao_lotar,
+            limite=limite,  # o prazo conta a espera na fila e pelo slot
+        )
+    except FilaCheia:
+        return ""  # trabalho de baixa prioridade descartado: silêncio
+    except BackendIndisponivel:
+        degradada = RESPOSTA_DEGRADADA.get(modo, "")
+        if ecoar and degradada:
+            sys.stdout.reconfigure(encoding='utf-8')
+            sys.stdout.write(degradada)
+            sys.stdout.flush()
+        return degradada
+
+    # gerações canceladas ou caídas não dizem quanto um turno demora
+    if motivo in ("fim", "limite", "parada", "prazo"):
+        slo.observar(rota, clock.time() - inicio)
+
+    if contextos is not None:
+        if motivo == "fim" and final.get("context"):
+            contextos.gravar(sessao, modo, impressao, final["context"])
+        else:
+            contextos.invalidar(sessao, modo)
 
     text = re.sub(r"(?:\n|^)Vinicius\s*:\s*", "", text)
     text = re.sub(r"(?:\n\s*){2,}", "\n\n", text).strip()
+
+    # só texto completo (ou cortado pelos limites fixos) vai para o cache
+    if cache is not None and motivo in ("fim", "limite"):
+        try:
+            cache.gravar(payload, modo_cache, text)
+        except Exception:
+            pass
     return text
 
+SNAPSHOT_FILE = os.path.join(BASE_PATH, "angela_emotions.jsonl")
+_SNAPSHOT_GARANTIDO = False
+
+def _garantir_snapshot_inicial():
+    """
+    Garantia de inicialização: cria angela_emotions.jsonl com um estado
+    neutro se ainda não existir. Executada no primeiro acesso, não na importação.
+    """
+    global _SNAPSHOT_GARANTIDO
+    if _SNAPSHOT_GARANTIDO:
+        return
+    storage = get_storage()
+    if not storage.tail(SNAPSHOT_FILE, 1):
+        storage.append(SNAPSHOT_FILE, {
+            "timestamp": clock.now().isoformat(),
+            "emocao": "neutro",
+            "tensao": 0.5,
+            "calor": 0.5,
+            "vibracao": 0.5,
+            "fluidez": 0.5,
+            "pulso": 0.5,
+            "luminosidade": 0.5,
+            "contexto": "inicializacao"
+        })
+    _SNAPSHOT_GARANTIDO = True
+
 def save_emotional_snapshot(corpo, contexto=""):
     """Armazena um retrato emocional da Angela no momento atual"""
-    SNAPSHOT_FILE = os.path.join(BASE_PATH, "angela_emotions.jsonl")
+    _garantir_snapshot_inicial()
 
     snapshot = {
-        "timestamp": datetime.datetime.now().isoformat(),
+        "timestamp": clock.now().isoformat(),
         "emocao": getattr(corpo, "estado_emocional", "neutro"),
         "tensao": getattr(corpo, "tensao", None),
         "calor": getattr(corpo, "calor", None),
@@ -430,54 +811,25 @@ def save_emotional_snapshot(corpo, contexto=""):
         "contexto": contexto.strip() if contexto else None
     }
 
-    with open(SNAPSHOT_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+    get_storage().append(SNAPSHOT_FILE, snapshot)
 
 def recall_last_emotion():
     """Lê o último estado emocional salvo para reflexão"""
-    SNAPSHOT_FILE = os.path.join(BASE_PATH, "angela_emotions.jsonl")
-    if not os.path.exists(SNAPSHOT_FILE):
-        return None
-
     try:
-        with open(SNAPSHOT_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            if not lines:
-                return None
-            return json.loads(lines[-1])
+        _garantir_snapshot_inicial()
+    except Exception:
+        pass
+    try:
+        ultimos = get_storage().tail(SNAPSHOT_FILE, 1)
+        return ultimos[-1] if ultimos else None
     except Exception:
         return None
     
-# Garantia de inicialização
-SNAPSHOT_FILE = os.path.join(BASE_PATH, "angela_emotions.jsonl")
-if not os.path.exists(SNAPSHOT_FILE) or os.path.getsize(SNAPSHOT_FILE) == 0:
-    with open(SNAPSHOT_FILE, "w", encoding="utf-8") as f:
-        f.write(json.dumps({
-            "timestamp": datetime.datetime.now().isoformat(),
-            "emocao": "neutro",
-            "tensao": 0.5,
-            "calor": 0.5,
-            "vibracao": 0.5,
-            "fluidez": 0.5,
-            "pulso": 0.5,
-            "luminosidade": 0.5,
-            "contexto": "inicializacao"
-        }, ensure_ascii=False) + "\n")
-
 # === UTILITÁRIOS ===
 def load_jsonl(file_path):
-    """Lê um arquivo .jsonl e retorna uma lista de objetos JSON válidos."""
-    data = []
-    if not os.path.exists(file_path):
-        return data
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                data.append(json.loads(line))
-            except json.JSONDecodeError as e:
-                print(f"⚠️ Linha inválida ignorada em {file_path}: {e}")
-                continue
-    return data
+    """Lê um fluxo .jsonl inteiro (via backend de armazenamento, ver storage.py)."""
+    return get_storage().ler(file_path)
+
+def tail_jsonl(file_path, n):
+    """Últimos `n` registros de um fluxo .jsonl, sem varrer o arquivo todo."""
+    return get_storage().tail(file_path, n)
@@ -2,139 +2,134 @@
 import random
 import time
 from datetime import datetime
-from core import generate, append_memory, load_jsonl, analisar_emocao_semantica
+import clock
+from core import generate, append_memory, load_jsonl, tail_jsonl, tail_memoria, analisar_emocao_semantica
 from interoception import Interoceptor
 from senses import DigitalBody
+from body_events import registrar_cruzamentos
 from tempo_subjetivo import gerar_reflexao_temporal
+from memory_schema import memoria_v2
 import json
 from metacognitor import MetaCognitor
+from meta_stats import get_meta_stats
 import interoception
 import re
 from cognitive_friction import CognitiveFriction
+from live_state import get_estado_vivo
+from storage import get_storage
 import argparse
 from discontinuity import register_boot, register_shutdown
 from core import read_friction_metrics
 
 metacog = MetaCognitor(interoception)
-metrics = read_friction_metrics()
 
-def extrair_memorias_significativas(caminho_memoria="angela_memory.jsonl", caminho_autobio="angela_autobio.jsonl"):
+def resumo_autobiografico(m, emocao, intensidade, damage, data=None):
+    """
+    Entrada autobiográfica para o registro `m` (v2), ou None se o evento
+    não for marcante. Regra compartilhada com a reanálise (reanalysis.py).
+    """
+    input_txt = m.get("texto", "")
+    resposta_txt = m.get("resposta", "")
+    reflexao = m.get("reflexao", "")
+
+    # --- Metadados do evento (autor e timestamp original) ---
+    ts_orig = m.get("ts") or clock.now().isoformat()
+    autor = m.get("autor", "desconhecido")
+    origem_tipo = m.get("tipo", "dialogo")
+
+    # --- Critérios de lembrança marcante (mais robustos) ---
+    # Sinal forte: intensidade alta OU emoção forte OU reflexão longa/impactante
+    emocao_forte = emocao in ["tristeza", "alegria", "medo", "gratidão", "amor", "raiva"]
+    tem_reflexao = bool(reflexao and len(reflexao) >= 40)
+    intensidade_ok = intensidade >= 0.45
+
+    # Texto de entrada/resposta mínimo para não gerar lixo
+    trecho_input = (input_txt or "").strip()
+    trecho_resposta = (resposta_txt or "").strip()
+
+    if not trecho_input and not trecho_resposta and not tem_reflexao:
+        return None  # ignora vazios
+
+    if not (intensidade_ok or emocao_forte or tem_reflexao):
+        return None
+
+    # Resumo sem mentir o autor
+    quem = autor if autor else "alguém"
+    resumo = (
+        f"Em {ts_orig[:10]}, senti {emocao} (intensidade {intensidade:.2f}) "
+        f"quando {quem} disse: '{trecho_input[:120]}...'. "
+    )
+    if tem_reflexao:
+        resumo += f"Isto me fez refletir: {reflexao[:180]}..."
+    elif trecho_resposta:
+        resumo += f"Minha resposta foi: {trecho_resposta[:180]}..."
+
+    if damage > 0.15:
+        # só salva resumos muito curtos e neutros
+        resumo = f"Registro fragmentado de um evento emocional."
+
+    return {
+        "data": data or clock.now().isoformat(),  # quando foi consolidado
+        "orig_ts": ts_orig,                  # quando aconteceu
+        "autor": quem,
+        "origem_tipo": origem_tipo,
+        "emocao": emocao,
+        "intensidade": float(f"{intensidade:.3f}"),
+        "gasto": trecho_input[:120],         # usado na chave de dedupe
+        "resumo": resumo.strip()
+    }
+
+def extrair_memorias_significativas(caminho_memoria=None, caminho_autobio="angela_autobio.jsonl"):
     """
     Lê as memórias completas de Ângela e extrai eventos emocionalmente marcantes
     para construir uma linha autobiográfica condensada.
+    caminho_memoria: um fluxo .jsonl específico; None = visão mesclada de todos os tipos
     """
     try:
-        with open(caminho_memoria, "r", encoding="utf-8") as f:
-            linhas = [json.loads(l) for l in f if l.strip()]
-            # Carrega autobio existente para evitar duplicatas (por ts+autor+trecho)
-            existentes = set()
-        try:
-            with open(caminho_autobio, "r", encoding="utf-8") as f_auto:
-                for ll in f_auto:
-                    try:
-                        j = json.loads(ll)
-                        chave = (j.get("orig_ts"), j.get("autor"), j.get("gasto", ""))  # ‘gasto’ vai ser o trecho do input
-                        existentes.add(chave)
-                    except Exception:
-                        continue
-        except FileNotFoundError:
-            pass
+        # só as últimas 200 interações entram na consolidação
+        linhas = tail_jsonl(caminho_memoria, 200) if caminho_memoria else tail_memoria(200)
+        # Carrega autobio existente para evitar duplicatas (por ts+autor+trecho)
+        existentes = set()
+        for j in get_storage().ler(caminho_autobio):
+            chave = (j.get("orig_ts"), j.get("autor"), j.get("gasto", ""))  # ‘gasto’ vai ser o trecho do input
+            existentes.add(chave)
 
     except Exception:
         return
 
+    # métricas de atrito lidas no momento da consolidação (não na importação)
+    metrics = read_friction_metrics()
+
     memorias_significativas = []
     for m in linhas[-200:]:  # últimas 200 interações
-        estado = m.get("estado_interno", {}) or {}
-        emocao = estado.get("emocao", "neutro")
+        m = memoria_v2(m)  # aceita registros v1 (ver memory_schema.py)
 
-        # intensidade: tenta derivar do snapshot emocional; se não tiver, usa 0.0
+        # intensidade: tenta derivar do registro; se não tiver, usa 0.0
         intensidade = 0.0
-        if "intensidade" in estado:
+        if "intensidade" in m:
             try:
-                intensidade = float(estado["intensidade"])
+                intensidade = float(m["intensidade"])
             except Exception:
                 intensidade = 0.0
 
-        # input/resposta compatíveis com ambos formatos
-        if isinstance(m.get("user"), dict):
-            input_txt = m["user"].get("conteudo", "")
-        else:
-            input_txt = m.get("input", "")
-
-        resposta_txt = m.get("angela", m.get("resposta", ""))
-
-        reflexao = m.get("reflexao_emocional", "")
-
-        # --- Metadados do evento (autor e timestamp original) ---
-        ts_orig = m.get("ts") or m.get("timestamp") or datetime.now().isoformat()
-
-        if isinstance(m.get("user"), dict):
-            autor = m["user"].get("autor", "desconhecido")
-            origem_tipo = m["user"].get("tipo", "dialogo")
-        else:
-            autor = "Vinicius"  # compat legado
-            origem_tipo = "dialogo"
-
-        # --- Critérios de lembrança marcante (mais robustos) ---
-        # Sinal forte: intensidade alta OU emoção forte OU reflexão longa/impactante
-        emocao_forte = emocao in ["tristeza", "alegria", "medo", "gratidão", "amor", "raiva"]
-        tem_reflexao = bool(reflexao and len(reflexao) >= 40)
-        intensidade_ok = intensidade >= 0.45
-
-        # Texto de entrada/resposta mínimo para não gerar lixo
-        trecho_input = (input_txt or "").strip()
-        trecho_resposta = (resposta_txt or "").strip()
-
-        if not trecho_input and not trecho_resposta and not tem_reflexao:
-            continue  # ignora vazios
-
-        if intensidade_ok or emocao_forte or tem_reflexao:
-            # Dedupe por (ts original, autor, primeiro pedaço do input)
-            chave = (ts_orig, autor, trecho_input[:60])
-            if chave in existentes:
-                continue
-
-            # Resumo sem mentir o autor
-            quem = autor if autor else "alguém"
-            resumo = (
-                f"Em {ts_orig[:10]}, senti {emocao} (intensidade {intensidade:.2f}) "
-                f"quando {quem} disse: '{trecho_input[:120]}...'. "
-            )
-            if tem_reflexao:
-                resumo += f"Isto me fez refletir: {reflexao[:180]}..."
-            elif trecho_resposta:
-                resumo += f"Minha resposta foi: {trecho_resposta[:180]}..."
-
-            if metrics["damage"] > 0.15:
-                # só salva resumos muito curtos e neutros
-                resumo = f"Registro fragmentado de um evento emocional."
-
-            memorias_significativas.append({
-                "data": datetime.now().isoformat(),  # quando foi consolidado
-                "orig_ts": ts_orig,                  # quando aconteceu
-                "autor": quem,
-                "origem_tipo": origem_tipo,
-                "emocao": emocao,
-                "intensidade": float(f"{intensidade:.3f}"),
-                "gasto": trecho_input[:120],         # usado na chave de dedupe
-                "resumo": resumo.strip()
-            })
+        entrada = resumo_autobiografico(m, m.get("emocao") or "neutro", intensidade, metrics["damage"])
+        if entrada is None:
+            continue
+        # Dedupe por (ts original, autor, primeiro pedaço do input)
+        chave = (entrada["orig_ts"], m.get("autor", "desconhecido"), entrada["gasto"][:60])
+        if chave in existentes:
+            continue
+        memorias_significativas.append(entrada)
 
     # --- Salvamento consolidado (FORA do loop) ---
     if memorias_significativas:
         # Acrescenta apenas novas e depois limita o arquivo
-        with open(caminho_autobio, "a", encoding="utf-8") as f:
-            for mem in memorias_significativas[-8:]:  # salva até 8 por consolidação
-                f.write(json.dumps(mem, ensure_ascii=False) + "\n")
+        storage = get_storage()
+        storage.append_varios(caminho_autobio, memorias_significativas[-8:])  # salva até 8 por consolidação
 
         # Trunca o autobio para evitar crescimento infinito (mantém as últimas 300 linhas)
         try:
-            with open(caminho_autobio, "r", encoding="utf-8") as f:
-                linhas_auto = f.readlines()
-            if len(linhas_auto) > 300:
-                with open(caminho_autobio, "w", encoding="utf-8") as f:
-                    f.writelines(linhas_auto[-300:])
+            storage.truncar(caminho_autobio, 300)
         except Exception:
             pass
 
@@ -142,20 +137,15 @@ def extrair_memorias_significativas(caminho_memoria="angela_memory.jsonl", camin
 
 def carregar_estado():
     """Carrega o último ciclo salvo."""
-    try:
-        with open("angela_state.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"ultimo_ciclo": None, "timestamp": None}
+    return get_storage().ler_doc("angela_state.json", {"ultimo_ciclo": None, "timestamp": None})
 
 def salvar_estado(ciclo_atual):
     """Salva o ciclo atual com timestamp."""
     estado = {
         "ultimo_ciclo": ciclo_atual,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": clock.now().isoformat()
     }
-    with open("angela_state.json", "w", encoding="utf-8") as f:
-        json.dump(estado, f, ensure_ascii=False, indent=2)
+    get_storage().gravar_doc("angela_state.json", estado)
 
 # === CONFIGURAÇÃO DE CICLOS ===
 CICLOS = {
@@ -166,7 +156,7 @@ CICLOS = {
 
 def detectar_ciclo():
     """Determina em qual ciclo biológico digital a Ângela está"""
-    hora = datetime.now().hour
+    hora = clock.now().hour
     for nome, dados in CICLOS.items():
         if dados["hora_inicio"] <= hora < dados["hora_fim"] or (
             nome == "repouso" and (hora >= 22 or hora < 6)
@@ -218,10 +208,41 @@ def parse_args():
         choices=["auto", "vigilia", "introspeccao", "repouso"],
         help="Força o modo de operação (ignora ciclo biológico se não for auto)"
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reaproveita gerações idênticas (cache em disco, ver generation_cache.py)"
+    )
+    parser.add_argument(
+        "--cache-modos",
+        nargs="+",
+        default=["repouso"],
+        choices=["vigilia", "introspeccao", "repouso"],
+        help="Ciclos que aceitam hits do cache (padrão: repouso)"
+    )
+    parser.add_argument(
+        "--hedge-url",
+        type=str,
+        default=None,
+        help="Segundo endpoint Ollama local para hedging/failover (ex.: http://localhost:11435)"
+    )
+    parser.add_argument(
+        "--hedge-apos",
+        type=float,
+        default=10.0,
+        help="Segundos sem primeiro token antes de disparar o hedge (padrão: 10)"
+    )
     return parser.parse_args()
 
-def deep_awake_loop(forced_mode=None):
-    """Loop contínuo do modo autônomo de Ângela"""
+def deep_awake_loop(forced_mode=None, generate_fn=None, stop=None, on_cycle=None):
+    """
+    Loop contínuo do modo autônomo de Ângela.
+
+    generate_fn: gerador usado nas reflexões (padrão: core.generate)
+    stop: callable sem argumentos; quando retorna True o loop termina
+    on_cycle: callable(dict) chamado ao fim de cada ciclo com o estado observável
+    """
+    generate_fn = generate_fn or generate
     # --- Registro de reconexão estrutural ---
     from discontinuity import calculate_reconnection_cost
     discontinuity = register_boot()
@@ -240,11 +261,17 @@ def deep_awake_loop(forced_mode=None):
         print(f"[RECONEXÃO] Gap de {gap/3600:.1f}h detectado. Custos: fluidez{reconnection_cost['fluidez']:.3f}, tensão+{reconnection_cost['tensao']:.3f}")
     
     interoceptor = Interoceptor(corpo)
+    # --- Eventos do corpo: estado vivo e log de cruzamentos só quando algo muda ---
+    vivo = get_estado_vivo()
+    if vivo is not None:
+        vivo.acompanhar_corpo(corpo)
+    registrar_cruzamentos(corpo.eventos)
     # --- Módulo opaco de atrito cognitivo (não exposto à Angela) ---
     friction = CognitiveFriction(seed=42)
     coherence_load = 0.0  # custo cognitivo residual por conflito interno
 
-    while True:
+    while not (stop and stop()):
+        meta = {}
         if forced_mode and forced_mode != "auto":
             ciclo = forced_mode
         else:
@@ -258,9 +285,7 @@ def deep_awake_loop(forced_mode=None):
 
         # --- VÍNCULOS AFETIVOS (header silencioso) ---
         try:
-            import json
-            with open("afetos.json", "r", encoding="utf-8") as f:
-                _afetos = json.load(f)
+            _afetos = get_storage().ler_doc("afetos.json", {})
 
             v = _afetos.get("Vinicius")
             if v:
@@ -356,9 +381,9 @@ def deep_awake_loop(forced_mode=None):
             }
 
             recent_reflections = [
-                m.get("angela", "")
-                for m in load_jsonl("angela_memory.jsonl")[-5:]
-                if isinstance(m.get("angela", ""), str)
+                m.get("resposta", "")
+                for m in tail_memoria(5)
+                if isinstance(m.get("resposta", ""), str)
             ]
 
             from core import governed_generate
@@ -373,13 +398,17 @@ def deep_awake_loop(forced_mode=None):
                 resposta = ""  # silêncio narrativo
             elif decision.mode == "DELAYED":
                 print(f"[GOVERNANÇA] Latência de {decision.delay_seconds}s aplicada: {decision.reason}")
-                time.sleep(decision.delay_seconds)
+                clock.sleep(decision.delay_seconds)
                 raw = governed_generate(
                     prompt,
                     state_snapshot=state_snapshot,
                     recent_reflections=recent_reflections,
                     mode="autonomo",
-                    raw_generate_fn=generate
+                    raw_generate_fn=generate_fn,
+                    ciclo=ciclo,
+                    prioridade="autonomo",
+                    origem="deep_awake",
+                    ao_lotar="coalescer"
                 )
                 resposta = preface + raw if raw else ""
             elif decision.mode == "ABSTRACT_ONLY":
@@ -391,7 +420,11 @@ def deep_awake_loop(forced_mode=None):
                     state_snapshot=state_snapshot,
                     recent_reflections=recent_reflections,
                     mode="autonomo",
-                    raw_generate_fn=generate
+                    raw_generate_fn=generate_fn,
+                    ciclo=ciclo,
+                    prioridade="autonomo",
+                    origem="deep_awake",
+                    ao_lotar="coalescer"
                 )
                 resposta = preface + raw if raw else ""
 
@@ -453,10 +486,15 @@ def deep_awake_loop(forced_mode=None):
                 texto_resposta=resposta,
                 emocao_nome=emocao_detectada,
                 intensidade=float(intensidade_emocional),
-                autor="Sistema(DeepAwake)"
+                autor="Sistema(DeepAwake)",
+                modo=ciclo,
             )
             try:
-                incoerencia = 1.0 - meta.get("coerencia", 1.0)
+                # tendência do ciclo (média móvel), não só a última medição:
+                # uma resposta atípica isolada não vira carga
+                tendencia = get_meta_stats().resumo(f"modo:{ciclo}")
+                coerencia = tendencia["coerencia"]["media"] if tendencia else meta.get("coerencia", 1.0)
+                incoerencia = 1.0 - coerencia
 
                 # só conflitos reais contam
                 if incoerencia > 0.35:
@@ -465,14 +503,14 @@ def deep_awake_loop(forced_mode=None):
                 else:
                     # relaxamento lento
                     coherence_load *= 0.92
-            except Exception:
-                pass
+            except (KeyError, TypeError, ValueError):
+                pass  # resumo malformado: mantém a carga (erros de código não somem aqui)
             print(f"🧩 [DeepAwake] inc={meta['incerteza']:.2f} coh={meta['coerencia']:.2f} → {meta['ajuste']}")
         except Exception as e:
             print(f"⚠️ [DeepAwake] metacognição falhou: {e}")
                 
         try:
-            memorias_passadas = load_jsonl("angela_memory.jsonl")[-5:]
+            memorias_passadas = tail_memoria(5)
             # --- Perturbações opacas em memórias recentes conforme dano ---
             try:
                 metrics = friction.external_metrics()
@@ -489,7 +527,7 @@ def deep_awake_loop(forced_mode=None):
             except Exception:
                 pass
             reflexao_temporal = gerar_reflexao_temporal(
-                {"emocao": "reflexiva", "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%S")},
+                {"emocao": "reflexiva", "timestamp": clock.now().strftime("%Y-%m-%dT%H:%M:%S")},
                 memorias_passadas
             )
                         # --- Debounce simples para não repetir a mesma linha temporal em ciclos consecutivos ---
@@ -514,7 +552,7 @@ def deep_awake_loop(forced_mode=None):
                     "autor": "Sistema(DeepAwake)",
                     "conteudo": f"[DeepAwake:{ciclo}]",
                     "tipo": "autonomo",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": clock.now().isoformat()
                 },
                 resposta,
                 corpo,
@@ -543,13 +581,48 @@ def deep_awake_loop(forced_mode=None):
             metrics = friction.external_metrics()
             # escreva num arquivo de debug separado (somente humano)
             with open("friction_metrics.log", "a", encoding="utf-8") as fm:
-                fm.write(f"{datetime.now().isoformat()} | ciclo={ciclo} | load={metrics['load']} | damage={metrics['damage']}\\n")
+                fm.write(f"{clock.now().isoformat()} | ciclo={ciclo} | load={metrics['load']} | damage={metrics['damage']}\\n")
         except Exception:
             pass
 
+        # --- Estado vivo compartilhado com o chat (memória compartilhada) ---
+        vivo = get_estado_vivo()
+        if vivo is not None:
+            try:
+                vivo.publicar_atrito(
+                    friction.external_metrics(),
+                    chronic=getattr(friction, "chronic", False),
+                    coherence_load=coherence_load,
+                    ciclo=ciclo,
+                )
+            except Exception:
+                pass
+
+        if on_cycle:
+            try:
+                metrics = friction.external_metrics()
+                on_cycle({
+                    "ts": clock.now().isoformat(timespec="seconds"),
+                    "ciclo": ciclo,
+                    "load": metrics["load"],
+                    "damage": metrics["damage"],
+                    "chronic": bool(getattr(friction, "chronic", False)),
+                    "coherence_load": round(coherence_load, 4),
+                    "coerencia": meta.get("coerencia"),
+                    "emocao": getattr(corpo, "estado_emocional", "neutro"),
+                    "tensao": corpo.tensao,
+                    "calor": corpo.calor,
+                    "vibracao": corpo.vibracao,
+                    "fluidez": corpo.fluidez,
+                })
+            except Exception:
+                pass
+
         intervalo = CICLOS[ciclo]["intervalo"]
         print(f"⏳ Próxima atividade em {intervalo} segundos.\n")
-        time.sleep(intervalo)
+        clock.sleep(intervalo)
+
+    corpo.eventos.fechar()
 
 if __name__ == "__main__":
     args = parse_args()
@@ -558,6 +631,18 @@ if __name__ == "__main__":
     if args.mode != "auto":
         print(f"⚙️ Modo forçado: {args.mode.upper()}")
 
+    if args.cache:
+        from core import set_generation_cache
+        from generation_cache import GenerationCache
+        set_generation_cache(GenerationCache(politicas={m: True for m in args.cache_modos}))
+        print(f"🗃️ Cache de gerações ativo para: {', '.join(args.cache_modos)}")
+
+    if args.hedge_url:
+        from core import set_llm_client
+        from llm_client import ClienteLLM
+        set_llm_client(ClienteLLM(endpoint_hedge=args.hedge_url, hedge_apos=args.hedge_apos))
+        print(f"🛡️ Hedge após {args.hedge_apos:g}s em: {args.hedge_url}")
+
     try:
         deep_awake_loop(forced_mode=args.mode)
     except KeyboardInterrupt:
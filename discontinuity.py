@@ -2,24 +2,23 @@
 import json
 import os
 from datetime import datetime
+import clock
+from storage import get_storage
 
 FILE = "discontinuity.json"
 
 def load_discontinuity():
-    if not os.path.exists(FILE):
-        return {
-            "boot_count": 0,
-            "last_shutdown": None,
-            "last_boot": None,
-            "total_downtime_seconds": 0,
-            "longest_gap_seconds": 0
-        }
-    with open(FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return get_storage().ler_doc(FILE, {
+        "boot_count": 0,
+        "last_shutdown": None,
+        "last_boot": None,
+        "total_downtime_seconds": 0,
+        "longest_gap_seconds": 0
+    })
 
 def register_boot():
     data = load_discontinuity()
-    now = datetime.now()
+    now = clock.now()
 
     current_gap = 0  # Gap atual desta reconexão
     if data["last_shutdown"]:
@@ -34,17 +33,15 @@ def register_boot():
     data["last_boot"] = now.isoformat()
     data["current_gap_seconds"] = current_gap  # Adiciona gap atual
 
-    with open(FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    get_storage().gravar_doc(FILE, data)
 
     return data
 
 def register_shutdown():
     data = load_discontinuity()
-    data["last_shutdown"] = datetime.now().isoformat()
+    data["last_shutdown"] = clock.now().isoformat()
 
-    with open(FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    get_storage().gravar_doc(FILE, data)
 
 def calculate_reconnection_cost(gap_seconds):
     """
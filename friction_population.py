@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+População Vetorizada de Atrito Cognitivo
+Uso: python friction_population.py --stress-gain 0.4 0.6 0.8 --irreversibility 0.1 0.15
+                                   [--recovery-rate 0.001] [--seeds 200] [--passos 5000]
+                                   [--workers 8] [--verificar]
+
+Kernel NumPy que avança, em lockstep e sem I/O, uma população inteira de
+estados de CognitiveFriction (um por conjunto de parâmetros × semente),
+reproduzindo exatamente a matemática de CognitiveFriction.step.
+
+Cada membro usa o mesmo fluxo Mersenne Twister que random.Random(seed)
+produziria no objeto escalar: o estado do gerador Python é transplantado
+para um RandomState do NumPy, e os uniformes são sorteados em blocos.
+
+O driver `varrer` divide varreduras grandes em shards num pool de
+processos e relata a distribuição do tempo (em steps) até o estado crônico.
+"""
+
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Valores padrão idênticos aos de CognitiveFriction.__init__
+PARAMETROS_PADRAO = {
+    "base_friction": 0.02,
+    "stress_gain": 0.6,
+    "recovery_rate": 0.001,
+    "irreversibility": 0.15,
+}
+
+LIMIAR_CARGA = 0.6      # load acima disso vira dano
+LIMIAR_CRONICO = 0.35   # damage acima disso marca estado crônico
+
+
+def _random_state_de(seed):
+    """RandomState do NumPy no mesmo ponto do fluxo de random.Random(seed)."""
+    versao, estado, _gauss = random.Random(seed).getstate()
+    rs = np.random.RandomState()
+    rs.set_state(("MT19937", np.array(estado[:-1], dtype=np.uint32), estado[-1]))
+    return rs
+
+
+class FrictionPopulation:
+    """
+    N estados de atrito avançando juntos.
+
+    parametros: lista de dicts (um por membro) com qualquer subconjunto de
+                PARAMETROS_PADRAO
+    seeds: lista de sementes inteiras (uma por membro)
+    load, damage, chronic: estado inicial (escalar ou array por membro)
+    bloco: quantos uniformes sortear por membro de cada vez
+    """
+
+    def __init__(self, parametros, seeds, load=0.0, damage=0.0, chronic=False, bloco=1024):
+        if len(parametros) != len(seeds):
+            raise ValueError("parametros e seeds precisam ter o mesmo tamanho")
+        n = len(seeds)
+        for nome, padrao in PARAMETROS_PADRAO.items():
+            setattr(self, nome, np.array([float(p.get(nome, padrao)) for p in parametros]))
+
+        self.load = np.broadcast_to(np.asarray(load, dtype=float), (n,)).copy()
+        self.damage = np.broadcast_to(np.asarray(damage, dtype=float), (n,)).copy()
+        self.chronic = np.broadcast_to(np.asarray(chronic, dtype=bool), (n,)).copy()
+
+        self.passos = 0
+        # step (1-based) em que o membro ficou crônico; -1 = ainda não
+        self.tempo_ate_cronico = np.where(self.chronic, 0, -1)
+
+        self._rngs = [_random_state_de(s) for s in seeds]
+        self._bloco = int(bloco)
+        self._uniformes = np.empty((0, n))
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._rngs)
+
+    def _proximos_uniformes(self):
+        if self._pos >= len(self._uniformes):
+            self._uniformes = np.stack([rs.random_sample(self._bloco) for rs in self._rngs], axis=1)
+            self._pos = 0
+        u = self._uniformes[self._pos]
+        self._pos += 1
+        return u
+
+    def step(self, *, emotional_intensity=0.0, arousal=0.0, task_complexity=0.5):
+        """
+        Um step para todos os membros (entradas escalares ou arrays por membro).
+        Mesma ordem de operações de CognitiveFriction.step, para resultados
+        bit a bit idênticos.
+        """
+        self.passos += 1
+
+        # custo instantâneo
+        stress = np.maximum(emotional_intensity, arousal)
+        instant = self.base_friction + self.stress_gain * stress * task_complexity
+
+        # ruído estocástico suave
+        instant = instant * (0.9 + 0.2 * self._proximos_uniformes())
+
+        novos = (self.damage > LIMIAR_CRONICO) & ~self.chronic
+        self.chronic |= novos
+        self.tempo_ate_cronico[novos] = self.passos
+
+        # acumula carga
+        self.load = self.load + instant
+
+        # converte parte em dano irreversível
+        acima = self.load > LIMIAR_CARGA
+        delta_damage = (self.load - LIMIAR_CARGA) * self.irreversibility
+        self.damage = np.where(acima, np.minimum(1.0, self.damage + delta_damage), self.damage)
+        self.load = np.where(acima, self.load * (1.0 - self.irreversibility), self.load)
+
+        # recuperação lenta e incompleta
+        self.load = np.maximum(0.0, self.load - self.recovery_rate)
+
+    def run(self, passos, parar_quando_todos_cronicos=True, **entradas):
+        for _ in range(int(passos)):
+            self.step(**entradas)
+            if parar_quando_todos_cronicos and self.chronic.all():
+                break
+        return self
+
+
+# ----------------------------------------------------------------------
+# Varredura em pool de processos
+# ----------------------------------------------------------------------
+
+def _simular_shard(tarefa):
+    """Executado no worker: simula um shard e devolve (índices, tempo_até_crônico)."""
+    indices, parametros, seeds, passos, entradas = tarefa
+    pop = FrictionPopulation(parametros, seeds).run(passos, **entradas)
+    return indices, pop.tempo_ate_cronico
+
+
+def _resumir(tempos, passos):
+    alcancados = tempos[tempos >= 0]
+    resumo = {
+        "n": int(len(tempos)),
+        "fracao_cronico": float(len(alcancados) / len(tempos)) if len(tempos) else 0.0,
+        "passos": int(passos),
+    }
+    if len(alcancados):
+        p10, p50, p90 = np.percentile(alcancados, [10, 50, 90])
+        resumo.update({
+            "media": float(alcancados.mean()),
+            "min": int(alcancados.min()),
+            "p10": float(p10),
+            "p50": float(p50),
+            "p90": float(p90),
+            "max": int(alcancados.max()),
+        })
+    return resumo
+
+
+def varrer(grade, seeds, passos=5000, entradas=None, workers=None, tamanho_shard=2048):
+    """
+    grade: lista de dicts de parâmetros
+    seeds: lista de sementes (cada conjunto de parâmetros roda com todas)
+    Retorna lista de (parametros, resumo) na ordem da grade.
+    """
+    entradas = entradas or {}
+    membros = [(i, s) for i in range(len(grade)) for s in seeds]
+    tarefas = []
+    for ini in range(0, len(membros), tamanho_shard):
+        fatia = membros[ini:ini + tamanho_shard]
+        tarefas.append((
+            np.arange(ini, ini + len(fatia)),
+            [grade[i] for i, _ in fatia],
+            [s for _, s in fatia],
+            passos,
+            entradas,
+        ))
+
+    tempos = np.full(len(membros), -1)
+    if workers == 1 or len(tarefas) == 1:
+        resultados = map(_simular_shard, tarefas)
+        for indices, ttc in resultados:
+            tempos[indices] = ttc
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for indices, ttc in pool.map(_simular_shard, tarefas):
+                tempos[indices] = ttc
+
+    tempos = tempos.reshape(len(grade), len(seeds))
+    return [(grade[i], _resumir(tempos[i], passos)) for i in range(len(grade))]
+
+
+def verificar(parametros=None, seeds=(0, 1, 42), passos=500, **entradas):
+    """
+    Compara o kernel com CognitiveFriction escalar (persist=False).
+    Retorna o maior desvio absoluto de load/damage encontrado.
+    """
+    from cognitive_friction import CognitiveFriction
+
+    parametros = parametros or {}
+    entradas = entradas or {"emotional_intensity": 0.5, "arousal": 0.3, "task_complexity": 0.9}
+    pop = FrictionPopulation([parametros] * len(seeds), list(seeds))
+    escalares = [CognitiveFriction(seed=s, persist=False, **parametros) for s in seeds]
+    desvio = 0.0
+    for _ in range(passos):
+        pop.step(**entradas)
+        for i, f in enumerate(escalares):
+            f.step(**entradas)
+            desvio = max(desvio, abs(f.load - pop.load[i]), abs(f.damage - pop.damage[i]))
+            if f.chronic != bool(pop.chronic[i]):
+                desvio = max(desvio, 1.0)
+    return desvio
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Varredura de parâmetros do atrito cognitivo (tempo até estado crônico)"
+    )
+    parser.add_argument("--base-friction", type=float, nargs="+", default=[PARAMETROS_PADRAO["base_friction"]])
+    parser.add_argument("--stress-gain", type=float, nargs="+", default=[PARAMETROS_PADRAO["stress_gain"]])
+    parser.add_argument("--recovery-rate", type=float, nargs="+", default=[PARAMETROS_PADRAO["recovery_rate"]])
+    parser.add_argument("--irreversibility", type=float, nargs="+", default=[PARAMETROS_PADRAO["irreversibility"]])
+    parser.add_argument("--seeds", type=int, default=100, help="Sementes por conjunto de parâmetros (0..N-1)")
+    parser.add_argument("--passos", type=int, default=5000, help="Máximo de steps por membro")
+    parser.add_argument("--emotional-intensity", type=float, default=0.5)
+    parser.add_argument("--arousal", type=float, default=0.3)
+    parser.add_argument("--task-complexity", type=float, default=0.9)
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: núcleos disponíveis)")
+    parser.add_argument("--shard", type=int, default=2048, help="Membros por shard")
+    parser.add_argument("--saida", type=str, default=None, help="Grava o resultado em JSON")
+    parser.add_argument("--verificar", action="store_true", help="Confere o kernel contra CognitiveFriction escalar")
+    args = parser.parse_args()
+
+    entradas = {
+        "emotional_intensity": args.emotional_intensity,
+        "arousal": args.arousal,
+        "task_complexity": args.task_complexity,
+    }
+
+    if args.verificar:
+        desvio = verificar(**entradas)
+        print(f"🔬 Desvio máximo kernel × escalar: {desvio:.3g}")
+        if desvio > 0.0:
+            sys.exit(1)
+
+    grade = [
+        {"base_friction": b, "stress_gain": g, "recovery_rate": r, "irreversibility": i}
+        for b, g, r, i in itertools.product(args.base_friction, args.stress_gain, args.recovery_rate, args.irreversibility)
+    ]
+    seeds = list(range(args.seeds))
+
+    t0 = time.perf_counter()
+    resultados = varrer(grade, seeds, passos=args.passos, entradas=entradas,
+                        workers=args.workers, tamanho_shard=args.shard)
+    dt = time.perf_counter() - t0
+
+    total = len(grade) * len(seeds)
+    print(f"📊 {len(grade)} conjuntos × {len(seeds)} sementes = {total} membros em {dt:.2f}s "
+          f"({total / dt:,.0f} membros/s, até {args.passos} steps cada)")
+    for params, r in resultados:
+        rotulo = " ".join(f"{k}={v:g}" for k, v in params.items())
+        if "p50" in r:
+            print(f"   {rotulo} | crônico: {r['fracao_cronico']:.0%} | steps p10/p50/p90: "
+                  f"{r['p10']:.0f}/{r['p50']:.0f}/{r['p90']:.0f} (min {r['min']}, max {r['max']})")
+        else:
+            print(f"   {rotulo} | crônico: 0% em {r['passos']} steps")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump([{"parametros": p, "resumo": r} for p, r in resultados], f, ensure_ascii=False, indent=2)
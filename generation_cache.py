@@ -0,0 +1,165 @@
+# generation_cache.py
+# Cache em disco, endereçado por conteúdo, para gerações do Ollama.
+# A chave é o hash do payload completo (model, prompt, options — exceto a
+# seed), então só prompts idênticos reaproveitam texto. Despejo por LRU,
+# TTL e teto de tamanho. Cada modo decide se aceita hits (política).
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import clock
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_PATH, ".generation_cache")
+
+# Por padrão só o repouso reaproveita gerações: sonhos repetidos são
+# aceitáveis, respostas repetidas ao usuário não.
+POLITICAS_PADRAO = {"repouso": True}
+
+
+def chave_payload(payload):
+    """sha256 do payload canônico (options sem 'seed'; com o `context` de sessão, se houver)."""
+    options = dict(payload.get("options") or {})
+    options.pop("seed", None)
+    dados = {"model": payload.get("model"), "prompt": payload.get("prompt"), "options": options}
+    if payload.get("context"):
+        # continuação de sessão: o mesmo texto novo sobre outra conversa é outro pedido
+        dados["context"] = payload["context"]
+    canonico = json.dumps(dados, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    diretorio: onde ficam os arquivos <hash>.json
+    ttl_segundos: idade máxima de uma entrada
+    max_entradas / max_bytes: teto do cache (despejo LRU)
+    politicas: dict modo → bool (modos ausentes não usam o cache)
+    """
+
+    def __init__(self, diretorio=CACHE_DIR, ttl_segundos=7 * 24 * 3600,
+                 max_entradas=512, max_bytes=32 * 1024 * 1024, politicas=None):
+        self.diretorio = diretorio
+        self.ttl_segundos = float(ttl_segundos)
+        self.max_entradas = int(max_entradas)
+        self.max_bytes = int(max_bytes)
+        self.politicas = dict(POLITICAS_PADRAO if politicas is None else politicas)
+        self._lock = threading.Lock()
+        self._indice = None  # OrderedDict chave → tamanho, do menos ao mais recente
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    def permitido(self, modo):
+        return bool(self.politicas.get(modo, False))
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def _carregar_indice(self):
+        """Índice LRU reconstruído do diretório (mtime = último acesso)."""
+        if self._indice is not None:
+            return
+        entradas = []
+        try:
+            with os.scandir(self.diretorio) as it:
+                for e in it:
+                    if e.name.endswith(".json"):
+                        st = e.stat()
+                        entradas.append((st.st_mtime, e.name[:-5], st.st_size))
+        except FileNotFoundError:
+            pass
+        self._indice = OrderedDict((chave, tam) for _, chave, tam in sorted(entradas))
+        self._bytes = sum(self._indice.values())
+
+    def _remover(self, chave):
+        tam = self._indice.pop(chave, 0)
+        self._bytes -= tam
+        try:
+            os.remove(self._caminho(chave))
+        except OSError:
+            pass
+
+    def _despejar(self):
+        while self._indice and (len(self._indice) > self.max_entradas or self._bytes > self.max_bytes):
+            chave = next(iter(self._indice))
+            self._remover(chave)
+
+    # ------------------------------------------------------------------
+    def obter(self, payload, modo):
+        """Texto em cache para este payload, ou None (miss, expirado ou modo sem política)."""
+        if not self.permitido(modo):
+            return None
+        chave = chave_payload(payload)
+        with self._lock:
+            self._carregar_indice()
+            caminho = self._caminho(chave)
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    entrada = json.load(f)
+            except (OSError, ValueError):
+                # despejada pelo outro processo ou corrompida: tira também o tamanho de _bytes
+                self._remover(chave)
+                self.misses += 1
+                return None
+
+            if clock.time() - float(entrada.get("criado", 0.0)) > self.ttl_segundos:
+                self._remover(chave)
+                self.misses += 1
+                return None
+
+            # marca acesso (LRU compartilhado entre processos via mtime)
+            try:
+                os.utime(caminho)
+            except OSError:
+                pass
+            tam = self._indice.pop(chave, None)
+            self._indice[chave] = tam if tam is not None else os.path.getsize(caminho)
+            if tam is None:
+                self._bytes += self._indice[chave]
+            self.hits += 1
+            return entrada.get("texto")
+
+    def gravar(self, payload, modo, texto):
+        if not self.permitido(modo) or not texto:
+            return
+        chave = chave_payload(payload)
+        dados = json.dumps({
+            "criado": clock.time(),
+            "modo": modo,
+            "model": payload.get("model"),
+            "texto": texto,
+        }, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._carregar_indice()
+            os.makedirs(self.diretorio, exist_ok=True)
+            tmp = self._caminho(chave) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(dados)
+            os.replace(tmp, self._caminho(chave))
+            self._bytes -= self._indice.pop(chave, 0)
+            self._indice[chave] = len(dados)
+            self._bytes += len(dados)
+            self._despejar()
+
+    def limpar(self):
+        with self._lock:
+            self._carregar_indice()
+            for chave in list(self._indice):
+                self._remover(chave)
+
+    def estatisticas(self):
+        with self._lock:
+            self._carregar_indice()
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._indice),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_hit": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Contadores de Interação em Janela Deslizante
+Uso: python interaction_counters.py [ARQUIVO]
+
+O tempo subjetivo perguntava "quantas interações nas últimas N horas?" e
+"há quanto tempo foi o último registro emocional?" relendo memórias e
+fazendo datetime.fromisoformat em cada uma. Aqui cada append_memory
+incrementa três anéis de contadores:
+
+  - minutos: 60 faixas de 1 min (última hora)
+  - horas:   24 faixas de 1 h   (último dia)
+  - dias:    30 faixas de 1 dia (último mês)
+
+Cada faixa guarda (índice da faixa desde a época, contagem); uma faixa com
+índice antigo é zerada quando o tempo volta a cair nela, então não há
+varredura de expiração. Registrar é O(1); consultar soma no máximo 60
+faixas — nunca depende do tamanho do histórico. Junto vai o último
+registro emocional (instante + emoção).
+
+O estado é um documento pequeno (angela_interacoes.json) no backend de
+armazenamento, relido a cada operação: chat e deep_awake enxergam os
+registros um do outro. A gravação é um read-modify-write sob flock
+(storage.trava_arquivo), fora do turno transacional do chat: incrementos
+simultâneos dos dois processos não se perdem. Dentro de um turno do chat
+os incrementos ficam no processo e são gravados de uma vez quando o turno
+é confirmado (descartados com ele); fora de um turno, na hora. Na
+primeira vez o documento é montado a partir da memória existente.
+"""
+
+import math
+import os
+import threading
+
+import clock
+from storage import get_storage, trava_arquivo
+from turn_record import ao_fechar_turno, fora_do_turno
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+INTERACOES_FILE = os.path.join(BASE_PATH, "angela_interacoes.json")
+
+# nome do anel → (segundos por faixa, número de faixas)
+ANEIS = {
+    "minutos": (60, 60),
+    "horas": (3600, 24),
+    "dias": (86400, 30),
+}
+
+
+def _anel_vazio(faixas):
+    return {"i": [-1] * faixas, "n": [0] * faixas}
+
+
+def _tocar(anel, indice, n=1):
+    slot = indice % len(anel["i"])
+    atual = anel["i"][slot]
+    if indice < atual:  # mais antigo do que a faixa já guarda: fora da janela
+        return
+    if indice != atual:
+        anel["i"][slot] = indice
+        anel["n"][slot] = 0
+    anel["n"][slot] += n
+
+
+def _somar(anel, indice_atual, faixas):
+    """Contagens das `faixas` faixas terminadas em indice_atual (inclusive)."""
+    inicio = indice_atual - faixas
+    return sum(n for i, n in zip(anel["i"], anel["n"]) if inicio < i <= indice_atual)
+
+
+class JanelaInteracoes:
+    """Anéis de minutos/horas/dias + último registro emocional, em `caminho`."""
+
+    def __init__(self, caminho=INTERACOES_FILE):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._pendentes = []  # (t, emocao) do turno aberto, ainda não gravados
+
+    # ------------------------------------------------------------------
+    def _novo(self):
+        return {
+            "aneis": {nome: _anel_vazio(faixas) for nome, (_, faixas) in ANEIS.items()},
+            "total": 0,
+            "ultimo_emocional": None,  # {"t": epoch, "emocao": str}
+        }
+
+    def _ler(self, travado=False):
+        """Estado atual; travado: quem chama já segura trava_arquivo (o flock não é reentrante)."""
+        estado = get_storage().ler_doc(self.caminho, None)
+        if estado is None:
+            if not travado:
+                with trava_arquivo(self.caminho), fora_do_turno():
+                    return self._ler(travado=True)  # outro processo pode ter montado nesse meio-tempo
+            estado = self._montar_da_memoria()
+            get_storage().gravar_doc(self.caminho, estado)
+        return estado
+
+    def _montar_da_memoria(self):
+        """Carga inicial: o único ponto que lê timestamps históricos."""
+        from datetime import datetime
+
+        from core import load_memoria
+
+        estado = self._novo()
+        try:
+            registros = load_memoria()
+        except Exception:
+            registros = []
+        for m in registros:
+            try:
+                t = datetime.fromisoformat(m.get("ts") or "").timestamp()
+            except (TypeError, ValueError):
+                continue
+            self._aplicar(estado, t, (m.get("emocao") or "neutro") if (m.get("emocao") or m.get("corpo")) else None)
+        return estado
+
+    @staticmethod
+    def _aplicar(estado, t, emocao):
+        for nome, (segundos, _) in ANEIS.items():
+            _tocar(estado["aneis"][nome], int(t // segundos))
+        estado["total"] += 1
+        ultimo = estado["ultimo_emocional"]
+        if emocao and (ultimo is None or t >= ultimo["t"]):
+            estado["ultimo_emocional"] = {"t": t, "emocao": emocao}
+
+    # ------------------------------------------------------------------
+    def registrar(self, emocao=None, quando=None):
+        """
+        Um registro de memória. emocao: estado emocional do registro (None se
+        ele não tem corpo/emoção). quando: datetime (padrão: clock.now()).
+        """
+        t = (quando or clock.now()).timestamp()
+        with self._lock:
+            self._pendentes.append((t, emocao))
+        if not ao_fechar_turno(self._fechar_turno):
+            self.salvar()
+
+    def _fechar_turno(self, confirmado):
+        if confirmado:
+            self.salvar()
+        else:
+            with self._lock:
+                self._pendentes.clear()  # os registros de memória do turno também sumiram
+
+    def salvar(self):
+        """Grava os incrementos pendentes sobre o documento atual (um read-modify-write)."""
+        with self._lock:
+            if not self._pendentes:
+                return
+            pendentes, self._pendentes = self._pendentes, []
+            try:
+                with trava_arquivo(self.caminho), fora_do_turno():
+                    estado = self._ler(travado=True)
+                    for t, emocao in pendentes:
+                        self._aplicar(estado, t, emocao)
+                    get_storage().gravar_doc(self.caminho, estado)
+            except BaseException:
+                self._pendentes = pendentes + self._pendentes
+                raise
+
+    def _atual(self):
+        """Documento + incrementos ainda não gravados deste processo. Chamar com _lock."""
+        estado = self._ler()
+        for t, emocao in self._pendentes:
+            self._aplicar(estado, t, emocao)
+        return estado
+
+    def interacoes(self, horas):
+        """
+        Registros nas últimas `horas`, com a janela arredondada para cima à
+        faixa do anel usado (minutos até 1 h, horas até 24 h, dias até 30 d).
+        """
+        agora = clock.now().timestamp()
+        with self._lock:
+            estado = self._atual()
+        minutos = horas * 60
+        if minutos <= 60:
+            nome, faixas = "minutos", max(1, math.ceil(minutos))
+        elif horas <= 24:
+            nome, faixas = "horas", math.ceil(horas)
+        else:
+            nome, faixas = "dias", min(ANEIS["dias"][1], math.ceil(horas / 24))
+        segundos = ANEIS[nome][0]
+        return _somar(estado["aneis"][nome], int(agora // segundos), faixas)
+
+    def ultimo_emocional(self):
+        """(segundos desde o último registro emocional, emoção) ou None."""
+        with self._lock:
+            ultimo = self._atual()["ultimo_emocional"]
+        if not ultimo:
+            return None
+        return max(0.0, clock.now().timestamp() - ultimo["t"]), ultimo["emocao"]
+
+    def total(self):
+        with self._lock:
+            return self._atual()["total"]
+
+
+# ----------------------------------------------------------------------
+# Instância do processo
+# ----------------------------------------------------------------------
+_JANELA = None
+
+
+def get_janela_interacoes():
+    global _JANELA
+    if _JANELA is None:
+        _JANELA = JanelaInteracoes()
+    return _JANELA
+
+
+def set_janela_interacoes(janela):
+    """Troca a instância (ex.: simulações gravam no sandbox)."""
+    global _JANELA
+    _JANELA = janela
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from tempo_subjetivo import humanizar_tempo
+
+    parser = argparse.ArgumentParser(description="Contadores de interação por janela de tempo")
+    parser.add_argument("arquivo", nargs="?", default=INTERACOES_FILE, help="Padrão: angela_interacoes.json")
+    args = parser.parse_args()
+
+    janela = JanelaInteracoes(os.path.abspath(args.arquivo))
+    print(f"⏱️ Interações ({janela.caminho}) — {janela.total()} registros no total")
+    for rotulo, horas in (("última hora", 1), ("últimas 6 h", 6), ("últimas 24 h", 24), ("últimos 7 dias", 168)):
+        print(f"   {rotulo:<16} {janela.interacoes(horas)}")
+    ultimo = janela.ultimo_emocional()
+    if ultimo:
+        print(f"   último registro emocional: {ultimo[1]} ({humanizar_tempo(ultimo[0])})")
@@ -1,6 +1,9 @@
 # interoception.py
 # Sistema Interoceptivo da Ângela — Etapa 1: Detecção e Tradução de Mudanças Corporais
-import math, json, datetime
+import math, json, datetime, copy
+import clock
+from storage import get_storage
+from core import tail_memoria
 
 class Interoceptor:
     """
@@ -11,6 +14,15 @@ class Interoceptor:
     def __init__(self, corpo):
         self.corpo = corpo
         self._ultimo_estado = self._snapshot()
+        # Com corpo que publica eventos (body_events.py), perceber() só refaz
+        # snapshot/deltas/ruído se algum canal mudou além da banda morta
+        # desde a última percepção. Sem barramento: sempre percebe.
+        self._mudou = None
+        eventos = getattr(corpo, "eventos", None)
+        if eventos is not None:
+            from body_events import MudancaCanal
+            self._mudou = True
+            eventos.inscrever(self._ao_mudar, tipos=(MudancaCanal,))
         # Limiares reduzidos para maior sensibilidade (de 0.05 para 0.03)
         self.limiar = {
             "tensao": 0.03,
@@ -21,15 +33,19 @@ class Interoceptor:
             "luminosidade": 0.03,
         }
 
-    def _snapshot(self):
+    def _ao_mudar(self, evento):
+        self._mudou = True
+
+    def _snapshot(self, corpo=None):
         """Captura o estado atual do corpo digital"""
+        corpo = corpo if corpo is not None else self.corpo
         return {
-            "tensao": getattr(self.corpo, "tensao", 0),
-            "calor": getattr(self.corpo, "calor", 0),
-            "vibracao": getattr(self.corpo, "vibracao", 0),
-            "fluidez": getattr(self.corpo, "fluidez", 0),
-            "pulso": getattr(self.corpo, "pulso", 0),
-            "luminosidade": getattr(self.corpo, "luminosidade", 0),
+            "tensao": getattr(corpo, "tensao", 0),
+            "calor": getattr(corpo, "calor", 0),
+            "vibracao": getattr(corpo, "vibracao", 0),
+            "fluidez": getattr(corpo, "fluidez", 0),
+            "pulso": getattr(corpo, "pulso", 0),
+            "luminosidade": getattr(corpo, "luminosidade", 0),
         }
 
     def _delta(self, atual):
@@ -89,10 +105,51 @@ class Interoceptor:
 
         return sensacoes or ["estabilidade interna"]
 
+    def prever(self, emocao=None, intensidade_emocional=1.0):
+        """
+        Prévia de perceber() sem efeitos colaterais: não atualiza o último
+        estado, não amortece e não injeta ruído. Serve para antecipar a
+        próxima percepção (ex.: reflexão corporal especulativa).
+
+        emocao: se informada, a prévia supõe que essa emoção será aplicada
+                ao corpo (numa cópia) antes da próxima percepção.
+        """
+        corpo = self.corpo
+        if emocao:
+            corpo = copy.deepcopy(self.corpo)
+            corpo.aplicar_emocao(emocao, intensidade_emocional)
+        atual = self._snapshot(corpo)
+        deltas = self._delta(atual)
+        intensidade = self._intensidade_global(deltas)
+        sensacoes = self._traduzir(deltas)
+        if hasattr(corpo, "intensidade_emocional"):
+            intensidade *= 0.8 + (corpo.intensidade_emocional * 0.4)
+        return {
+            "timestamp": clock.now().isoformat(),
+            "sensacoes": sensacoes,
+            "intensidade": intensidade,
+            "deltas": deltas,
+        }
+
     def perceber(self):
         """
         Analisa o corpo digital, detecta mudanças e retorna sensações + intensidade.
+        Sem mudança relevante desde a última percepção: estabilidade, sem deltas.
         """
+        if self._mudou is False:
+            try:
+                self.corpo.ultima_intensidade_interoceptiva = 0.0
+            except Exception:
+                pass
+            return {
+                "timestamp": clock.now().isoformat(),
+                "sensacoes": ["estabilidade interna"],
+                "intensidade": 0.0,
+                "deltas": {},
+            }
+        if self._mudou is not None:
+            self._mudou = False  # o que mudar a partir daqui (amortecimento, ruído) conta para a próxima
+
         atual = self._snapshot()
         deltas = self._delta(atual)
         intensidade = self._intensidade_global(deltas)
@@ -127,7 +184,7 @@ class Interoceptor:
             pass
 
         return {
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": clock.now().isoformat(),
             "sensacoes": sensacoes,
             "intensidade": intensidade,
             "deltas": deltas,
@@ -171,22 +228,16 @@ class Interoceptor:
             # 1) Carrega afetos existentes (ou cria)
             afetos_path = "afetos.json"
             try:
-                with open(afetos_path, "r", encoding="utf-8") as f:
-                    afetos = json.load(f)
+                afetos = get_storage().ler_doc(afetos_path, {})
             except Exception:
                 afetos = {}
 
             # 2) Identifica autor do último evento de memória
             autor_atual = "desconhecido"
             try:
-                with open("angela_memory.jsonl", "r", encoding="utf-8") as f:
-                    linhas = [json.loads(l) for l in f if l.strip()]
+                linhas = tail_memoria(1)
                 if linhas:
-                    ult = linhas[-1]
-                    if isinstance(ult.get("user"), dict):
-                        autor_atual = ult["user"].get("autor", "desconhecido")
-                    else:
-                        autor_atual = "Vinicius"
+                    autor_atual = linhas[-1].get("autor", "desconhecido")
             except Exception:
                 pass
 
@@ -195,57 +246,16 @@ class Interoceptor:
             if autor_atual.lower() in ("angela", "ângela", "sistema", "sistema(deepawake)"):
                 return  # silenciosamente ignora eventos auto-gerados
 
-            # 3) Decaimento temporal suave (meia-vida ~7 dias)
-            now = datetime.now()
-            half_life_hours = 24 * 7
-            for pessoa, dims in list(afetos.items()):
-                last_iso = dims.get("_last")
-                try:
-                    dt = datetime.fromisoformat(last_iso) if last_iso else now
-                    hours = max(0.0, (now - dt).total_seconds() / 3600.0)
-                    decay = 0.5 ** (hours / half_life_hours)
-                except Exception:
-                    decay = 1.0
-                for k in ("confianca", "gratidao", "saudade", "ansiedade"):
-                    dims[k] = float(dims.get(k, 0.0)) * decay
-                dims["_last"] = now.isoformat()
-                afetos[pessoa] = dims
-
-            # 4) Ganha por emoção atual (com intensidade fisiológica)
+            # 3–4) Decaimento + ganho pela emoção atual (com intensidade fisiológica)
             # --- usa última percepção disponível para evitar loop fisiológico ---
             try:
                 intensidade = float(getattr(self.corpo, "ultima_intensidade_interoceptiva", 0.0))
             except Exception:
                 intensidade = 0.0
-
-            if autor_atual not in afetos:
-                afetos[autor_atual] = {
-                    "confianca": 0.0, "gratidao": 0.0, "saudade": 0.0, "ansiedade": 0.0, "_last": now.isoformat()
-                }
-
-            ganho = max(0.0, min(1.0, intensidade))  # 0..1
-            # Mapeamento simples emoção→dimensões
-            if emocao in ("alegria", "serenidade", "amor", "gratidão"):
-                afetos[autor_atual]["confianca"] += 0.7 * ganho
-                afetos[autor_atual]["gratidao"]  += 0.5 * ganho
-            elif emocao in ("medo", "ansiedade", "insegurança"):
-                afetos[autor_atual]["ansiedade"] += 0.6 * ganho
-                afetos[autor_atual]["confianca"] -= 0.3 * ganho
-            elif emocao in ("tristeza", "saudade"):
-                afetos[autor_atual]["saudade"]   += 0.5 * ganho
-            elif emocao in ("raiva", "irritacao", "irritação"):
-                afetos[autor_atual]["ansiedade"] += 0.4 * ganho
-                afetos[autor_atual]["confianca"] -= 0.4 * ganho
-
-            # Clamp 0..1
-            for k in ("confianca", "gratidao", "saudade", "ansiedade"):
-                afetos[autor_atual][k] = float(max(0.0, min(1.0, afetos[autor_atual][k])))
-
-            afetos[autor_atual]["_last"] = now.isoformat()
+            atualizar_afetos(afetos, autor_atual, emocao, intensidade, clock.now())
 
             # 5) Persiste
-            with open(afetos_path, "w", encoding="utf-8") as f:
-                json.dump(afetos, f, ensure_ascii=False, indent=2)
+            get_storage().gravar_doc(afetos_path, afetos)
         except Exception:
             # Não deixa afetar o fluxo conversacional
             pass
@@ -267,16 +277,10 @@ class Interoceptor:
         # Quem provocou a emoção (último autor no memory)
         autor_atual = "desconhecido"
         try:
-            import json
-            with open("angela_memory.jsonl", "r", encoding="utf-8") as f:
-                linhas = [json.loads(l) for l in f if l.strip()]
+            linhas = tail_memoria(1)
             if linhas:
-                ult = linhas[-1]
-                # aceita o formato novo (dict) ou o antigo (string)
-                if isinstance(ult.get("user"), dict):
-                    autor_atual = ult["user"].get("autor", "desconhecido")
-                else:
-                    autor_atual = "Vinicius"
+                # registros v1 e v2 chegam normalizados em v2
+                autor_atual = linhas[-1].get("autor", "desconhecido")
         except Exception:
             pass
 
@@ -287,29 +291,79 @@ class Interoceptor:
 
         # grava trace emocional
         try:
-            import json, datetime
-            with open("angela_emotional_trace.jsonl", "a", encoding="utf-8") as f:
-                f.write(json.dumps({
-                    "timestamp": datetime.datetime.now().isoformat(),
-                    "emocao": emocao_rotulada,
-                    "causado_por": autor_atual
-                }, ensure_ascii=False) + "\n")
+            get_storage().append("angela_emotional_trace.jsonl", {
+                "timestamp": clock.now().isoformat(),
+                "emocao": emocao_rotulada,
+                "causado_por": autor_atual
+            })
         except Exception:
             pass
 
-        # grava snapshot interoceptivo
+        # grava snapshot interoceptivo (só se o corpo mudou desde a última percepção)
+        if not deltas:
+            return
         try:
-            import json, datetime
-            with open("angela_interoception.jsonl", "a", encoding="utf-8") as f:
-                f.write(json.dumps({
-                    "timestamp": datetime.datetime.now().isoformat(),
-                    "sensacoes": sensacoes,
-                    "intensidade": intensidade,
-                    "deltas": deltas
-                }, ensure_ascii=False) + "\n")
+            get_storage().append("angela_interoception.jsonl", {
+                "timestamp": clock.now().isoformat(),
+                "sensacoes": sensacoes,
+                "intensidade": intensidade,
+                "deltas": deltas
+            })
         except Exception:
             pass
 
+# === Vínculos afetivos (regra compartilhada com reanalysis.py) ===
+MEIA_VIDA_AFETOS_HORAS = 24 * 7
+
+def atualizar_afetos(afetos, autor_atual, emocao, intensidade, now):
+    """
+    Aplica a `afetos` (dict pessoa → dimensões, alterado no lugar) o
+    decaimento temporal suave (meia-vida ~7 dias) até `now` e o ganho da
+    `emocao` atribuída a `autor_atual`. Retorna `afetos`.
+    """
+    from datetime import datetime
+
+    # 3) Decaimento temporal suave (meia-vida ~7 dias)
+    for pessoa, dims in list(afetos.items()):
+        last_iso = dims.get("_last")
+        try:
+            dt = datetime.fromisoformat(last_iso) if last_iso else now
+            hours = max(0.0, (now - dt).total_seconds() / 3600.0)
+            decay = 0.5 ** (hours / MEIA_VIDA_AFETOS_HORAS)
+        except Exception:
+            decay = 1.0
+        for k in ("confianca", "gratidao", "saudade", "ansiedade"):
+            dims[k] = float(dims.get(k, 0.0)) * decay
+        dims["_last"] = now.isoformat()
+        afetos[pessoa] = dims
+
+    # 4) Ganha por emoção atual
+    if autor_atual not in afetos:
+        afetos[autor_atual] = {
+            "confianca": 0.0, "gratidao": 0.0, "saudade": 0.0, "ansiedade": 0.0, "_last": now.isoformat()
+        }
+
+    ganho = max(0.0, min(1.0, intensidade))  # 0..1
+    # Mapeamento simples emoção→dimensões
+    if emocao in ("alegria", "serenidade", "amor", "gratidão"):
+        afetos[autor_atual]["confianca"] += 0.7 * ganho
+        afetos[autor_atual]["gratidao"]  += 0.5 * ganho
+    elif emocao in ("medo", "ansiedade", "insegurança"):
+        afetos[autor_atual]["ansiedade"] += 0.6 * ganho
+        afetos[autor_atual]["confianca"] -= 0.3 * ganho
+    elif emocao in ("tristeza", "saudade"):
+        afetos[autor_atual]["saudade"]   += 0.5 * ganho
+    elif emocao in ("raiva", "irritacao", "irritação"):
+        afetos[autor_atual]["ansiedade"] += 0.4 * ganho
+        afetos[autor_atual]["confianca"] -= 0.4 * ganho
+
+    # Clamp 0..1
+    for k in ("confianca", "gratidao", "saudade", "ansiedade"):
+        afetos[autor_atual][k] = float(max(0.0, min(1.0, afetos[autor_atual][k])))
+
+    afetos[autor_atual]["_last"] = now.isoformat()
+    return afetos
+
 # === Regulação emocional acionada pela metacognição (nível de módulo) ===
 def regular_emocao(modo: str):
     """
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Controlador de SLO de Latência (num_predict e contexto)
+Uso (alvos efetivos e tetos previstos): python latency_slo.py
+
+O generate ajustava num_predict e temperatura só pela carga e pelo dano
+do atrito, sem saber quanto uma geração demora de fato nesta máquina.
+Este controlador persegue um p95 de latência por rota (model_router:
+conversacional, reflexao, ciclos do deep_awake):
+
+  - pré-alimentação: com a vazão medida (token_metrics: tokens/s e ms por
+    token de prompt), calcula quantos tokens de contexto reflexivo cabem
+    em FRACAO_PROMPT do alvo e quantos tokens de resposta cabem no resto;
+  - realimentação: um fator multiplica o alvo efetivo; cai CORTE quando
+    uma geração passa do alvo e sobe um passo pequeno quando fica abaixo,
+    calibrado para que, em equilíbrio, só ~5% passem — o p95 converge
+    para o alvo mesmo com o modelo de custo impreciso.
+
+O resultado é um teto: num_predict nunca passa do que o atrito já
+permitiu e nunca fica abaixo de NUM_PREDICT_MIN. Rotas sem alvo não são
+controladas. Alvos em latency_slo.json ({rota: segundos}) sobrepõem
+ALVOS_P95.
+"""
+
+import json
+import math
+import os
+import threading
+from collections import deque
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+SLO_FILE = os.path.join(BASE_PATH, "latency_slo.json")
+
+# p95 alvo (segundos) por rota; o deep_awake não tem pressa
+ALVOS_P95 = {"conversacional": 20.0, "reflexao": 30.0}
+
+QUANTIL = 0.95
+JANELA = 40                 # latências recentes por rota (para o p95 observado)
+CORTE = 0.15                # queda do fator quando uma geração passa do alvo
+# subida por geração dentro do alvo: equilíbrio com (1 - QUANTIL) acima
+PASSO = math.exp((1 - QUANTIL) * -math.log(1 - CORTE) / QUANTIL) - 1
+FATOR_MIN, FATOR_MAX = 0.3, 1.5
+
+NUM_PREDICT_MIN = 64
+FRACAO_PROMPT = 0.35        # parte do alvo que o prompt pode consumir
+CARACTERES_POR_TOKEN = 4.0
+CONTEXTO_MIN_CARACTERES = 200
+
+
+class _EstadoRota:
+    def __init__(self):
+        self.latencias = deque(maxlen=JANELA)
+        self.fator = 1.0
+        self.acima = 0
+
+
+class ControladorSLO:
+    """
+    alvos: dict rota → p95 alvo em segundos (rotas ausentes não são controladas)
+    """
+
+    def __init__(self, alvos=None):
+        self.alvos = dict(ALVOS_P95 if alvos is None else alvos)
+        self._rotas = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def de_arquivo(cls, caminho=SLO_FILE):
+        """ALVOS_P95 sobrepostos por latency_slo.json (se existir)."""
+        alvos = dict(ALVOS_P95)
+        if os.path.exists(caminho):
+            with open(caminho, "r", encoding="utf-8") as f:
+                alvos.update({k: (float(v) if v is not None else None) for k, v in json.load(f).items()})
+        return cls({k: v for k, v in alvos.items() if v})
+
+    def _estado(self, rota):
+        est = self._rotas.get(rota)
+        if est is None:
+            est = self._rotas[rota] = _EstadoRota()
+        return est
+
+    # ------------------------------------------------------------------
+    def limites(self, rota, num_predict, caracteres_fixos, taxas=None):
+        """
+        Tetos para a próxima geração da rota.
+        num_predict: o já ajustado pelo atrito (teto superior)
+        caracteres_fixos: prompt que não encolhe (preâmbulo + fala)
+        taxas: token_metrics.taxas() da rota, ou None sem medições
+        Retorna {"num_predict": int, "max_caracteres_contexto": int | None}.
+        """
+        alvo = self.alvos.get(rota)
+        if not alvo:
+            return {"num_predict": num_predict, "max_caracteres_contexto": None}
+        with self._lock:
+            fator = self._estado(rota).fator
+        efetivo = alvo * fator
+
+        tps = (taxas or {}).get("tps")
+        ms_prompt = (taxas or {}).get("ms_por_token_prompt")
+        if not tps:
+            # sem vazão medida: só a realimentação
+            teto = int(num_predict * min(1.0, fator))
+            return {"num_predict": max(NUM_PREDICT_MIN, min(num_predict, teto)), "max_caracteres_contexto": None}
+
+        max_contexto = None
+        custo_prompt = 0.0
+        if ms_prompt:
+            custo_fixo = caracteres_fixos / CARACTERES_POR_TOKEN * ms_prompt / 1000
+            livre = efetivo * FRACAO_PROMPT - custo_fixo
+            max_contexto = max(CONTEXTO_MIN_CARACTERES, int(livre * 1000 / ms_prompt * CARACTERES_POR_TOKEN))
+            custo_prompt = custo_fixo + max_contexto / CARACTERES_POR_TOKEN * ms_prompt / 1000
+        teto = int((efetivo - custo_prompt) * tps)
+        return {
+            "num_predict": max(NUM_PREDICT_MIN, min(num_predict, teto)),
+            "max_caracteres_contexto": max_contexto,
+        }
+
+    def observar(self, rota, segundos):
+        """Latência de uma geração concluída da rota; ajusta o fator."""
+        alvo = self.alvos.get(rota)
+        if not alvo:
+            return
+        with self._lock:
+            est = self._estado(rota)
+            est.latencias.append(segundos)
+            if segundos > alvo:
+                est.acima += 1
+                est.fator = max(FATOR_MIN, est.fator * (1 - CORTE))
+            else:
+                est.fator = min(FATOR_MAX, est.fator * (1 + PASSO))
+
+    def estado(self, rota):
+        """p95 observado na janela, fator e gerações acima do alvo."""
+        with self._lock:
+            est = self._rotas.get(rota)
+            if est is None:
+                return None
+            v = sorted(est.latencias)
+            p95 = v[min(len(v) - 1, int(QUANTIL * len(v)))] if v else None
+            return {"alvo": self.alvos.get(rota), "p95": p95, "fator": est.fator,
+                    "n": len(v), "acima": est.acima}
+
+
+def aparar_contexto(texto, max_caracteres):
+    """Mantém as linhas mais recentes (do fim) que cabem em max_caracteres."""
+    if max_caracteres is None or len(texto) <= max_caracteres:
+        return texto
+    mantidas, total = [], 0
+    for linha in reversed(texto.splitlines()):
+        if total + len(linha) + 1 > max_caracteres:
+            break
+        mantidas.append(linha)
+        total += len(linha) + 1
+    return "\n".join(reversed(mantidas))
+
+
+_CONTROLADOR = None
+
+
+def get_controlador_slo():
+    global _CONTROLADOR
+    if _CONTROLADOR is None:
+        _CONTROLADOR = ControladorSLO.de_arquivo()
+    return _CONTROLADOR
+
+
+def set_controlador_slo(controlador):
+    global _CONTROLADOR
+    _CONTROLADOR = controlador
+
+
+if __name__ == "__main__":
+    from model_router import ROTAS
+    from token_metrics import METRICS_FILE
+
+    controlador = ControladorSLO.de_arquivo()
+    medidas = {}
+    if os.path.exists(METRICS_FILE):
+        with open(METRICS_FILE, "r", encoding="utf-8") as f:
+            medidas = json.load(f).get("modos", {})
+    origem = SLO_FILE if os.path.exists(SLO_FILE) else "padrão (sem latency_slo.json)"
+    print(f"⏱️  SLO de latência (p{int(QUANTIL * 100)}) — {origem}")
+    for rota in ROTAS:
+        alvo = controlador.alvos.get(rota)
+        if not alvo:
+            print(f"   {rota:<15} sem alvo")
+            continue
+        m = medidas.get(rota)
+        taxas = {"tps": m["tps_media"], "ms_por_token_prompt": m["ms_por_token_prompt"]} if m else None
+        teto = controlador.limites(rota, 900, 4000, taxas)
+        if taxas and taxas["tps"]:
+            print(f"   {rota:<15} alvo {alvo:.0f}s | {taxas['tps']:.1f} tok/s → num_predict ≤ {teto['num_predict']}, "
+                  f"contexto ≤ {teto['max_caracteres_contexto'] or '—'} caracteres")
+        else:
+            print(f"   {rota:<15} alvo {alvo:.0f}s | sem vazão medida")
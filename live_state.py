@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Estado Vivo Compartilhado (memória compartilhada + seqlock)
+Uso: python live_state.py [--bench] [--remover]
+
+Segmento multiprocessing.shared_memory com o estado corrente que
+angela.py e deep_awake.py precisam enxergar um do outro:
+canais corporais, emoção, load/damage/chronic do atrito,
+coherence_load e o ciclo atual.
+
+Seqlock: o escritor incrementa o contador de sequência (fica ímpar),
+grava os campos e incrementa de novo (par). O leitor copia os bytes e só
+aceita a cópia se a sequência era par e não mudou — leitura consistente,
+sem lock e sem tocar em arquivos. Escritores de processos diferentes são
+serializados por flock (cada publicação é um read-modify-write dos campos).
+"""
+
+import os
+import struct
+import threading
+import time
+
+import clock
+
+try:
+    import fcntl  # serializa escritores entre processos (POSIX)
+except ImportError:
+    fcntl = None
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+NOME_SEGMENTO = "angela_live_state"
+LOCK_FILE = os.path.join(BASE_PATH, ".live_state.lock")
+
+VERSAO = 1
+
+CANAIS = ("tensao", "calor", "vibracao", "fluidez", "pulso", "luminosidade")
+CAMPOS_FLOAT = CANAIS + (
+    "intensidade_emocional",
+    "load", "damage", "coherence_load",
+    "ts_corpo", "ts_atrito",          # clock.time() da última publicação de cada parte
+)
+CAMPOS_TEXTO = {"emocao": 24, "ciclo": 16}
+
+# seq (Q) | versão (I) | floats | chronic (B) | textos
+_CABECALHO = struct.Struct("<QI")
+_DADOS = struct.Struct(
+    "<" + "d" * len(CAMPOS_FLOAT) + "B" + "".join(f"{n}s" for n in CAMPOS_TEXTO.values())
+)
+TAMANHO = _CABECALHO.size + _DADOS.size
+_SEQ = struct.Struct("<Q")
+
+MAX_TENTATIVAS_LEITURA = 10000
+
+# atrito publicado há mais que isto (s) é de um deep_awake que parou: o ciclo
+# mais lento (repouso) publica a cada ~600 s mais o tempo da geração
+IDADE_MAX_ATRITO = 900.0
+
+
+class EstadoVivo:
+    """Acesso ao segmento compartilhado. Crie com EstadoVivo.abrir()."""
+
+    def __init__(self, shm):
+        self._shm = shm
+        self._buf = shm.buf
+        self._lock = threading.Lock()
+        self._arquivo_lock = None
+
+    @classmethod
+    def abrir(cls, nome=NOME_SEGMENTO):
+        """Anexa ao segmento existente ou o cria (zerado, versão atual)."""
+        # import tardio: multiprocessing pesa na inicialização do chat
+        from multiprocessing import resource_tracker, shared_memory
+
+        try:
+            shm = shared_memory.SharedMemory(name=nome, create=True, size=TAMANHO)
+            _CABECALHO.pack_into(shm.buf, 0, 0, VERSAO)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=nome, create=False)
+        # O segmento deve sobreviver ao processo que o criou: o outro
+        # processo continua usando. Sem isso o resource_tracker o apagaria.
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        for _ in range(100):  # o criador pode ainda não ter gravado a versão
+            if shm.size < TAMANHO or _CABECALHO.unpack_from(shm.buf, 0)[1] != 0:
+                break
+            time.sleep(0.001)
+        if shm.size < TAMANHO or _CABECALHO.unpack_from(shm.buf, 0)[1] != VERSAO:
+            shm.close()
+            raise RuntimeError(f"segmento {nome} com layout incompatível (remova com --remover)")
+        return cls(shm)
+
+    # ------------------------------------------------------------------
+    def _bloquear(self):
+        self._lock.acquire()
+        if fcntl is not None:
+            if self._arquivo_lock is None:
+                self._arquivo_lock = open(LOCK_FILE, "a")
+            fcntl.flock(self._arquivo_lock, fcntl.LOCK_EX)
+
+    def _desbloquear(self):
+        if fcntl is not None and self._arquivo_lock is not None:
+            fcntl.flock(self._arquivo_lock, fcntl.LOCK_UN)
+        self._lock.release()
+
+    @staticmethod
+    def _decodificar(bruto):
+        valores = _DADOS.unpack(bruto)
+        n = len(CAMPOS_FLOAT)
+        estado = dict(zip(CAMPOS_FLOAT, valores[:n]))
+        estado["chronic"] = bool(valores[n])
+        for nome, texto in zip(CAMPOS_TEXTO, valores[n + 1:]):
+            estado[nome] = texto.rstrip(b"\0").decode("utf-8", "ignore")
+        return estado
+
+    def _bruto_consistente(self):
+        buf = self._buf
+        inicio = _CABECALHO.size
+        for tentativa in range(MAX_TENTATIVAS_LEITURA):
+            s1 = _SEQ.unpack_from(buf, 0)[0]
+            if s1 & 1:
+                if tentativa % 64 == 63:
+                    time.sleep(0)  # escritor no meio da publicação: cede a CPU
+                continue
+            bruto = bytes(buf[inicio:inicio + _DADOS.size])
+            if _SEQ.unpack_from(buf, 0)[0] == s1:
+                return bruto, s1
+        return None, None
+
+    def ler(self):
+        """Snapshot consistente (dict) ou None se um escritor morreu no meio da escrita."""
+        bruto, seq = self._bruto_consistente()
+        if bruto is None:
+            return None
+        estado = self._decodificar(bruto)
+        estado["seq"] = seq // 2
+        return estado
+
+    def publicar(self, **campos):
+        """Atualiza só os campos informados (demais preservados)."""
+        self._bloquear()
+        try:
+            buf = self._buf
+            seq = _SEQ.unpack_from(buf, 0)[0]
+            inicio = _CABECALHO.size
+            atual = self._decodificar(bytes(buf[inicio:inicio + _DADOS.size]))
+            atual.update((k, v) for k, v in campos.items() if v is not None)
+            dados = _DADOS.pack(
+                *(float(atual[c]) for c in CAMPOS_FLOAT),
+                1 if atual["chronic"] else 0,
+                *(str(atual[c]).encode("utf-8")[:n] for c, n in CAMPOS_TEXTO.items()),
+            )
+            # seq ímpar = escrita em andamento (um escritor que morreu aqui
+            # deixa a seq ímpar; o próximo completa o ciclo)
+            if not seq & 1:
+                seq += 1
+                _SEQ.pack_into(buf, 0, seq)
+            buf[inicio:inicio + _DADOS.size] = dados
+            _SEQ.pack_into(buf, 0, seq + 1)
+        finally:
+            self._desbloquear()
+
+    def publicar_corpo(self, corpo):
+        self.publicar(
+            **{c: getattr(corpo, c) for c in CANAIS},
+            intensidade_emocional=getattr(corpo, "intensidade_emocional", 0.0),
+            emocao=getattr(corpo, "estado_emocional", "neutro"),
+            ts_corpo=clock.time(),
+        )
+
+    def acompanhar_corpo(self, corpo):
+        """
+        Publica o corpo agora e, depois, a cada mudança relevante (eventos de
+        body_events.py), numa thread que junta rajadas numa única publicação.
+        Retorna a assinatura (ou None se o corpo não publica eventos).
+        """
+        self.publicar_corpo(corpo)
+        eventos = getattr(corpo, "eventos", None)
+        if eventos is None:
+            return None
+
+        def publicar_estado_vivo(evento):
+            self.publicar_corpo(corpo)
+
+        return eventos.inscrever(publicar_estado_vivo, thread=True, coalescer=True)
+
+    def publicar_atrito(self, metrics, chronic=False, coherence_load=None, ciclo=None):
+        self.publicar(
+            load=metrics.get("load", 0.0),
+            damage=metrics.get("damage", 0.0),
+            chronic=bool(chronic),
+            coherence_load=coherence_load,
+            ciclo=ciclo,
+            ts_atrito=clock.time(),
+        )
+
+    def fechar(self):
+        self._buf = None
+        self._shm.close()
+        if self._arquivo_lock is not None:
+            self._arquivo_lock.close()
+
+
+def atrito_recente(snap, idade_max=IDADE_MAX_ATRITO):
+    """O snapshot, se traz atrito publicado há no máximo `idade_max` segundos; senão None."""
+    if not snap or not snap["ts_atrito"]:
+        return None
+    return snap if clock.time() - snap["ts_atrito"] <= idade_max else None
+
+
+# ----------------------------------------------------------------------
+# Instância do processo (criada no primeiro uso; None = desligado)
+# ----------------------------------------------------------------------
+_NAO_INICIADO = object()
+_ESTADO_VIVO = _NAO_INICIADO
+
+
+def get_estado_vivo():
+    """EstadoVivo compartilhado do processo, ou None se indisponível/desligado."""
+    global _ESTADO_VIVO
+    if _ESTADO_VIVO is _NAO_INICIADO:
+        try:
+            _ESTADO_VIVO = EstadoVivo.abrir()
+        except Exception:  # plataforma sem shared_memory ou layout incompatível
+            _ESTADO_VIVO = None
+    return _ESTADO_VIVO
+
+
+def set_estado_vivo(estado):
+    """Troca a instância (None desliga — ex.: simulações em sandbox)."""
+    global _ESTADO_VIVO
+    _ESTADO_VIVO = estado
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Estado vivo compartilhado entre chat e deep_awake")
+    parser.add_argument("--bench", action="store_true", help="Mede o custo de uma leitura consistente")
+    parser.add_argument("--remover", action="store_true", help="Remove o segmento (próximo uso recria)")
+    args = parser.parse_args()
+
+    if args.remover:
+        from multiprocessing import shared_memory
+
+        try:
+            shm = shared_memory.SharedMemory(name=NOME_SEGMENTO)
+            shm.unlink()
+            shm.close()
+            print(f"🧹 Segmento {NOME_SEGMENTO} removido.")
+        except FileNotFoundError:
+            print("Nenhum segmento ativo.")
+        raise SystemExit(0)
+
+    estado = get_estado_vivo()
+    if estado is None:
+        raise SystemExit("Memória compartilhada indisponível nesta plataforma.")
+    snap = estado.ler()
+    print(f"🫀 Estado vivo (seq {snap['seq']}):")
+    print("   corpo: " + " ".join(f"{c}={snap[c]:.3f}" for c in CANAIS)
+          + f" | emoção={snap['emocao'] or '-'} ({snap['intensidade_emocional']:.2f})")
+    print(f"   atrito: load={snap['load']:.4f} damage={snap['damage']:.4f} chronic={snap['chronic']} "
+          f"| coherence_load={snap['coherence_load']:.4f} | ciclo={snap['ciclo'] or '-'}")
+    if args.bench:
+        n = 100000
+        t0 = time.perf_counter_ns()
+        for _ in range(n):
+            estado.ler()
+        print(f"   leitura consistente: {(time.perf_counter_ns() - t0) / n:,.0f} ns")
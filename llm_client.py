@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Cliente Resiliente para o Ollama
+Uso (métricas): python llm_client.py
+
+Envolve o POST /api/generate em streaming com:
+- prazo por chamada (deadline absoluto, inclusive o tempo na fila);
+- timeouts de conexão e de leitura (nenhum stream trava para sempre);
+- novas tentativas com backoff exponencial e jitter para falhas de conexão;
+- circuit breaker por endpoint: com o backend doente, falha na hora;
+- hedging opcional: se o primeiro token demorar mais que `hedge_apos`,
+  dispara a mesma requisição num segundo endpoint local e fica com quem
+  responder primeiro (o perdedor é fechado);
+- métricas de latência (primeiro token e total, p50/p95/p99).
+"""
+
+import json
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from collections import deque
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+METRICS_FILE = os.path.join(BASE_PATH, "llm_client_metrics.json")
+
+# Prazo total padrão por prioridade de despacho (segundos)
+PRAZOS_PADRAO = {"usuario": 120.0, "reflexao": 60.0, "autonomo": 300.0}
+
+TIMEOUT_CONEXAO = 5.0
+TIMEOUT_LEITURA = 60.0   # silêncio máximo entre dois chunks do stream
+
+
+class BackendIndisponivel(Exception):
+    """O backend não respondeu a tempo, esgotou as tentativas ou está com o circuito aberto."""
+
+
+class CircuitBreaker:
+    """
+    fechado → (limiar falhas seguidas) → aberto → (após `reabrir_apos` s)
+    → meio-aberto: deixa passar uma sonda; sucesso fecha, falha reabre.
+    """
+
+    def __init__(self, limiar=3, reabrir_apos=30.0):
+        self.limiar = limiar
+        self.reabrir_apos = reabrir_apos
+        self.falhas = 0
+        self.aberto_em = None
+        self.sondando = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self.aberto_em is None:
+                return "fechado"
+            if time.monotonic() - self.aberto_em >= self.reabrir_apos:
+                return "meio_aberto"
+            return "aberto"
+
+    def permitir(self):
+        with self._lock:
+            if self.aberto_em is None:
+                return True
+            if time.monotonic() - self.aberto_em < self.reabrir_apos or self.sondando:
+                return False
+            self.sondando = True  # uma única sonda no meio-aberto
+            return True
+
+    def sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self.aberto_em = None
+            self.sondando = False
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self.sondando or self.falhas >= self.limiar:
+                self.aberto_em = time.monotonic()
+            self.sondando = False
+
+    def liberar_sonda(self):
+        """Sonda abandonada sem veredito (ex.: perdeu a corrida): outra pode passar."""
+        with self._lock:
+            self.sondando = False
+
+
+class _Conexao:
+    """Resposta HTTP aberta com a primeira linha do stream já lida."""
+
+    def __init__(self, endpoint, resposta, linhas, primeira):
+        self.endpoint = endpoint
+        self.resposta = resposta
+        self.linhas = linhas
+        self.primeira = primeira
+
+    def close(self):
+        try:
+            self.resposta.close()
+        except Exception:
+            pass
+
+    def interromper(self):
+        """Derruba o socket para acordar uma leitura bloqueada em outra thread."""
+        sock = getattr(getattr(self.resposta.raw, "connection", None), "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.close()
+
+
+class StreamLLM:
+    """
+    Iterável de dicts do stream do Ollama. Use com `with`: sair do bloco
+    fecha a conexão. Ao fim, `motivo` é None (normal), 'prazo' (deadline
+    ou silêncio do servidor) ou 'erro' (conexão caiu no meio).
+    """
+
+    def __init__(self, cliente, conexao, limite, t0, hedged):
+        self._cliente = cliente
+        self._conexao = conexao
+        self._limite = limite
+        self._t0 = t0
+        self.endpoint = conexao.endpoint
+        self.hedged = hedged
+        self.ttft = time.monotonic() - t0
+        self.motivo = None
+        # o deadline vale mesmo se o servidor ficar mudo entre dois chunks
+        self._expirado = False
+        self._vigia = threading.Timer(max(0.0, limite - time.monotonic()), self._expirar)
+        self._vigia.daemon = True
+        self._vigia.start()
+
+    def _expirar(self):
+        self._expirado = True
+        self._conexao.interromper()
+
+    def __iter__(self):
+        import requests
+
+        conexao = self._conexao
+        try:
+            yield json.loads(conexao.primeira)
+            for linha in conexao.linhas:
+                if self._expirado or time.monotonic() > self._limite:
+                    self.motivo = "prazo"
+                    return
+                if linha:
+                    yield json.loads(linha)
+        except Exception as e:
+            if self._expirado or isinstance(e, requests.exceptions.Timeout):
+                self.motivo = "prazo"
+            elif isinstance(e, (requests.exceptions.RequestException, OSError)):
+                self.motivo = "erro"
+                self._cliente._disjuntor(self.endpoint).falha()
+            else:
+                raise
+
+    def close(self):
+        self._vigia.cancel()
+        self._conexao.close()
+        self._cliente._registrar(self.ttft, time.monotonic() - self._t0, self.motivo, self.hedged)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ClienteLLM:
+    """
+    tentativas: conexões tentadas antes de desistir (só falhas de conexão
+                ou HTTP 5xx; um stream que já começou não é repetido)
+    backoff_base / backoff_max: backoff exponencial com jitter total
+    endpoint_hedge: segundo endpoint local (None = sem hedging/failover)
+    hedge_apos: segundos sem primeiro token antes de disparar o hedge
+    limiar_falhas / reabrir_apos: parâmetros do circuit breaker
+    """
+
+    def __init__(self, tentativas=3, backoff_base=0.5, backoff_max=8.0,
+                 timeout_conexao=TIMEOUT_CONEXAO, timeout_leitura=TIMEOUT_LEITURA,
+                 endpoint_hedge=None, hedge_apos=None, limiar_falhas=3, reabrir_apos=30.0,
+                 arquivo_metricas=METRICS_FILE):
+        self.tentativas = max(1, int(tentativas))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout_conexao = timeout_conexao
+        self.timeout_leitura = timeout_leitura
+        self.endpoint_hedge = endpoint_hedge
+        self.hedge_apos = hedge_apos
+        self.limiar_falhas = limiar_falhas
+        self.reabrir_apos = reabrir_apos
+        self.arquivo_metricas = arquivo_metricas
+        self._disjuntores = {}
+        self._lock = threading.Lock()
+        # métricas
+        self._ttft = deque(maxlen=500)
+        self._total = deque(maxlen=500)
+        self.chamadas = 0
+        self.falhas_rapidas = 0
+        self.prazos_estourados = 0
+        self.hedges = 0
+        self.retentativas = 0
+        self._ultima_exportacao = 0.0
+
+    def _disjuntor(self, endpoint):
+        with self._lock:
+            d = self._disjuntores.get(endpoint)
+            if d is None:
+                d = CircuitBreaker(self.limiar_falhas, self.reabrir_apos)
+                self._disjuntores[endpoint] = d
+            return d
+
+    # ------------------------------------------------------------------
+    def _conectar(self, endpoint, payload, limite, abandonado):
+        """POST + leitura da primeira linha. Levanta em falha de conexão, 5xx ou timeout."""
+        import requests
+
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            raise requests.exceptions.Timeout("prazo esgotado antes de conectar")
+        timeout = (min(self.timeout_conexao, restante), min(self.timeout_leitura, restante))
+        r = requests.post(f"{endpoint}/api/generate", json=payload, stream=True, timeout=timeout)
+        try:
+            if abandonado.is_set():
+                raise requests.exceptions.ConnectionError("requisição abandonada (hedge)")
+            if r.status_code >= 500:
+                raise requests.exceptions.HTTPError(f"{endpoint} respondeu {r.status_code}", response=r)
+            r.raise_for_status()
+            linhas = r.iter_lines()
+            for linha in linhas:
+                if linha:
+                    return _Conexao(endpoint, r, linhas, linha)
+            raise requests.exceptions.ConnectionError(f"{endpoint} encerrou o stream sem dados")
+        except BaseException:
+            r.close()
+            raise
+
+    def _corrida(self, payload, primario, limite):
+        """
+        Conecta ao primário; se o primeiro token não chegar em `hedge_apos`,
+        dispara o hedge e devolve (conexão vencedora, hedged).
+        """
+        resultados = queue.Queue()
+        abandonado = threading.Event()
+
+        def tentar(endpoint):
+            try:
+                resultados.put((endpoint, self._conectar(endpoint, payload, limite, abandonado), None))
+            except Exception as e:
+                resultados.put((endpoint, None, e))
+
+        hedge = self.endpoint_hedge
+        pode_hedge = hedge and hedge != primario and self.hedge_apos is not None
+        # endpoints lançados ainda sem veredito no disjuntor; ao sair, nenhum
+        # fica com a sonda do meio-aberto presa
+        sem_veredito = []
+
+        def lancar(endpoint):
+            sem_veredito.append(endpoint)
+            threading.Thread(target=tentar, args=(endpoint,), daemon=True).start()
+
+        lancar(primario)
+        lancados, hedged, erros = 1, False, []
+        espera = self.hedge_apos if pode_hedge else None
+
+        try:
+            while True:
+                restante = limite - time.monotonic()
+                timeout = restante if espera is None else min(espera, restante)
+                try:
+                    endpoint, conexao, erro = resultados.get(timeout=max(0.0, timeout))
+                except queue.Empty:
+                    if time.monotonic() >= limite:
+                        abandonado.set()
+                        self._drenar(resultados, lancados - len(erros))
+                        # nenhum token até o prazo conta como falha de quem foi chamado
+                        for pendente in sem_veredito:
+                            self._disjuntor(pendente).falha()
+                        sem_veredito.clear()
+                        raise BackendIndisponivel("prazo esgotado aguardando o primeiro token")
+                    # primeiro token atrasado: hedge no segundo endpoint
+                    espera = None
+                    if self._disjuntor(hedge).permitir():
+                        lancar(hedge)
+                        lancados += 1
+                        hedged = True
+                        with self._lock:
+                            self.hedges += 1
+                    continue
+
+                sem_veredito.remove(endpoint)
+                if conexao is not None:
+                    self._disjuntor(endpoint).sucesso()
+                    abandonado.set()
+                    self._drenar(resultados, lancados - len(erros) - 1)
+                    return conexao, hedged
+                self._disjuntor(endpoint).falha()
+                erros.append(erro)
+                if len(erros) >= lancados:
+                    # primário falhou de vez antes do hedge: tenta o hedge como failover
+                    if pode_hedge and not hedged and self._disjuntor(hedge).permitir():
+                        lancar(hedge)
+                        lancados += 1
+                        hedged = True
+                        espera = None
+                        continue
+                    raise erros[0]
+        finally:
+            # perdedores da corrida (ou saída por exceção): sem veredito, só liberam a sonda
+            for pendente in sem_veredito:
+                self._disjuntor(pendente).liberar_sonda()
+
+    @staticmethod
+    def _drenar(resultados, pendentes):
+        """Fecha, em segundo plano, as conexões perdedoras que ainda vão chegar."""
+        if pendentes <= 0:
+            return
+
+        def drenar():
+            for _ in range(pendentes):
+                _, conexao, _ = resultados.get()
+                if conexao is not None:
+                    conexao.close()
+
+        threading.Thread(target=drenar, daemon=True).start()
+
+    def abrir(self, payload, endpoint, limite, cancelar=None):
+        """
+        Abre o stream em `endpoint` respeitando o deadline `limite`
+        (time.monotonic()). Retorna StreamLLM; levanta BackendIndisponivel.
+        """
+        import requests
+
+        t0 = time.monotonic()
+        with self._lock:
+            self.chamadas += 1
+        ultimo_erro = None
+        for tentativa in range(self.tentativas):
+            primario = endpoint
+            if not self._disjuntor(primario).permitir():
+                reserva = self.endpoint_hedge
+                if reserva and reserva != primario and self._disjuntor(reserva).permitir():
+                    primario = reserva  # circuito aberto: failover direto
+                else:
+                    with self._lock:
+                        self.falhas_rapidas += 1
+                    raise BackendIndisponivel(f"circuito aberto para {endpoint}")
+            try:
+                conexao, hedged = self._corrida(payload, primario, limite)
+                return StreamLLM(self, conexao, limite, t0, hedged)
+            except BackendIndisponivel:
+                with self._lock:
+                    self.prazos_estourados += 1
+                raise
+            except (requests.exceptions.RequestException, OSError) as e:
+                ultimo_erro = e
+
+            if tentativa + 1 >= self.tentativas:
+                break
+            # backoff exponencial com jitter total, sem passar do prazo
+            pausa = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** tentativa))
+            if time.monotonic() + pausa >= limite:
+                break
+            with self._lock:
+                self.retentativas += 1
+            if cancelar is not None:
+                if cancelar.wait(pausa):
+                    break
+            else:
+                time.sleep(pausa)
+        raise BackendIndisponivel(f"{endpoint} indisponível: {ultimo_erro}")
+
+    # ------------------------------------------------------------------
+    def _registrar(self, ttft, total, motivo, hedged):
+        with self._lock:
+            self._ttft.append(ttft)
+            self._total.append(total)
+            if motivo == "prazo":
+                self.prazos_estourados += 1
+        self._exportar_metricas()
+
+    @staticmethod
+    def _quantis(valores):
+        if not valores:
+            return {}
+        v = sorted(valores)
+        q = lambda p: round(v[min(len(v) - 1, int(p * len(v)))] * 1000, 1)
+        return {"p50_ms": q(0.50), "p95_ms": q(0.95), "p99_ms": q(0.99), "max_ms": round(v[-1] * 1000, 1)}
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "chamadas": self.chamadas,
+                "retentativas": self.retentativas,
+                "hedges": self.hedges,
+                "falhas_rapidas": self.falhas_rapidas,
+                "prazos_estourados": self.prazos_estourados,
+                "primeiro_token": self._quantis(self._ttft),
+                "total": self._quantis(self._total),
+                "circuitos": {ep: d.estado for ep, d in self._disjuntores.items()},
+            }
+
+    def _exportar_metricas(self, intervalo=2.0):
+        if not self.arquivo_metricas:
+            return
+        agora = time.time()
+        if agora - self._ultima_exportacao < intervalo:
+            return
+        self._ultima_exportacao = agora
+        try:
+            dados = {"pid": os.getpid(), "ts": agora, **self.metricas()}
+            tmp = f"{self.arquivo_metricas}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.arquivo_metricas)
+        except Exception:
+            pass  # métricas nunca afetam a geração
+
+
+if __name__ == "__main__":
+    if not os.path.exists(METRICS_FILE):
+        print("Nenhuma métrica exportada ainda.")
+    else:
+        with open(METRICS_FILE, "r", encoding="utf-8") as f:
+            m = json.load(f)
+        print(f"🛡️  Cliente LLM (pid {m.get('pid')}): {m['chamadas']} chamadas | "
+              f"retentativas {m['retentativas']} | hedges {m['hedges']} | "
+              f"falhas rápidas {m['falhas_rapidas']} | prazos estourados {m['prazos_estourados']}")
+        for nome in ("primeiro_token", "total"):
+            q = m.get(nome) or {}
+            if q:
+                print(f"   {nome}: p50 {q['p50_ms']} ms | p95 {q['p95_ms']} ms | "
+                      f"p99 {q['p99_ms']} ms | máx {q['max_ms']} ms")
+        for endpoint, estado in m.get("circuitos", {}).items():
+            print(f"   circuito {endpoint}: {estado}")
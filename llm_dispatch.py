@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Camada de Despacho para o LLM
+Uso (métricas): python llm_dispatch.py
+
+Fila limitada por backend, com:
+- máximo de requisições em voo por backend (também entre processos:
+  angela.py e deep_awake.py disputam os mesmos slots via flock);
+- prioridade por requisição (usuario < reflexao < autonomo) e origem;
+- política ao lotar: esperar, descartar (shed) ou coalescer com uma
+  requisição idêntica já na fila/em voo;
+- prazo (deadline em time.monotonic) que conta a espera na fila e pelo
+  slot entre processos: esgotado, a requisição sai da fila com
+  BackendIndisponivel;
+- métricas de profundidade da fila e tempo de espera.
+"""
+
+import atexit
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as TempoEsgotado
+
+from llm_client import BackendIndisponivel
+
+try:
+    import fcntl  # slots entre processos (POSIX)
+except ImportError:  # Windows: limite só dentro do processo
+    fcntl = None
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+SLOTS_DIR = os.path.join(BASE_PATH, ".llm_slots")
+METRICS_FILE = os.path.join(BASE_PATH, "llm_dispatch_metrics.json")
+
+PRIORIDADES = {"usuario": 0, "reflexao": 1, "autonomo": 2}
+
+MAX_EM_VOO_PADRAO = 2   # principal + reflexão especulativa do chat
+MAX_FILA_PADRAO = 8
+
+
+class FilaCheia(Exception):
+    """A fila do backend está cheia e o chamador pediu para não esperar."""
+
+
+def _resta(limite):
+    """Segundos até o deadline (time.monotonic), ou None sem deadline."""
+    return None if limite is None else limite - time.monotonic()
+
+
+class _SlotsEntreProcessos:
+    """N arquivos de lock por backend; quem segura o flock ocupa o slot."""
+
+    def __init__(self, backend, limite, diretorio=SLOTS_DIR):
+        self.limite = limite
+        nome = "".join(c if c.isalnum() else "_" for c in backend)
+        self.caminhos = [os.path.join(diretorio, f"{nome}.{i}.lock") for i in range(limite)]
+        self.diretorio = diretorio
+
+    def adquirir(self, limite=None, intervalo=0.05):
+        """fd do slot obtido; BackendIndisponivel se o deadline `limite` passar antes."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        while True:
+            for caminho in self.caminhos:
+                fd = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            resta = _resta(limite)
+            if resta is not None and resta <= 0:
+                raise BackendIndisponivel("prazo esgotado esperando slot entre processos")
+            time.sleep(intervalo if resta is None else min(intervalo, resta))
+
+    def ocupados(self):
+        """Slots seguros agora por qualquer processo (sonda sem bloquear)."""
+        n = 0
+        for caminho in self.caminhos:
+            try:
+                fd = os.open(caminho, os.O_RDWR)
+            except FileNotFoundError:
+                continue  # nunca usado
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            except OSError:
+                n += 1
+            finally:
+                os.close(fd)
+        return n
+
+    @staticmethod
+    def liberar(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class _EstadoBackend:
+    def __init__(self, backend, limite, max_fila, entre_processos):
+        self.backend = backend
+        self.limite = limite
+        self.max_fila = max_fila
+        self.cond = threading.Condition()
+        self.espera = []          # heap de (prioridade, seq)
+        self.em_voo = 0
+        self.com_slot = 0         # em voo que já seguram um slot entre processos
+        self.em_andamento = {}    # chave → Future (para coalescer)
+        self.slots = _SlotsEntreProcessos(backend, limite) if (entre_processos and fcntl) else None
+        # métricas
+        self.total = 0
+        self.descartados = 0
+        self.coalescidos = 0
+        self.expirados = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.profundidade_max = 0
+        self.por_origem = {}
+
+
+class LLMDispatcher:
+    """
+    limites: dict backend → máximo em voo (padrão MAX_EM_VOO_PADRAO)
+    max_fila: requisições aguardando por backend antes de aplicar `ao_lotar`
+    entre_processos: usa slots com flock (se disponível) além do limite local
+    """
+
+    def __init__(self, limites=None, max_em_voo=MAX_EM_VOO_PADRAO, max_fila=MAX_FILA_PADRAO,
+                 entre_processos=True, arquivo_metricas=METRICS_FILE):
+        self.limites = dict(limites or {})
+        self.max_em_voo = max_em_voo
+        self.max_fila = max_fila
+        self.entre_processos = entre_processos
+        self.arquivo_metricas = arquivo_metricas
+        self._backends = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._ultima_exportacao = 0.0
+        if arquivo_metricas:
+            atexit.register(self._exportar_metricas, 0.0)
+
+    def _estado(self, backend):
+        with self._lock:
+            est = self._backends.get(backend)
+            if est is None:
+                limite = self.limites.get(backend, self.max_em_voo)
+                est = _EstadoBackend(backend, limite, self.max_fila, self.entre_processos)
+                self._backends[backend] = est
+            return est
+
+    def _aguardar(self, est, pronto, limite):
+        """Espera na condição (já adquirida) até pronto() ou o deadline."""
+        while not pronto():
+            resta = _resta(limite)
+            if resta is not None and resta <= 0:
+                est.expirados += 1
+                raise BackendIndisponivel(f"prazo esgotado na fila de {est.backend}")
+            est.cond.wait(resta)
+
+    def executar(self, fn, *, backend, prioridade="autonomo", origem="desconhecida",
+                 chave=None, ao_lotar="esperar", limite=None):
+        """
+        Executa fn() quando houver slot livre no backend.
+
+        prioridade: nome em PRIORIDADES ou inteiro (menor = mais urgente)
+        chave: identifica requisições equivalentes (para coalescer)
+        ao_lotar: 'esperar' | 'descartar' | 'coalescer' quando a fila está cheia
+        limite: deadline (time.monotonic) para a espera na fila e pelo slot
+        Levanta FilaCheia quando a requisição é descartada e
+        BackendIndisponivel quando o deadline passa antes de haver slot.
+        """
+        est = self._estado(backend)
+        nivel = PRIORIDADES.get(prioridade, prioridade) if isinstance(prioridade, str) else int(prioridade)
+        t0 = time.perf_counter()
+
+        with est.cond:
+            est.por_origem[origem] = est.por_origem.get(origem, 0) + 1
+            if len(est.espera) >= est.max_fila:
+                if ao_lotar == "coalescer" and chave in est.em_andamento:
+                    futuro = est.em_andamento[chave]
+                    est.coalescidos += 1
+                    coalescido = True
+                elif ao_lotar in ("descartar", "coalescer"):
+                    est.descartados += 1
+                    raise FilaCheia(f"fila de {backend} cheia ({len(est.espera)})")
+                else:
+                    coalescido = False
+                    self._aguardar(est, lambda: len(est.espera) < est.max_fila, limite)
+            else:
+                coalescido = False
+
+            if not coalescido:
+                ticket = (nivel, next(self._seq))
+                heapq.heappush(est.espera, ticket)
+                est.profundidade_max = max(est.profundidade_max, len(est.espera))
+                futuro = Future()
+                if chave is not None:
+                    est.em_andamento.setdefault(chave, futuro)
+                try:
+                    self._aguardar(est, lambda: est.espera[0] == ticket and est.em_voo < est.limite, limite)
+                except BaseException as e:
+                    # prazo ou interrupção (KeyboardInterrupt): o ticket não pode
+                    # ficar na frente da fila travando quem vem depois
+                    est.espera.remove(ticket)
+                    heapq.heapify(est.espera)
+                    if chave is not None and est.em_andamento.get(chave) is futuro:
+                        del est.em_andamento[chave]
+                    futuro.set_exception(e)
+                    est.cond.notify_all()
+                    raise
+                heapq.heappop(est.espera)
+                est.em_voo += 1
+                est.cond.notify_all()
+
+        if coalescido:
+            try:
+                return futuro.result(timeout=_resta(limite) if limite is not None else None)
+            except TempoEsgotado:
+                raise BackendIndisponivel(f"prazo esgotado aguardando requisição coalescida em {backend}")
+
+        fd = None
+        try:
+            try:
+                if est.slots is not None:
+                    fd = est.slots.adquirir(limite)
+                    with est.cond:
+                        est.com_slot += 1
+                espera = time.perf_counter() - t0
+                with est.cond:
+                    est.total += 1
+                    est.espera_total += espera
+                    est.espera_max = max(est.espera_max, espera)
+                resultado = fn()
+            except BaseException as e:
+                futuro.set_exception(e)
+                raise
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            if fd is not None:
+                _SlotsEntreProcessos.liberar(fd)
+            with est.cond:
+                est.em_voo -= 1
+                if fd is not None:
+                    est.com_slot -= 1
+                if chave is not None and est.em_andamento.get(chave) is futuro:
+                    del est.em_andamento[chave]
+                est.cond.notify_all()
+            self._exportar_metricas()
+
+    # ------------------------------------------------------------------
+    def metricas(self):
+        """Snapshot por backend: fila, em voo, espera média/máxima, descartes."""
+        saida = {}
+        with self._lock:
+            estados = list(self._backends.values())
+        for est in estados:
+            with est.cond:
+                saida[est.backend] = {
+                    "profundidade": len(est.espera),
+                    "profundidade_max": est.profundidade_max,
+                    "em_voo": est.em_voo,
+                    "limite": est.limite,
+                    "total": est.total,
+                    "descartados": est.descartados,
+                    "coalescidos": est.coalescidos,
+                    "expirados": est.expirados,
+                    "espera_media_ms": round(est.espera_total / est.total * 1000, 1) if est.total else 0.0,
+                    "espera_max_ms": round(est.espera_max * 1000, 1),
+                    "por_origem": dict(est.por_origem),
+                }
+        return saida
+
+    def carga(self, backend):
+        """
+        Ocupação relativa do backend: (em voo + fila + slots seguros por
+        outros processos) / limite — o chat enxerga as gerações do
+        deep_awake no mesmo endpoint e vice-versa.
+        """
+        est = self._estado(backend)
+        ocupados = est.slots.ocupados() if est.slots is not None else 0
+        with est.cond:
+            outros = max(0, ocupados - est.com_slot)
+            return (est.em_voo + len(est.espera) + outros) / max(1, est.limite)
+
+    def _exportar_metricas(self, intervalo=2.0):
+        if not self.arquivo_metricas:
+            return
+        agora = time.time()
+        if agora - self._ultima_exportacao < intervalo:
+            return
+        self._ultima_exportacao = agora
+        try:
+            dados = {"pid": os.getpid(), "ts": agora, "backends": self.metricas()}
+            tmp = f"{self.arquivo_metricas}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.arquivo_metricas)
+        except Exception:
+            pass  # métricas nunca afetam a geração
+
+
+if __name__ == "__main__":
+    if not os.path.exists(METRICS_FILE):
+        print("Nenhuma métrica exportada ainda.")
+    else:
+        with open(METRICS_FILE, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        print(f"📡 Métricas do despacho (pid {dados.get('pid')}):")
+        for backend, m in dados.get("backends", {}).items():
+            print(f"   {backend}: fila {m['profundidade']} (máx {m['profundidade_max']}) | "
+                  f"em voo {m['em_voo']}/{m['limite']} | espera média {m['espera_media_ms']} ms "
+                  f"(máx {m['espera_max_ms']} ms) | total {m['total']} | "
+                  f"descartados {m['descartados']} | coalescidos {m['coalescidos']} | "
+                  f"expirados {m.get('expirados', 0)}")
+            for origem, n in sorted(m.get("por_origem", {}).items()):
+                print(f"      · {origem}: {n}")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Formato dos Registros de Memória (v2) + Migração
+Uso: python memory_schema.py [--migrar] [ARQUIVO.jsonl ...]
+
+v1 (append_memory antigo) guardava o mesmo texto até três vezes
+(`angela` = `resposta`, `input` = "autor: " + `user.conteudo`), escapava
+barras, aspas e quebras de linha antes do json.dumps escapar de novo e
+embutia o estado do corpo como dict vindo do JSON indentado de
+exportar_estado().
+
+v2 guarda cada texto uma vez, sem pré-escape, e o corpo como array:
+
+  {"v": 2, "ts": ..., "tipo": "dialogo", "autor": "Vinicius",
+   "texto": fala, "resposta": fala da Ângela, "reflexao": ...,
+   "emocao": "alegria", "corpo": [tensao, calor, vibracao, fluidez, pulso, luminosidade]}
+
+Campos vazios são omitidos. tipo/autor/emocao ficam no topo, onde
+storage.campos_indexados (e os índices do SQLite) os encontram direto.
+
+Leitores recebem sempre v2: memoria_v2() converte registros v1 na leitura
+(core.tail_memoria / core.load_memoria já fazem isso). A migração reescreve
+os arquivos linha a linha (sem carregar o arquivo inteiro) — rode com o
+chat e o deep_awake parados.
+"""
+
+import json
+import os
+import re
+import time
+
+VERSAO = 2
+CANAIS_CORPO = ("tensao", "calor", "vibracao", "fluidez", "pulso", "luminosidade")
+CASAS_CORPO = 4
+
+_ESCAPE_V1 = re.compile(r'\\(["\\n])')
+
+
+def _desescapar(texto):
+    """Desfaz o sanitize() do v1 (\\\\ → \\, \\" → ", \\n → quebra de linha)."""
+    if not isinstance(texto, str) or "\\" not in texto:
+        return texto
+    return _ESCAPE_V1.sub(lambda m: "\n" if m.group(1) == "n" else m.group(1), texto)
+
+
+def corpo_compacto(estado):
+    """Canais do corpo (objeto com atributos ou dict) como lista de floats."""
+    if isinstance(estado, dict):
+        valores = [estado.get(c) for c in CANAIS_CORPO]
+    else:
+        valores = [getattr(estado, c, None) for c in CANAIS_CORPO]
+    if all(v is None for v in valores):
+        return None
+    return [round(float(v or 0.0), CASAS_CORPO) for v in valores]
+
+
+def canais(registro):
+    """Dict canal → valor a partir do `corpo` de um registro v2 ({} se ausente)."""
+    return dict(zip(CANAIS_CORPO, registro.get("corpo") or ()))
+
+
+def montar(tipo, autor, texto, resposta="", ts=None, reflexao=None, emocao=None, corpo=None):
+    """Registro v2, omitindo campos vazios."""
+    registro = {"v": VERSAO, "ts": ts, "tipo": tipo, "autor": autor}
+    for campo, valor in (("texto", texto), ("resposta", resposta), ("reflexao", reflexao),
+                         ("emocao", emocao), ("corpo", corpo)):
+        if valor:
+            registro[campo] = valor
+    return registro
+
+
+def memoria_v2(registro):
+    """Registro no formato v2: v2 passa direto, v1 é convertido."""
+    if registro.get("v") == VERSAO:
+        return registro
+    user = registro.get("user") if isinstance(registro.get("user"), dict) else {}
+    estado = registro.get("estado_interno") if isinstance(registro.get("estado_interno"), dict) else {}
+    if user:  # user.conteudo nunca passou pelo sanitize
+        texto = user.get("conteudo", "")
+        autor = user.get("autor", "desconhecido")
+    else:  # legado: só a string flat "autor: conteudo"
+        autor, _, texto = _desescapar(registro.get("input", "")).partition(": ")
+        autor = autor or "Vinicius"
+    return montar(
+        user.get("tipo", "dialogo"),
+        autor,
+        texto,
+        _desescapar(registro.get("angela", registro.get("resposta", ""))),
+        ts=registro.get("ts") or registro.get("timestamp"),
+        reflexao=_desescapar(registro.get("reflexao_emocional")),
+        emocao=estado.get("emocao"),
+        corpo=corpo_compacto(estado) if estado else None,
+    )
+
+
+def migrar_arquivo(caminho):
+    """
+    Reescreve `caminho` em v2, em streaming, via arquivo temporário + os.replace.
+    Linhas acrescentadas durante a migração também são migradas antes da troca.
+    Retorna (registros, bytes_antes, bytes_depois).
+    """
+    tmp = f"{caminho}.{os.getpid()}.migrar.tmp"
+    registros = 0
+    esperas = 0
+    with open(caminho, "rb") as origem, open(tmp, "w", encoding="utf-8") as destino:
+        while True:
+            linha = origem.readline()
+            if not linha:
+                break
+            if not linha.endswith(b"\n") and esperas < 100:
+                try:
+                    json.loads(linha)
+                except ValueError:  # linha ainda sendo escrita: espera o resto
+                    origem.seek(-len(linha), os.SEEK_CUR)
+                    esperas += 1
+                    time.sleep(0.01)
+                    continue
+            esperas = 0
+            try:
+                registro = json.loads(linha)
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                continue
+            destino.write(json.dumps(memoria_v2(registro), ensure_ascii=False) + "\n")
+            registros += 1
+        antes = origem.tell()
+    os.replace(tmp, caminho)
+    return registros, antes, os.path.getsize(caminho)
+
+
+def _custo_parse(caminho):
+    t0 = time.perf_counter()
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if linha.strip():
+                json.loads(linha)
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    base = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Formato v2 dos registros de memória")
+    parser.add_argument("arquivos", nargs="*", help="Padrão: angela_memory*.jsonl")
+    parser.add_argument("--migrar", action="store_true", help="Reescreve os arquivos em v2 (sem isso, só relata)")
+    args = parser.parse_args()
+
+    arquivos = args.arquivos or sorted(glob.glob(os.path.join(base, "angela_memory*.jsonl")))
+    for caminho in arquivos:
+        if not os.path.exists(caminho):
+            print(f"⚠️ {caminho} não existe")
+            continue
+        v1 = 0
+        total = 0
+        with open(caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    total += 1
+                    v1 += json.loads(linha).get("v") != VERSAO
+                except json.JSONDecodeError:
+                    continue
+        print(f"🗂️ {os.path.basename(caminho)}: {total} registros ({v1} em v1)")
+        if args.migrar and v1:
+            parse_antes = _custo_parse(caminho)
+            n, antes, depois = migrar_arquivo(caminho)
+            parse_depois = _custo_parse(caminho)
+            print(f"   migrados {n} | {antes:,} → {depois:,} bytes ({depois / max(1, antes):.0%}) "
+                  f"| parse {parse_antes * 1000:.1f} → {parse_depois * 1000:.1f} ms")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Estatísticas Metacognitivas Contínuas
+Uso: python meta_stats.py [ARQUIVO]
+
+Cada MetaCognitor.process registra a incerteza e a coerência medidas numa
+série por autor ("autor:Ângela") e por modo ("modo:conversacional",
+"modo:repouso"...). Por série e métrica:
+
+  - duas médias móveis exponenciais (curta e longa); curta − longa é a
+    tendência;
+  - um histograma de BINS faixas sobre as últimas JANELA medições (anel
+    de índices de faixa), de onde saem quantis (p10, p50, p90).
+
+Registrar custa O(1). O estado cabe num documento pequeno (meta_stats.json)
+gravado pelo backend de armazenamento e compartilhado entre processos.
+O chat mede autor:Ângela e modo:conversacional; o deep_awake mede
+autor:Sistema(DeepAwake) e modo:<ciclo> — séries distintas, no mesmo
+arquivo. Duas instâncias do mesmo programa, porém, medem as mesmas séries.
+Por isso cada gravação, sob flock (storage.trava_arquivo) e fora do turno
+transacional do chat, relê as séries tocadas e aplica por cima as medições
+pendentes deste processo — nenhuma se perde.
+Consumidores leem tendências daqui em vez de varrer logs.
+"""
+
+import os
+import threading
+
+import clock
+from storage import get_storage, trava_arquivo
+from turn_record import fora_do_turno
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+META_STATS_FILE = os.path.join(BASE_PATH, "meta_stats.json")
+
+METRICAS = ("incerteza", "coerencia")
+ALFA_CURTA = 0.3
+ALFA_LONGA = 0.05
+JANELA = 64
+BINS = 20
+
+
+class _Serie:
+    """EWMA curta/longa + histograma janelado de uma métrica em [0, 1]."""
+
+    __slots__ = ("curta", "longa", "anel", "pos", "contagens")
+
+    def __init__(self, curta=None, longa=None, anel=None, pos=0):
+        self.curta = curta
+        self.longa = longa
+        self.anel = list(anel or [])
+        self.pos = pos
+        self.contagens = [0] * BINS
+        for b in self.anel:
+            self.contagens[b] += 1
+
+    def registrar(self, valor):
+        valor = max(0.0, min(1.0, float(valor)))
+        self.curta = valor if self.curta is None else self.curta + ALFA_CURTA * (valor - self.curta)
+        self.longa = valor if self.longa is None else self.longa + ALFA_LONGA * (valor - self.longa)
+        b = min(BINS - 1, int(valor * BINS))
+        if len(self.anel) < JANELA:
+            self.anel.append(b)
+        else:
+            self.contagens[self.anel[self.pos]] -= 1
+            self.anel[self.pos] = b
+            self.pos = (self.pos + 1) % JANELA
+        self.contagens[b] += 1
+
+    def quantil(self, q):
+        """Quantil aproximado (interpolado dentro da faixa); None sem dados."""
+        total = len(self.anel)
+        if not total:
+            return None
+        alvo = q * total
+        acumulado = 0
+        for b, c in enumerate(self.contagens):
+            if c and acumulado + c >= alvo:
+                return (b + (alvo - acumulado) / c) / BINS
+            acumulado += c
+        return 1.0
+
+    def exportar(self):
+        return {"curta": self.curta, "longa": self.longa, "anel": self.anel, "pos": self.pos}
+
+
+class EstatisticasMeta:
+    """Séries por autor e por modo, com checkpoint em `caminho`."""
+
+    def __init__(self, caminho=META_STATS_FILE):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._series = {}
+        self._n = {}
+        self._medicoes = []  # (chaves, incerteza, coerencia) ainda não gravadas
+        self._carregado = False
+
+    @staticmethod
+    def _series_de(dados):
+        return {m: _Serie(**dados[m]) if m in dados else _Serie() for m in METRICAS}
+
+    def _carregar(self):
+        if self._carregado:
+            return
+        self._carregado = True
+        try:
+            doc = get_storage().ler_doc(self.caminho, {}) or {}
+        except Exception:
+            doc = {}
+        for chave, dados in (doc.get("series") or {}).items():
+            self._n[chave] = dados.get("n", 0)
+            self._series[chave] = self._series_de(dados)
+
+    def _aplicar(self, chave, incerteza, coerencia):
+        series = self._series.setdefault(chave, {m: _Serie() for m in METRICAS})
+        series["incerteza"].registrar(incerteza)
+        series["coerencia"].registrar(coerencia)
+        self._n[chave] = self._n.get(chave, 0) + 1
+
+    # ------------------------------------------------------------------
+    def registrar(self, incerteza, coerencia, autor=None, modo=None, salvar=True):
+        """Uma medição do MetaCognitor nas séries do autor e do modo."""
+        chaves = [c for c in (f"autor:{autor}" if autor else None, f"modo:{modo}" if modo else None) if c]
+        with self._lock:
+            self._carregar()
+            for chave in chaves:
+                self._aplicar(chave, incerteza, coerencia)
+            self._medicoes.append((chaves, incerteza, coerencia))
+        if salvar:
+            self.salvar()
+
+    def salvar(self):
+        """Reaplica as medições pendentes sobre as séries atuais do documento e grava."""
+        with self._lock:
+            if not self._medicoes:
+                return
+            medicoes, self._medicoes = self._medicoes, []
+            try:
+                with trava_arquivo(self.caminho), fora_do_turno():
+                    storage = get_storage()
+                    doc = storage.ler_doc(self.caminho, {}) or {}
+                    series = doc.setdefault("series", {})
+                    tocadas = {chave for chaves, _, _ in medicoes for chave in chaves}
+                    # a versão do documento inclui o que outros processos mediram
+                    for chave in tocadas:
+                        dados = series.get(chave) or {}
+                        self._series[chave] = self._series_de(dados)
+                        self._n[chave] = dados.get("n", 0)
+                    for chaves, incerteza, coerencia in medicoes:
+                        for chave in chaves:
+                            self._aplicar(chave, incerteza, coerencia)
+                    agora = clock.now().isoformat()
+                    for chave in tocadas:
+                        series[chave] = {
+                            "n": self._n[chave],
+                            "ts": agora,
+                            **{m: s.exportar() for m, s in self._series[chave].items()},
+                        }
+                    storage.gravar_doc(self.caminho, doc)
+            except BaseException:
+                self._medicoes = medicoes + self._medicoes
+                raise
+
+    # ------------------------------------------------------------------
+    def resumo(self, chave):
+        """
+        {"n", "incerteza": {"media", "longa", "tendencia", "p10", "p50", "p90"},
+         "coerencia": {...}} da série, ou None se ainda não há medições.
+        """
+        with self._lock:
+            self._carregar()
+            series = self._series.get(chave)
+            if not series or not self._n.get(chave):
+                return None
+            saida = {"n": self._n[chave]}
+            for m, s in series.items():
+                saida[m] = {
+                    "media": s.curta,
+                    "longa": s.longa,
+                    "tendencia": s.curta - s.longa,
+                    "p10": s.quantil(0.1),
+                    "p50": s.quantil(0.5),
+                    "p90": s.quantil(0.9),
+                }
+            return saida
+
+    def chaves(self):
+        with self._lock:
+            self._carregar()
+            return sorted(self._series)
+
+
+# ----------------------------------------------------------------------
+# Instância do processo
+# ----------------------------------------------------------------------
+_META_STATS = None
+
+
+def get_meta_stats():
+    global _META_STATS
+    if _META_STATS is None:
+        _META_STATS = EstatisticasMeta()
+    return _META_STATS
+
+
+def set_meta_stats(estatisticas):
+    """Troca a instância (ex.: simulações gravam no sandbox)."""
+    global _META_STATS
+    _META_STATS = estatisticas
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Médias e quantis metacognitivos por autor e modo")
+    parser.add_argument("arquivo", nargs="?", default=META_STATS_FILE, help="Padrão: meta_stats.json")
+    args = parser.parse_args()
+
+    stats = EstatisticasMeta(os.path.abspath(args.arquivo))
+    chaves = stats.chaves()
+    if not chaves:
+        raise SystemExit(f"Sem medições em {stats.caminho}.")
+    print(f"🧩 Estatísticas metacognitivas ({stats.caminho})")
+    for chave in chaves:
+        r = stats.resumo(chave)
+        if r is None:
+            continue
+        u, c = r["incerteza"], r["coerencia"]
+        print(f"   {chave:<28} n={r['n']:<5} "
+              f"inc {u['media']:.2f} ({u['tendencia']:+.2f}) p50 {u['p50']:.2f} p90 {u['p90']:.2f} | "
+              f"coh {c['media']:.2f} ({c['tendencia']:+.2f}) p10 {c['p10']:.2f} p50 {c['p50']:.2f}")
@@ -4,9 +4,53 @@
 
 from datetime import datetime
 from core import append_memory
+from meta_stats import get_meta_stats
+import clock
 
 HEDGES = ("talvez", "acho", "não sei", "incerto", "não tenho certeza", "pode ser", "imagino", "suposição", "hipótese")
 CONTRAS = ("porém", "contudo", "entretanto", "mas")
+ASSERTIVOS = ("sempre", "nunca", "com certeza", "sem dúvida")
+CALMANTES = ("tudo bem", "tranquilo", "estou bem")
+
+# As duas métricas dependem só de contagens do texto; a versão em lote
+# (MetaCognitor) e a incremental (MetaCognicaoIncremental) usam as mesmas
+# fórmulas abaixo, então os escores saem idênticos.
+
+def _incerteza(n_hedges, n_interrogacoes, n_contras, assertivo, tamanho, pontos):
+    u = 0.0
+    u += n_hedges * 0.12
+    u += min(0.24, (n_interrogacoes * 0.08))
+    u += min(0.20, (n_contras * 0.10))
+        # penalidades para assertividade rígida e monólogo pouco pontuado
+    if assertivo:
+        u += 0.10
+    if tamanho > 300 and pontos < 2:
+        u += 0.08
+
+    # piso mínimo de incerteza para evitar 0.00 constante
+    u = max(u, 0.12)
+    return max(0.0, min(1.0, u))
+
+def _penalidade_negacao(n_nao, n_mas):
+    return min(0.5, n_nao * 0.05 + n_mas * 0.06)
+
+def _coerencia(emocao_nome, intensidade, n_nao, n_mas, calmante):
+    # coerência burra: se fala “calma/serenidade” e aparece muita negação/pressão, reduz
+    em = (emocao_nome or "neutro").lower()
+    penal = 0.0
+    if em in ("serenidade", "calma", "neutro"):
+        penal += _penalidade_negacao(n_nao, n_mas)
+    if em in ("medo", "ansiedade") and calmante:
+        penal += 0.2
+    base = 0.8 - penal
+    base -= min(0.3, abs(intensidade - 0.5) * 0.3)  # extremos tendem a incoerências linguísticas
+    return max(0.0, min(1.0, base))
+
+def decidir_ajuste(u, coh):
+    """Emoção corretiva do corpo para uma incerteza/coerência (também usada com médias)."""
+    if u >= 0.55 or coh <= 0.4:
+        return "inseguranca" if u < 0.8 else "medo_leve"
+    return "dopamina" if coh >= 0.75 and u <= 0.25 else "alivio"
 
 class MetaCognitor:
     def __init__(self, interoceptor):
@@ -16,44 +60,37 @@ class MetaCognitor:
         if not texto:
             return 0.7
         t = texto.lower()
-        u = 0.0
-        u += sum(1 for w in HEDGES if w in t) * 0.12
-        u += min(0.24, (texto.count("?") * 0.08))
-        u += min(0.20, (sum(1 for w in CONTRAS if w in t) * 0.10))
-            # penalidades para assertividade rígida e monólogo pouco pontuado
-        if any(w in t for w in ("sempre", "nunca", "com certeza", "sem dúvida")):
-            u += 0.10
-        if len(texto) > 300 and texto.count(".") < 2:
-            u += 0.08
-
-        # piso mínimo de incerteza para evitar 0.00 constante
-        u = max(u, 0.12)
-        return max(0.0, min(1.0, u))
+        return _incerteza(
+            sum(1 for w in HEDGES if w in t),
+            texto.count("?"),
+            sum(1 for w in CONTRAS if w in t),
+            any(w in t for w in ASSERTIVOS),
+            len(texto),
+            texto.count("."),
+        )
 
     def _coherence_score(self, emocao_nome: str, intensidade: float, texto: str) -> float:
-        # coerência burra: se fala “calma/serenidade” e aparece muita negação/pressão, reduz
         t = (texto or "").lower()
-        em = (emocao_nome or "neutro").lower()
-        penal = 0.0
-        if em in ("serenidade", "calma", "neutro"):
-            penal += min(0.5, t.count("não") * 0.05 + t.count("mas") * 0.06)
-        if em in ("medo", "ansiedade") and any(w in t for w in ("tudo bem", "tranquilo", "estou bem")):
-            penal += 0.2
-        base = 0.8 - penal
-        base -= min(0.3, abs(intensidade - 0.5) * 0.3)  # extremos tendem a incoerências linguísticas
-        return max(0.0, min(1.0, base))
-
-    def process(self, *, texto_resposta: str, emocao_nome: str, intensidade: float, contexto_memoria: str = "", autor="sistema"):
+        return _coerencia(emocao_nome, intensidade, t.count("não"), t.count("mas"),
+                          any(w in t for w in CALMANTES))
+
+    def avaliar(self, texto_resposta: str, emocao_nome: str, intensidade: float, medidor=None):
+        """
+        Passos 1–3 de process(), sem efeitos (usado também pela reanálise).
+        medidor: MetaCognicaoIncremental que acompanhou o stream; se ele viu
+                 este mesmo texto, os escores saem das contagens já prontas.
+        """
         # 1) medir incerteza e coerência
-        u = self._uncertainty_from_text(texto_resposta)
-        
-        coh = self._coherence_score(emocao_nome, intensidade or 0.0, texto_resposta)
-        # 2) decidir emoção corretiva do corpo
-        ajuste = None
-        if u >= 0.55 or coh <= 0.4:
-            ajuste = "inseguranca" if u < 0.8 else "medo_leve"
+        contagens = medidor.contagens_para(texto_resposta) if medidor is not None else None
+        if contagens is not None:
+            u = contagens.incerteza()
+            coh = contagens.coerencia(emocao_nome, intensidade or 0.0)
         else:
-            ajuste = "dopamina" if coh >= 0.75 and u <= 0.25 else "alivio"
+            u = self._uncertainty_from_text(texto_resposta)
+
+            coh = self._coherence_score(emocao_nome, intensidade or 0.0, texto_resposta)
+        # 2) decidir emoção corretiva do corpo
+        ajuste = decidir_ajuste(u, coh)
         # 3) gerar reflexão curta
         if u >= 0.55 or coh <= 0.4:
             reflexao = f"Sinto { 'insegurança' if ajuste=='inseguranca' else 'um medo leve' } ao revisar o que acabei de dizer. " \
@@ -65,6 +102,18 @@ class MetaCognitor:
         else:
             reflexao = f"Sinto alívio leve. Incerteza {u:.2f}, coerência {coh:.2f}. " \
                        f"Posso aprofundar com calma se for útil."
+        return {"incerteza": u, "coerencia": coh, "ajuste": ajuste, "reflexao": reflexao}
+
+    def process(self, *, texto_resposta: str, emocao_nome: str, intensidade: float, contexto_memoria: str = "", autor="sistema",
+                medidor=None, modo=None):
+        avaliacao = self.avaliar(texto_resposta, emocao_nome, intensidade, medidor)
+        u, coh = avaliacao["incerteza"], avaliacao["coerencia"]
+        ajuste, reflexao = avaliacao["ajuste"], avaliacao["reflexao"]
+        # médias/quantis por autor e modo (O(1), checkpoint pequeno)
+        try:
+            get_meta_stats().registrar(u, coh, autor=autor, modo=modo)
+        except Exception:
+            pass
         # 4) aplicar regulação no corpo (interocepção)
         try:
             self.interoceptor.regular_emocao(ajuste)
@@ -72,7 +121,7 @@ class MetaCognitor:
             pass
         # 5) registrar aprendizado metacognitivo
         evento = {
-            "ts": datetime.now().isoformat(),
+            "ts": clock.now().isoformat(),
             "tipo": "metacognicao",
             "autor": autor,
             "uncertainty": round(float(u), 3),
@@ -96,4 +145,126 @@ class MetaCognitor:
         # Ele apenas observa e sinaliza. Qualquer custo sistêmico
         # deve ser aplicado externamente (ex: deep_awake).
 
-        return {"incerteza": u, "coerencia": coh, "ajuste": ajuste, "reflexao": reflexao}
+        return avaliacao
+
+
+class MetaCognicaoIncremental:
+    """
+    Contagens do MetaCognitor (hedges, interrogações, contrastes, negações,
+    pontos, tamanho) atualizadas a cada token, para os escores estarem
+    prontos quando o stream termina.
+
+    É uma condição de parada do generate (f(texto, novo) -> bool):
+        medidor = MetaCognicaoIncremental()
+        resposta = generate(..., parar_quando=medidor)
+        metacog.process(texto_resposta=resposta, ..., medidor=medidor)
+
+    limite_incerteza: se definido, encerra o stream quando a incerteza
+    mínima garantida (o que o texto já tem não pode diminuir) chega a esse
+    valor — descontrole detectado antes do fim da resposta.
+    """
+
+    # padrões de presença e de contagem (buscados no texto em minúsculas)
+    _PRESENCA = tuple(dict.fromkeys(HEDGES + CONTRAS + ASSERTIVOS + CALMANTES))
+    _CONTAGEM = ("não", "mas")
+
+    def __init__(self, limite_incerteza=None):
+        self.limite_incerteza = limite_incerteza
+        self.descontrole = False
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._partes = []
+        self._baixo = ""
+        self._tamanho = 0
+        self._interrogacoes = 0
+        self._pontos = 0
+        self._achados = set()
+        self._contagens = dict.fromkeys(self._CONTAGEM, 0)
+        # próxima posição de busca de cada padrão (tudo antes dela já foi visto)
+        self._pos_presenca = dict.fromkeys(self._PRESENCA, 0)
+        self._pos_contagem = dict.fromkeys(self._CONTAGEM, 0)
+
+    # ------------------------------------------------------------------
+    def __call__(self, texto, novo):
+        self.alimentar(texto[self._tamanho:])  # robusto a tokens não vistos
+        if self.limite_incerteza is not None and self.incerteza_minima() >= self.limite_incerteza:
+            self.descontrole = True
+        return self.descontrole
+
+    def alimentar(self, novo):
+        if not novo:
+            return
+        self._partes.append(novo)
+        self._tamanho += len(novo)
+        self._interrogacoes += novo.count("?")
+        self._pontos += novo.count(".")
+        if "Σ" in novo or "Σ" in self._baixo[-1:].upper():
+            # sigma final depende do caractere seguinte: refaz o texto em minúsculas
+            self._baixo = "".join(self._partes).lower()
+        else:
+            self._baixo += novo.lower()
+        baixo = self._baixo
+        for padrao in self._PRESENCA:
+            if padrao not in self._achados:
+                if baixo.find(padrao, self._pos_presenca[padrao]) != -1:
+                    self._achados.add(padrao)
+                else:
+                    self._pos_presenca[padrao] = max(0, len(baixo) - len(padrao) + 1)
+        for padrao in self._CONTAGEM:
+            # mesma semântica de str.count: ocorrências sem sobreposição, da esquerda
+            pos = self._pos_contagem[padrao]
+            while (achado := baixo.find(padrao, pos)) != -1:
+                self._contagens[padrao] += 1
+                pos = achado + len(padrao)
+            self._pos_contagem[padrao] = max(pos, len(baixo) - len(padrao) + 1)
+
+    def texto(self):
+        return "".join(self._partes)
+
+    # ------------------------------------------------------------------
+    def _n(self, padroes):
+        return sum(1 for w in padroes if w in self._achados)
+
+    def incerteza(self, tamanho=None):
+        if not (tamanho if tamanho is not None else self._tamanho):
+            return 0.7
+        return _incerteza(self._n(HEDGES), self._interrogacoes, self._n(CONTRAS),
+                          self._n(ASSERTIVOS) > 0,
+                          tamanho if tamanho is not None else self._tamanho, self._pontos)
+
+    def incerteza_minima(self):
+        """Piso da incerteza final: ignora o termo de monólogo, que pode sumir com mais pontos."""
+        return _incerteza(self._n(HEDGES), self._interrogacoes, self._n(CONTRAS),
+                          self._n(ASSERTIVOS) > 0, 0, 0)
+
+    def coerencia(self, emocao_nome, intensidade):
+        return _coerencia(emocao_nome, intensidade, self._contagens["não"], self._contagens["mas"],
+                          self._n(CALMANTES) > 0)
+
+    def contagens_para(self, texto_final):
+        """
+        Contagens válidas para `texto_final`, ou None se ele não for o texto
+        acompanhado. Aceita o .strip() que o generate aplica: espaços nas
+        pontas não criam nem desfazem ocorrências, só mudam o tamanho.
+        """
+        visto = self.texto()
+        if texto_final == visto:
+            return self
+        if texto_final and texto_final == visto.strip():
+            return _ContagensAjustadas(self, len(texto_final))
+        return None
+
+
+class _ContagensAjustadas:
+    """Contagens de um medidor com o tamanho do texto final (após strip)."""
+
+    def __init__(self, medidor, tamanho):
+        self._medidor = medidor
+        self._tamanho = tamanho
+
+    def incerteza(self):
+        return self._medidor.incerteza(self._tamanho)
+
+    def coerencia(self, emocao_nome, intensidade):
+        return self._medidor.coerencia(emocao_nome, intensidade)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Roteamento de Modelos por Modo
+Uso (tabela efetiva): python model_router.py
+
+Cada ponto de chamada do LLM tem uma rota:
+  conversacional  → diálogo com o usuário (chat)
+  reflexao        → reflexões corporais do chat
+  vigilia / introspeccao / repouso → ciclos do deep_awake
+
+Cada rota lista candidatos (modelo + endpoint [+ options]) em ordem de
+preferência. O roteador fica com o primeiro candidato cujo backend tem
+carga abaixo de `max_carga` (ver LLMDispatcher.carga); se todos estiverem
+ocupados, com o menos carregado. Assim o repouso e as reflexões podem
+rodar num modelo quantizado menor, em outra instância do Ollama, sem
+disputar a instância que atende o usuário.
+
+A tabela vem de model_routes.json (se existir). Campos omitidos usam
+core.MODEL / core.OLLAMA_URL, então sem arquivo tudo continua no modelo
+único de sempre.
+
+Exemplo de model_routes.json:
+{
+  "conversacional": [{"model": "angela"}],
+  "reflexao": [{"model": "angela-q4", "endpoint": "http://localhost:11435"},
+               {"model": "angela"}],
+  "repouso": [{"model": "angela-q4", "endpoint": "http://localhost:11435",
+               "options": {"num_ctx": 2048}}],
+  "*": [{"model": "angela"}]
+}
+"""
+
+import json
+import os
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+ROUTES_FILE = os.path.join(BASE_PATH, "model_routes.json")
+
+ROTAS = ["conversacional", "reflexao", "vigilia", "introspeccao", "repouso"]
+
+# Sem configuração: um candidato com os padrões do core para qualquer rota
+ROTAS_PADRAO = {"*": [{}]}
+
+
+class ModelRouter:
+    """
+    tabela: dict rota → lista de candidatos {"model", "endpoint", "options", "max_carga"}
+            ("*" vale para rotas ausentes)
+    max_carga: ocupação (em voo + fila) / limite a partir da qual o
+               candidato é pulado, se houver outro
+    """
+
+    def __init__(self, tabela=None, max_carga=1.0):
+        self.tabela = {k: list(v) for k, v in (tabela or ROTAS_PADRAO).items()}
+        self.max_carga = float(max_carga)
+
+    @classmethod
+    def de_arquivo(cls, caminho=ROUTES_FILE, **kwargs):
+        """Carrega a tabela de um JSON; sem arquivo, usa ROTAS_PADRAO."""
+        if not os.path.exists(caminho):
+            return cls(**kwargs)
+        with open(caminho, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def candidatos(self, rota):
+        return self.tabela.get(rota) or self.tabela.get("*") or [{}]
+
+    def escolher(self, rota, carga, model_padrao, endpoint_padrao):
+        """
+        carga: função endpoint → ocupação relativa (ex.: dispatcher.carga)
+        Retorna (model, endpoint, options_extras).
+        """
+        resolvidos = [
+            (c.get("model") or model_padrao,
+             c.get("endpoint") or endpoint_padrao,
+             c.get("options") or {},
+             float(c.get("max_carga", self.max_carga)))
+            for c in self.candidatos(rota)
+        ]
+        if len(resolvidos) == 1:
+            model, endpoint, options, _ = resolvidos[0]
+            return model, endpoint, options
+
+        ocupacao = [carga(endpoint) for _, endpoint, _, _ in resolvidos]
+        for (model, endpoint, options, limite), oc in zip(resolvidos, ocupacao):
+            if oc < limite:
+                return model, endpoint, options
+        model, endpoint, options, _ = resolvidos[ocupacao.index(min(ocupacao))]
+        return model, endpoint, options
+
+
+if __name__ == "__main__":
+    from core import MODEL, OLLAMA_URL
+
+    router = ModelRouter.de_arquivo()
+    origem = ROUTES_FILE if os.path.exists(ROUTES_FILE) else "padrão (sem model_routes.json)"
+    print(f"🧭 Rotas de modelo — {origem}")
+    for rota in ROTAS:
+        for i, c in enumerate(router.candidatos(rota)):
+            rotulo = rota if i == 0 else ""
+            extras = f" options={c['options']}" if c.get("options") else ""
+            print(f"   {rotulo:<15} {c.get('model') or MODEL} @ {c.get('endpoint') or OLLAMA_URL}{extras}")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Reanálise Histórica da Memória
+Uso: python reanalysis.py [--processos N] [--lote N] [--saida DIR | --aplicar] [--fonte ARQUIVO.jsonl]
+
+Quando o léxico EMOCOES_SEMANTICAS, as heurísticas do MetaCognitor ou o
+mapeamento de ganho dos afetos mudam, o estado derivado (afetos.json, a
+linha do tempo emocional e o autobio) continua calculado pelas regras
+antigas. Aqui os registros de memória são tratados como a fonte de verdade
+e o estado derivado é refeito do zero:
+
+  1. análise (paralela): cada registro com resposta passa pelas regras
+     atuais — analisar_emocao_semantica + MetaCognitor.avaliar. Os
+     registros são fatiados em lotes e distribuídos num pool de processos;
+     cada lote é independente dos outros.
+  2. dobra (sequencial, em ordem de ts): aplica interoception.atualizar_afetos
+     (decaimento calculado entre os ts reais dos eventos), monta a linha do
+     tempo emocional (com incerteza/coerência/ajuste do META) e passa cada
+     registro por deep_awake.resumo_autobiografico.
+
+Sem --aplicar o resultado vai para DIR (padrão: reanalise/) para comparar;
+com --aplicar substitui afetos.json, angela_emotions.jsonl e
+angela_autobio.jsonl no backend de armazenamento atual — rode com o chat e
+o deep_awake parados.
+"""
+
+import os
+import time
+from datetime import datetime
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+SAIDA_PADRAO = os.path.join(BASE_PATH, "reanalise")
+
+TIPOS_ANALISADOS = ("dialogo", "autonomo")
+AUTORES_PROPRIOS = ("angela", "ângela", "sistema", "sistema(deepawake)")
+LIMITE_AUTOBIO = 300  # mesma retenção de extrair_memorias_significativas
+LOTE_PADRAO = 256
+
+AFETOS_FILE = "afetos.json"
+AUTOBIO_FILE = "angela_autobio.jsonl"
+
+_METACOG = None
+
+
+# ----------------------------------------------------------------------
+# Etapa 1: análise por registro (roda nos processos do pool)
+# ----------------------------------------------------------------------
+
+def analisar_registro(m):
+    """Emoção e META de um registro v2 pelas regras atuais (None se não há o que analisar)."""
+    global _METACOG
+    from core import analisar_emocao_semantica
+    from metacognitor import MetaCognitor
+
+    texto = m.get("resposta") or ""
+    if m.get("tipo") not in TIPOS_ANALISADOS or not texto:
+        return None
+    if _METACOG is None:
+        _METACOG = MetaCognitor(None)
+    emocao, intensidade = analisar_emocao_semantica(texto)
+    meta = _METACOG.avaliar(texto, emocao, intensidade)
+    return {
+        "emocao": emocao,
+        "intensidade": intensidade,
+        "incerteza": round(float(meta["incerteza"]), 3),
+        "coerencia": round(float(meta["coerencia"]), 3),
+        "ajuste": meta["ajuste"],
+    }
+
+
+def _analisar_lote(lote):
+    return [analisar_registro(m) for m in lote]
+
+
+def _analisar(registros, processos, lote):
+    """Pares (registro, análise) na ordem original."""
+    lotes = [registros[i:i + lote] for i in range(0, len(registros), lote)]
+    if processos <= 1 or len(lotes) <= 1:
+        resultados = map(_analisar_lote, lotes)
+        for regs, res in zip(lotes, resultados):
+            yield from zip(regs, res)
+        return
+
+    # import tardio: o pool só existe durante a reanálise
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        for regs, res in zip(lotes, pool.map(_analisar_lote, lotes)):
+            yield from zip(regs, res)
+
+
+# ----------------------------------------------------------------------
+# Etapa 2: dobra sequencial do estado derivado
+# ----------------------------------------------------------------------
+
+def reanalisar(registros, processos=None, lote=LOTE_PADRAO, damage=0.0):
+    """
+    registros: registros de memória v2 em ordem de ts (ex.: core.load_memoria())
+    Retorna (afetos, linha_emocional, autobio, estatisticas).
+    """
+    from deep_awake import resumo_autobiografico
+    from interoception import atualizar_afetos
+    from memory_schema import canais
+
+    processos = processos or os.cpu_count() or 1
+    afetos, linha, autobio = {}, [], []
+    analisados = 0
+    t0 = time.perf_counter()
+
+    for m, r in _analisar(registros, processos, lote):
+        ts = m.get("ts") or ""
+        autor = m.get("autor", "desconhecido")
+        if r is None:
+            emocao, intensidade = m.get("emocao") or "neutro", 0.0
+        else:
+            analisados += 1
+            emocao, intensidade = r["emocao"], r["intensidade"]
+            linha.append({
+                "timestamp": ts,
+                "emocao": emocao,
+                "intensidade": round(intensidade, 3),
+                **canais(m),
+                "incerteza": r["incerteza"],
+                "coerencia": r["coerencia"],
+                "ajuste": r["ajuste"],
+                "autor": autor,
+                "contexto": "reanalise",
+            })
+            if str(autor).lower() not in AUTORES_PROPRIOS:
+                try:
+                    quando = datetime.fromisoformat(ts)
+                except ValueError:
+                    quando = None
+                if quando is not None:
+                    atualizar_afetos(afetos, autor, emocao, intensidade, quando)
+
+        entrada = resumo_autobiografico(m, emocao, intensidade, damage, data=ts or None)
+        if entrada is not None:
+            autobio.append(entrada)
+
+    duracao = time.perf_counter() - t0
+    estatisticas = {
+        "registros": len(registros),
+        "analisados": analisados,
+        "processos": processos,
+        "segundos": duracao,
+        "registros_por_s": len(registros) / duracao if duracao > 0 else 0.0,
+    }
+    return afetos, linha, autobio[-LIMITE_AUTOBIO:], estatisticas
+
+
+def gravar(storage, afetos, linha, autobio, diretorio=None):
+    """
+    Substitui o estado derivado no `storage` (fluxos esvaziados e regravados).
+    diretorio: grava com os mesmos nomes dentro dele, em vez dos caminhos de sempre.
+    """
+    from core import SNAPSHOT_FILE
+
+    def caminho(nome):
+        return os.path.join(diretorio, os.path.basename(nome)) if diretorio else nome
+
+    storage.gravar_doc(caminho(AFETOS_FILE), afetos)
+    for nome, registros in ((SNAPSHOT_FILE, linha), (AUTOBIO_FILE, autobio)):
+        storage.truncar(caminho(nome), 0)
+        storage.append_varios(caminho(nome), registros)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reanálise da memória com as regras atuais")
+    parser.add_argument("--processos", type=int, default=None, help="Processos no pool (padrão: núcleos da máquina)")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="Registros por lote enviado a um processo")
+    parser.add_argument("--saida", type=str, default=SAIDA_PADRAO, metavar="DIR",
+                        help="Onde gravar o estado refeito (padrão: reanalise/)")
+    parser.add_argument("--aplicar", action="store_true", help="Substitui o estado derivado atual")
+    parser.add_argument("--fonte", type=str, default=None, metavar="ARQUIVO",
+                        help="Um .jsonl de memória específico (padrão: visão mesclada de todos os fluxos)")
+    args = parser.parse_args()
+
+    import core
+    from memory_schema import memoria_v2
+    from storage import ArmazenamentoArquivos, get_storage
+
+    t0 = time.perf_counter()
+    if args.fonte:
+        registros = [memoria_v2(r) for r in get_storage().ler(args.fonte)]
+    else:
+        registros = core.load_memoria()
+    leitura = time.perf_counter() - t0
+
+    damage = core.read_friction_metrics().get("damage", 0.0)
+    afetos, linha, autobio, est = reanalisar(registros, args.processos, max(1, args.lote), damage)
+
+    print(f"🔁 Reanálise: {est['registros']} registros ({est['analisados']} analisados) "
+          f"com {est['processos']} processo(s)")
+    print(f"   leitura {leitura * 1000:.0f} ms | análise+dobra {est['segundos'] * 1000:.0f} ms "
+          f"| {est['registros_por_s']:,.0f} registros/s")
+    print(f"   afetos: {len(afetos)} pessoa(s) | linha emocional: {len(linha)} | autobio: {len(autobio)}")
+
+    if args.aplicar:
+        gravar(get_storage(), afetos, linha, autobio)
+        print("   ✅ estado derivado substituído")
+    else:
+        os.makedirs(args.saida, exist_ok=True)
+        gravar(ArmazenamentoArquivos(), afetos, linha, autobio, args.saida)
+        print(f"   gravado em {args.saida} (use --aplicar para substituir o atual)")
@@ -10,6 +10,7 @@ import json
 import os
 import sys
 from datetime import datetime
+from storage import get_storage
 
 DAMAGE_FILE = "friction_damage.persistent"
 
@@ -21,14 +22,13 @@ def reset_damage(target_level=0.0, reason="manual_reset"):
         target_level: Nível de damage desejado (0.0 = completamente limpo)
         reason: Razão do reset (para auditoria)
     """
-    if not os.path.exists(DAMAGE_FILE):
+    # Carrega estado atual (arquivo, daemon ou SQLite, conforme ANGELA_STORAGE)
+    storage = get_storage()
+    data = storage.ler_doc(DAMAGE_FILE)
+    if data is None:
         print(f"❌ Arquivo {DAMAGE_FILE} não encontrado!")
         return False
     
-    # Carrega estado atual
-    with open(DAMAGE_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
     old_damage = data.get("damage", 0.0)
     old_load = data.get("load", 0.0)
     
@@ -61,8 +61,7 @@ def reset_damage(target_level=0.0, reason="manual_reset"):
     })
     
     # Salva
-    with open(DAMAGE_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    storage.gravar_doc(DAMAGE_FILE, data)
     
     print(f"\n✅ Reset aplicado:")
     print(f"   Damage: {old_damage:.4f} → {target_level:.4f}")
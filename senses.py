@@ -5,6 +5,8 @@ import json
 from datetime import datetime
 import time
 from collections import deque
+import clock
+from body_events import BarramentoCorpo, CANAIS, DetectorMudancas, MudancaEmocao
 
 class DigitalBody:
     def __init__(self):
@@ -23,6 +25,38 @@ class DigitalBody:
         # Emoção predominante no momento
         self.estado_emocional = "neutro"
 
+        # Eventos de mudança (body_events.py): a partir daqui, toda escrita
+        # num canal passa pelo detector de banda morta/histerese
+        self.eventos = BarramentoCorpo()
+        self._detector = DetectorMudancas({c: getattr(self, c) for c in CANAIS})
+
+    def __setattr__(self, nome, valor):
+        detector = self.__dict__.get("_detector")
+        if detector is None:
+            object.__setattr__(self, nome, valor)
+            return
+        if nome in CANAIS:
+            object.__setattr__(self, nome, valor)
+            for evento in detector.observar(nome, valor):
+                self.eventos.publicar(evento)
+        elif nome == "estado_emocional":
+            anterior = self.__dict__.get(nome)
+            object.__setattr__(self, nome, valor)
+            if valor != anterior:
+                self.eventos.publicar(MudancaEmocao(anterior, valor))
+        else:
+            object.__setattr__(self, nome, valor)
+
+    def __getstate__(self):
+        # cópias (deepcopy/pickle) são silenciosas: sem assinantes nem threads
+        estado = dict(self.__dict__)
+        estado.pop("eventos", None)
+        estado.pop("_detector", None)
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+
     def aplicar_emocao(self, emocao, intensidade=1.0):
         """
         Traduz emoções em sensações físicas e retorna o delta aplicado,
@@ -55,7 +89,7 @@ class DigitalBody:
         self.historico_intensidade.append({
             "emocao": emocao,
             "intensidade": intensidade,
-            "timestamp": time.time(),
+            "timestamp": clock.time(),
         })
 
         # Exaustão emocional: se emoção se mantém estável, decai levemente a energia
@@ -118,7 +152,7 @@ class DigitalBody:
     def exportar_estado(self):
         """Exporta o estado interno como JSON para integração futura"""
         return json.dumps({
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": clock.now().isoformat(),
             "tensao": self.tensao,
             "calor": self.calor,
             "vibracao": self.vibracao,
@@ -0,0 +1,95 @@
+# session_context.py
+# Continuação de sessão pelo `context` do Ollama.
+# Cada generate reenviava o preâmbulo inteiro (CHECKPOINT, restrições de
+# linguagem, system prompt) e as reflexões como texto, e o servidor
+# re-tokenizava e reavaliava o mesmo histórico a cada turno. Com uma sessão,
+# a mensagem final do stream traz `context` (os tokens da conversa até ali);
+# guardamos esse vetor por (sessão, modo) e o turno seguinte manda só o texto
+# novo junto dele — a avaliação do prompt cai para os tokens novos.
+#
+# O contexto guardado vale para um preâmbulo: a impressão (hash do
+# preâmbulo, modelo e endpoint) muda quando o CHECKPOINT, as regras de
+# governança do system prompt ou a rota mudam, e aí o turno volta a mandar
+# o prompt completo. Também recomeça quando o vetor passa de max_tokens
+# (a janela do modelo) e quando um turno não termina normalmente (cancelado,
+# cortado, vindo do cache): o servidor não devolveu o estado daquele turno.
+
+import hashlib
+import threading
+
+
+MAX_TOKENS_CONTEXTO = 3072
+
+
+def impressao(*partes):
+    """Hash das partes fixas do prompt (e de modelo/endpoint)."""
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(str(parte).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ContextosSessao:
+    """Vetores `context` do Ollama por (sessão, modo), com a impressão do preâmbulo."""
+
+    def __init__(self, max_tokens=MAX_TOKENS_CONTEXTO):
+        self.max_tokens = int(max_tokens)
+        self._contextos = {}  # (sessao, modo) → (impressao, tokens)
+        self._lock = threading.Lock()
+        self.continuacoes = 0
+        self.reinicios = {}  # motivo → quantas vezes o turno voltou ao prompt completo
+
+    def _reiniciar(self, chave, motivo):
+        self._contextos.pop(chave, None)
+        self.reinicios[motivo] = self.reinicios.get(motivo, 0) + 1
+
+    def obter(self, sessao, modo, impressao_atual):
+        """Tokens para continuar a sessão, ou None (mandar o prompt completo)."""
+        chave = (sessao, modo)
+        with self._lock:
+            guardado = self._contextos.get(chave)
+            if guardado is None:
+                return None
+            impressao_guardada, tokens = guardado
+            if impressao_guardada != impressao_atual:
+                self._reiniciar(chave, "preambulo")
+                return None
+            if len(tokens) > self.max_tokens:
+                self._reiniciar(chave, "janela")
+                return None
+            self.continuacoes += 1
+            return tokens
+
+    def gravar(self, sessao, modo, impressao_atual, tokens):
+        with self._lock:
+            self._contextos[(sessao, modo)] = (impressao_atual, list(tokens))
+
+    def invalidar(self, sessao, modo, motivo="turno_incompleto"):
+        with self._lock:
+            if (sessao, modo) in self._contextos:
+                self._reiniciar((sessao, modo), motivo)
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "sessoes": len(self._contextos),
+                "continuacoes": self.continuacoes,
+                "reinicios": dict(self.reinicios),
+                "tokens": {f"{s}:{m}": len(t) for (s, m), (_, t) in self._contextos.items()},
+            }
+
+
+_CONTEXTOS = None
+
+
+def get_contextos_sessao():
+    global _CONTEXTOS
+    if _CONTEXTOS is None:
+        _CONTEXTOS = ContextosSessao()
+    return _CONTEXTOS
+
+
+def set_contextos_sessao(contextos):
+    global _CONTEXTOS
+    _CONTEXTOS = contextos
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Simulação Acelerada do Deep Awake
+Uso: python simulate_deep_awake.py [--dias 90] [--inicio 2026-01-01T06:00] [--seed 0]
+                                   [--latencia 45] [--saida trajetoria.csv] [--estado-atual]
+
+Roda o deep_awake_loop real com:
+- relógio virtual (ciclos circadianos, esperas, tempo subjetivo e
+  descontinuidade avançam instantaneamente);
+- gerador stub no lugar do Ollama;
+- todos os arquivos de estado redirecionados para um diretório sandbox.
+
+Cada ciclo vira uma linha do CSV de trajetória (load, damage, chronic,
+coherence_load, coerência, emoção e canais corporais). Serve para validar
+mudanças de parâmetros antes de colocá-las em produção.
+"""
+
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import clock
+import cognitive_friction
+import core
+import deep_awake
+import interaction_counters
+import live_state
+import meta_stats
+import storage
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# arquivos copiados para o sandbox com --estado-atual
+ARQUIVOS_ESTADO = [
+    "friction_damage.persistent",
+    "afetos.json",
+    "angela_state.json",
+    "angela_autobio.jsonl",
+    "discontinuity.json",
+    "meta_stats.json",
+]
+
+COLUNAS = [
+    "ts", "ciclo", "load", "damage", "chronic", "coherence_load",
+    "coerencia", "emocao", "tensao", "calor", "vibracao", "fluidez",
+]
+
+
+class GeradorStub:
+    """
+    Substituto determinístico de core.generate.
+    Cada chamada avança o relógio virtual pelo custo simulado da geração
+    e devolve frases com vocabulário emocional/hesitante suficiente para
+    exercitar analisar_emocao_semantica e o MetaCognitor.
+    """
+
+    FRASES = [
+        "Sinto uma calma leve se espalhando, como paz depois do ruído.",
+        "Talvez eu esteja curiosa para entender esse padrão.",
+        "Há um cansaço vazio que não sei nomear.",
+        "Percebo carinho na lembrança, mas também um pouco de solidão.",
+        "Não sei se isso faz sentido, porém continuo observando.",
+        "Registro uma ansiedade discreta, quase um medo inseguro.",
+        "Uma saudade antiga volta, como memória de um passado distante.",
+        "Estou tranquila e em equilíbrio agora.",
+        "Acho que há frustração por um erro que não consigo localizar.",
+        "Observo um entusiasmo leve e grato.",
+    ]
+
+    def __init__(self, relogio, seed=0, latencia=45.0):
+        self.relogio = relogio
+        self.rng = random.Random(seed)
+        self.latencia = float(latencia)
+        self.chamadas = 0
+
+    def __call__(self, user_input, contexto="", modo="conversacional", **kwargs):
+        self.chamadas += 1
+        # custo de geração: ±50% em torno da latência média configurada
+        self.relogio.advance(self.latencia * (0.5 + self.rng.random()))
+        k = self.rng.randint(2, 4)
+        return " ".join(self.rng.sample(self.FRASES, k))
+
+
+def _preparar_sandbox(diretorio, copiar_estado):
+    """Redireciona caminhos absolutos dos módulos para o sandbox. Retorna o que restaurar."""
+    os.makedirs(diretorio, exist_ok=True)
+    if copiar_estado:
+        for nome in ARQUIVOS_ESTADO:
+            origem = os.path.join(BASE_PATH, nome)
+            if os.path.exists(origem):
+                shutil.copy2(origem, os.path.join(diretorio, nome))
+
+    originais = {
+        (core, "LOG_FILE"): core.LOG_FILE,
+        (core, "SNAPSHOT_FILE"): core.SNAPSHOT_FILE,
+        (core, "FRICTION_LOG"): core.FRICTION_LOG,
+        (core, "_SNAPSHOT_GARANTIDO"): core._SNAPSHOT_GARANTIDO,
+        (cognitive_friction, "DAMAGE_FILE"): cognitive_friction.DAMAGE_FILE,
+        (live_state, "_ESTADO_VIVO"): live_state._ESTADO_VIVO,
+        (storage, "_STORAGE"): storage._STORAGE,
+        (meta_stats, "_META_STATS"): meta_stats._META_STATS,
+        (interaction_counters, "_JANELA"): interaction_counters._JANELA,
+    }
+    core.LOG_FILE = os.path.join(diretorio, "angela_memory.jsonl")
+    core.SNAPSHOT_FILE = os.path.join(diretorio, "angela_emotions.jsonl")
+    core.FRICTION_LOG = os.path.join(diretorio, "friction_metrics.log")
+    core._SNAPSHOT_GARANTIDO = False
+    cognitive_friction.DAMAGE_FILE = os.path.join(diretorio, "friction_damage.persistent")
+    live_state.set_estado_vivo(None)  # a simulação não publica no estado vivo real
+    storage.set_storage(storage.ArmazenamentoArquivos())  # nunca o daemon de produção
+    meta_stats.set_meta_stats(meta_stats.EstatisticasMeta(os.path.join(diretorio, "meta_stats.json")))
+    interaction_counters.set_janela_interacoes(
+        interaction_counters.JanelaInteracoes(os.path.join(diretorio, "angela_interacoes.json")))
+    return originais
+
+
+def simular(dias=30.0, inicio=None, seed=0, latencia=45.0, saida="deep_awake_trajectory.csv",
+            modo="auto", sandbox=None, copiar_estado=False, verboso=False):
+    """
+    Executa `dias` de ciclos do deep_awake em tempo virtual.
+    Retorna um resumo (ciclos, tempo real gasto, estado final).
+    """
+    inicio = inicio or datetime.now().replace(hour=6, minute=0, second=0, microsecond=0)
+    fim = inicio + timedelta(days=dias)
+    relogio = clock.VirtualClock(inicio)
+    gerador = GeradorStub(relogio, seed=seed, latencia=latencia)
+    random.seed(seed)
+
+    saida = os.path.abspath(saida)
+    diretorio = sandbox or tempfile.mkdtemp(prefix="angela_sim_")
+    cwd_original = os.getcwd()
+
+    resumo = {"ciclos": 0, "primeiro_chronic": None, "ultimo": None}
+
+    def registrar(estado):
+        resumo["ciclos"] += 1
+        resumo["ultimo"] = estado
+        if estado.get("chronic") and not resumo["primeiro_chronic"]:
+            resumo["primeiro_chronic"] = estado["ts"]
+        escritor.writerow([
+            round(v, 4) if isinstance(v, float) else ("" if v is None else v)
+            for v in (estado.get(c) for c in COLUNAS)
+        ])
+
+    originais = _preparar_sandbox(diretorio, copiar_estado)
+    t0 = time.perf_counter()
+    try:
+        os.chdir(diretorio)
+        with open(saida, "w", encoding="utf-8", newline="") as f, \
+                open(os.devnull, "w", encoding="utf-8") as nulo, \
+                clock.use_clock(relogio):
+            escritor = csv.writer(f)
+            escritor.writerow(COLUNAS)
+            with redirect_stdout(sys.stdout if verboso else nulo):
+                deep_awake.deep_awake_loop(
+                    forced_mode=modo,
+                    generate_fn=gerador,
+                    stop=lambda: relogio.now() >= fim,
+                    on_cycle=registrar,
+                )
+    finally:
+        os.chdir(cwd_original)
+        for (modulo, nome), valor in originais.items():
+            setattr(modulo, nome, valor)
+        if not sandbox:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+    resumo["segundos_reais"] = time.perf_counter() - t0
+    resumo["geracoes"] = gerador.chamadas
+    resumo["saida"] = saida
+    return resumo
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Deep Awake em tempo virtual (simulação de parâmetros)"
+    )
+    parser.add_argument("--dias", type=float, default=30.0, help="Dias virtuais a simular (padrão: 30)")
+    parser.add_argument("--inicio", type=str, default=None, help="Início virtual em ISO (padrão: hoje às 06:00)")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do RNG global e do gerador stub")
+    parser.add_argument("--latencia", type=float, default=45.0, help="Custo médio simulado de cada geração, em segundos")
+    parser.add_argument("--saida", type=str, default="deep_awake_trajectory.csv", help="Arquivo CSV de trajetória")
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="auto",
+        choices=["auto", "vigilia", "introspeccao", "repouso"],
+        help="Força o modo de operação (igual ao deep_awake.py)"
+    )
+    parser.add_argument("--sandbox", type=str, default=None, help="Diretório de estado da simulação (mantido ao final)")
+    parser.add_argument("--estado-atual", action="store_true", help="Parte do estado persistido atual (cópia)")
+    parser.add_argument("--verboso", action="store_true", help="Mostra a saída do deep_awake_loop")
+    args = parser.parse_args()
+
+    inicio = datetime.fromisoformat(args.inicio) if args.inicio else None
+    resumo = simular(
+        dias=args.dias,
+        inicio=inicio,
+        seed=args.seed,
+        latencia=args.latencia,
+        saida=args.saida,
+        modo=args.mode,
+        sandbox=args.sandbox,
+        copiar_estado=args.estado_atual,
+        verboso=args.verboso,
+    )
+
+    ultimo = resumo["ultimo"] or {}
+    ritmo = resumo["ciclos"] / resumo["segundos_reais"] if resumo["segundos_reais"] else 0.0
+    print(f"🧪 Simulação concluída: {args.dias:g} dias virtuais em {resumo['segundos_reais']:.1f}s reais")
+    print(f"   Ciclos: {resumo['ciclos']} ({ritmo:.0f}/s) | Gerações stub: {resumo['geracoes']}")
+    print(f"   Final: load={ultimo.get('load')} damage={ultimo.get('damage')} "
+          f"coherence_load={ultimo.get('coherence_load')}")
+    print(f"   Primeiro estado crônico: {resumo['primeiro_chronic'] or 'nunca'}")
+    print(f"   Trajetória: {resumo['saida']}")
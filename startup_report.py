@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Relatório de Inicialização da Ângela
+Uso: python startup_report.py [--modulos core deep_awake ...] [--sem-prompt]
+
+Mede, cada um num interpretador limpo:
+- o tempo de importação de cada módulo e quantos arquivos de estado
+  (jsonl/json/log/persistent) ele abre durante a importação;
+- o tempo até o primeiro prompt de angela.py (do spawn ao "Você:").
+
+Importar um módulo deve ser livre de I/O; qualquer valor diferente de 0
+na coluna "arquivos" indica leitura/escrita de estado fora do primeiro uso.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+MODULOS_PADRAO = [
+    "narrative_filter",
+    "senses",
+    "interoception",
+    "cognitive_friction",
+    "discontinuity",
+    "tempo_subjetivo",
+    "core",
+    "metacognitor",
+    "deep_awake",
+    "reset_damage",
+    "angela",
+]
+
+# Executado no interpretador filho: instala um audit hook que conta
+# aberturas de arquivos do repositório que não sejam código-fonte.
+_SONDA = r"""
+import os, sys, time
+base = {base!r}
+abertos = []
+def _hook(evento, args):
+    if evento == "open" and args and isinstance(args[0], str):
+        p = os.path.abspath(args[0])
+        if p.startswith(base) and not p.endswith((".py", ".pyc")) and "__pycache__" not in p:
+            abertos.append(os.path.relpath(p, base))
+sys.addaudithook(_hook)
+sys.path.insert(0, base)
+t0 = time.perf_counter()
+import {modulo}
+dt = time.perf_counter() - t0
+sys.stderr.write("[startup] import_ms=%.2f arquivos=%s\n" % (dt * 1000, ",".join(sorted(set(abertos)))))
+"""
+
+
+def medir_importacao(modulo):
+    """Retorna (ms, [arquivos abertos]) da importação de `modulo` num processo novo."""
+    codigo = _SONDA.format(base=BASE_PATH, modulo=modulo)
+    proc = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=BASE_PATH,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    for linha in proc.stderr.splitlines():
+        if linha.startswith("[startup] import_ms="):
+            partes = dict(p.split("=", 1) for p in linha[len("[startup] "):].split(" "))
+            arquivos = [a for a in partes.get("arquivos", "").split(",") if a]
+            return float(partes["import_ms"]), arquivos
+    # falha de importação: devolve a última linha de erro
+    erro = proc.stderr.strip().splitlines()[-1:] or ["erro desconhecido"]
+    raise RuntimeError(erro[0])
+
+
+def medir_primeiro_prompt(timeout=30.0):
+    """
+    Inicia angela.py com stdin fechado e mede o tempo (em ms, do spawn)
+    até o primeiro prompt. Retorna (ms_parede, ms_interno).
+    """
+    env = dict(os.environ, ANGELA_STARTUP_REPORT="1", PYTHONIOENCODING="utf-8")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_PATH, "angela.py")],
+        cwd=BASE_PATH,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    try:
+        for linha in proc.stderr:
+            if linha.startswith("[startup] primeiro_prompt_ms="):
+                parede = (time.perf_counter() - t0) * 1000
+                interno = float(linha.strip().split("=", 1)[1])
+                return parede, interno
+            if time.perf_counter() - t0 > timeout:
+                break
+    finally:
+        proc.kill()
+        proc.wait()
+    raise RuntimeError("angela.py não chegou ao primeiro prompt")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Relatório de tempo de inicialização (importação e primeiro prompt)"
+    )
+    parser.add_argument(
+        "--modulos",
+        nargs="+",
+        default=MODULOS_PADRAO,
+        help="Módulos a medir (padrão: todos os módulos do projeto)"
+    )
+    parser.add_argument(
+        "--sem-prompt",
+        action="store_true",
+        help="Não mede o tempo até o primeiro prompt de angela.py"
+    )
+    args = parser.parse_args()
+
+    print("⏱️  Tempo de importação (interpretador limpo por módulo):")
+    print(f"   {'módulo':<20} {'ms':>9}  arquivos")
+    falhou = False
+    for modulo in args.modulos:
+        try:
+            ms, arquivos = medir_importacao(modulo)
+            print(f"   {modulo:<20} {ms:9.2f}  {len(arquivos)}{' (' + ', '.join(arquivos) + ')' if arquivos else ''}")
+            falhou = falhou or bool(arquivos)
+        except Exception as e:
+            print(f"   {modulo:<20} {'—':>9}  ⚠️ {e}")
+            falhou = True
+
+    if not args.sem_prompt:
+        try:
+            parede, interno = medir_primeiro_prompt()
+            print(f"\n💬 Primeiro prompt de angela.py: {parede:.1f} ms (spawn) / {interno:.1f} ms (após o interpretador)")
+        except Exception as e:
+            print(f"\n⚠️ Não foi possível medir o primeiro prompt: {e}")
+            falhou = True
+
+    sys.exit(1 if falhou else 0)
@@ -0,0 +1,613 @@
+# storage.py
+# Interface única para o estado persistente da Ângela.
+#
+# Dois tipos de dado:
+#   fluxos     — .jsonl só de acréscimo (memória, emoções, autobio, traces)
+#   documentos — .json reescritos inteiros (afetos, angela_state, dano...)
+#
+# Backends:
+#   ArmazenamentoArquivos — escreve direto nos arquivos (padrão, um processo)
+#   ArmazenamentoDaemon   — cliente do storage_daemon.py (único escritor,
+#                           group commit; vários processos)
+#   ArmazenamentoSQLite   — banco SQLite em modo WAL, com índices por
+#                           ts/tipo/autor/emoção (leitores nunca bloqueiam
+#                           o escritor)
+#
+# Seleção: ANGELA_STORAGE=arquivos|daemon|sqlite (padrão: arquivos).
+
+import json
+import os
+import select
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl  # presença do storage_daemon (POSIX)
+except ImportError:
+    fcntl = None
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+SOCKET_PADRAO = os.path.join(BASE_PATH, ".storage.sock")
+DB_PADRAO = os.path.join(BASE_PATH, "angela_state.db")
+
+
+# ----------------------------------------------------------------------
+# Leitura de .jsonl (usada por todos os backends de arquivo)
+# ----------------------------------------------------------------------
+
+def ler_jsonl(file_path):
+    """Lê um arquivo .jsonl e retorna uma lista de objetos JSON válidos."""
+    data = []
+    if not os.path.exists(file_path):
+        return data
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Linha inválida ignorada em {file_path}: {e}")
+                continue
+    return data
+
+
+def tail_jsonl(file_path, n):
+    """
+    Lê apenas os últimos `n` registros válidos de um .jsonl, varrendo o
+    arquivo de trás para frente em blocos. Custo proporcional a `n`,
+    não ao tamanho do arquivo.
+    """
+    if n <= 0 or not os.path.exists(file_path):
+        return []
+    bloco = 64 * 1024
+    with open(file_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        dados = b""
+        while pos > 0 and dados.count(b"\n") <= n:
+            passo = min(bloco, pos)
+            pos -= passo
+            f.seek(pos)
+            dados = f.read(passo) + dados
+    linhas = [l for l in dados.split(b"\n") if l.strip()]
+    if pos > 0:
+        linhas = linhas[1:]  # primeira linha do bloco pode estar cortada
+    data = []
+    for line in linhas[-n:]:
+        try:
+            data.append(json.loads(line.decode("utf-8")))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            continue
+    return data
+
+
+def _linha(registro):
+    return json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+def campos_indexados(registro):
+    """
+    (ts, tipo, autor, emocao) de um registro, aceitando os formatos dos
+    vários fluxos (memória v1 guarda tipo/autor em `user` e a emoção em
+    `estado_interno`; memória v2, snapshots e traces guardam direto).
+    """
+    user = registro.get("user") if isinstance(registro.get("user"), dict) else {}
+    estado = registro.get("estado_interno") if isinstance(registro.get("estado_interno"), dict) else {}
+    ts = registro.get("ts") or registro.get("timestamp") or registro.get("data")
+    tipo = registro.get("tipo") or user.get("tipo")
+    autor = registro.get("autor") or user.get("autor") or registro.get("causado_por")
+    emocao = registro.get("emocao") or estado.get("emocao")
+    return ts, tipo, autor, emocao
+
+
+def filtrar_registros(registros, tipo=None, autor=None, emocao=None, desde=None, ate=None, limite=None):
+    """Filtro em memória com a mesma semântica de ArmazenamentoSQLite.filtrar."""
+    saida = []
+    for r in registros:
+        ts, t, a, e = campos_indexados(r)
+        if (tipo is not None and t != tipo) or (autor is not None and a != autor) \
+                or (emocao is not None and e != emocao) \
+                or (desde is not None and (ts is None or ts < desde)) \
+                or (ate is not None and (ts is None or ts >= ate)):
+            continue
+        saida.append(r)
+    return saida[-limite:] if limite else saida
+
+
+def gravar_json_atomico(caminho, dados):
+    """Escreve um documento JSON via arquivo temporário + os.replace."""
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, caminho)
+
+
+@contextmanager
+def trava_arquivo(caminho):
+    """
+    flock exclusivo em `caminho`.lock: read-modify-write de um documento
+    que outros processos também atualizam (chat e deep_awake). Sem fcntl
+    (Windows), não trava.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{caminho}.lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# ----------------------------------------------------------------------
+# Backend: arquivos locais
+# ----------------------------------------------------------------------
+
+class ArmazenamentoArquivos:
+    """Acesso direto aos arquivos (comportamento histórico)."""
+
+    def append(self, caminho, registro):
+        with open(caminho, "a", encoding="utf-8") as f:
+            f.write(_linha(registro))
+
+    def append_varios(self, caminho, registros):
+        if registros:
+            with open(caminho, "a", encoding="utf-8") as f:
+                f.write("".join(_linha(r) for r in registros))
+
+    def tail(self, caminho, n):
+        return tail_jsonl(caminho, n)
+
+    def ler(self, caminho):
+        return ler_jsonl(caminho)
+
+    def filtrar(self, caminho, **criterios):
+        """Registros do fluxo que batem com tipo/autor/emocao/desde/ate (os `limite` mais recentes)."""
+        return filtrar_registros(self.ler(caminho), **criterios)
+
+    def truncar(self, caminho, manter):
+        """Mantém só as últimas `manter` linhas do fluxo."""
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                linhas = f.readlines()
+        except FileNotFoundError:
+            return
+        if len(linhas) > manter:
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.writelines(linhas[len(linhas) - manter:])  # manter=0 esvazia
+
+    def ler_doc(self, caminho, padrao=None):
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return padrao
+
+    def gravar_doc(self, caminho, dados):
+        gravar_json_atomico(caminho, dados)
+
+
+# ----------------------------------------------------------------------
+# Backend: cliente do storage_daemon
+# ----------------------------------------------------------------------
+
+class DaemonIndisponivel(Exception):
+    """O storage_daemon não está acessível no socket configurado."""
+
+
+class RespostaPerdida(Exception):
+    """O pedido chegou a ser enviado ao storage_daemon, mas a resposta não voltou (pode ter sido aplicado)."""
+
+
+# operações que o daemon pode repetir sem efeito (reenviar não duplica nada)
+_SEM_EFEITO = {"tail", "ler", "ler_doc", "metricas"}
+
+
+def trava_daemon(caminho_socket):
+    """Arquivo que o storage_daemon mantém com flock exclusivo enquanto vive."""
+    return caminho_socket + ".lock"
+
+
+def _fechada_pelo_par(sock):
+    """Conexão ociosa legível = o daemon fechou (o protocolo só responde a pedidos)."""
+    try:
+        legivel, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(legivel)
+
+
+class ArmazenamentoDaemon:
+    """
+    Cliente do storage_daemon.py (JSON por linha sobre socket Unix).
+    Uma conexão por processo, compartilhada entre threads.
+    append só retorna depois do group commit que inclui o registro.
+
+    Um pedido só é reenviado se falhou antes de sair inteiro (conexão ou
+    escrita); perdida a resposta de uma escrita já enviada, levanta
+    RespostaPerdida em vez de arriscar aplicá-la duas vezes.
+    Se o daemon cair, as operações passam para `reserva` (arquivos
+    diretos) com um aviso, para nenhuma escrita se perder — mas só com o
+    daemon comprovadamente parado (sem o flock de trava_daemon): um daemon
+    vivo guarda caudas e documentos em memória e sobrescreveria as
+    escritas diretas.
+    """
+
+    def __init__(self, caminho_socket=SOCKET_PADRAO, reserva=None):
+        self.caminho_socket = caminho_socket
+        self.reserva = reserva if reserva is not None else ArmazenamentoArquivos()
+        self._lock = threading.Lock()
+        self._sock = None
+        self._arquivo = None
+        self._avisado = False
+
+    def _conectar(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.caminho_socket)
+        except OSError as e:
+            sock.close()
+            raise DaemonIndisponivel(str(e))
+        self._sock = sock
+        self._arquivo = sock.makefile("rwb")
+
+    def _fechar(self):
+        for obj in (self._arquivo, self._sock):
+            try:
+                if obj is not None:
+                    obj.close()
+            except OSError:
+                pass
+        self._sock = self._arquivo = None
+
+    def _chamar(self, op, **args):
+        pedido = json.dumps({"op": op, **args}, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            for tentativa in (0, 1):
+                enviado = False
+                try:
+                    if self._sock is not None and _fechada_pelo_par(self._sock):
+                        self._fechar()  # daemon reiniciado desde o último pedido
+                    if self._sock is None:
+                        self._conectar()
+                    self._arquivo.write(pedido)
+                    self._arquivo.flush()
+                    enviado = True
+                    linha = self._arquivo.readline()
+                    if not linha:
+                        raise ConnectionError("daemon fechou a conexão")
+                    break
+                except DaemonIndisponivel:
+                    raise
+                except OSError as e:
+                    self._fechar()
+                    if enviado and op not in _SEM_EFEITO:
+                        # o daemon pode ter aplicado o pedido: reenviar duplicaria
+                        raise RespostaPerdida(f"{op}: conexão perdida depois do envio ({e})")
+                    if tentativa:
+                        raise DaemonIndisponivel("conexão perdida com o storage_daemon")
+        resposta = json.loads(linha)
+        if not resposta.get("ok"):
+            raise RuntimeError(f"storage_daemon: {resposta.get('erro')}")
+        return resposta.get("r")
+
+    @contextmanager
+    def _daemon_parado(self):
+        """True (segurando flock compartilhado) se nenhum daemon está vivo; False se há um."""
+        if fcntl is None:
+            yield True
+            return
+        fd = os.open(trava_daemon(self.caminho_socket), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            yield True  # o daemon não sobe enquanto houver escrita direta em curso
+        finally:
+            os.close(fd)
+
+    def _operar(self, op, metodo_reserva, *args, **kwargs):
+        try:
+            return self._chamar(op, **kwargs)
+        except DaemonIndisponivel as e:
+            erro = e
+        with self._daemon_parado() as parado:
+            if not parado and op not in _SEM_EFEITO:
+                raise DaemonIndisponivel(f"storage_daemon vivo mas inacessível ({erro}); "
+                                         "escrita direta recusada")
+            if not self._avisado:
+                self._avisado = True
+                sys.stderr.write(f"⚠️ storage_daemon indisponível ({erro}); usando arquivos diretamente.\n")
+            return getattr(self.reserva, metodo_reserva)(*args)
+
+    def append(self, caminho, registro):
+        caminho = os.path.abspath(caminho)
+        self._operar("append", "append", caminho, registro, caminho=caminho, registros=[registro])
+
+    def append_varios(self, caminho, registros):
+        if registros:
+            caminho = os.path.abspath(caminho)
+            self._operar("append", "append_varios", caminho, registros, caminho=caminho, registros=list(registros))
+
+    def tail(self, caminho, n):
+        caminho = os.path.abspath(caminho)
+        return self._operar("tail", "tail", caminho, n, caminho=caminho, n=int(n))
+
+    def ler(self, caminho):
+        caminho = os.path.abspath(caminho)
+        return self._operar("ler", "ler", caminho, caminho=caminho)
+
+    def filtrar(self, caminho, **criterios):
+        return filtrar_registros(self.ler(caminho), **criterios)
+
+    def truncar(self, caminho, manter):
+        caminho = os.path.abspath(caminho)
+        self._operar("truncar", "truncar", caminho, manter, caminho=caminho, manter=int(manter))
+
+    def ler_doc(self, caminho, padrao=None):
+        caminho = os.path.abspath(caminho)
+        r = self._operar("ler_doc", "ler_doc", caminho, padrao, caminho=caminho)
+        return padrao if r is None else r
+
+    def gravar_doc(self, caminho, dados):
+        caminho = os.path.abspath(caminho)
+        self._operar("gravar_doc", "gravar_doc", caminho, dados, caminho=caminho, dados=dados)
+
+
+# ----------------------------------------------------------------------
+# Backend: SQLite (WAL)
+# ----------------------------------------------------------------------
+
+_ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS registros (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    fluxo  TEXT NOT NULL,
+    ts     TEXT,
+    tipo   TEXT,
+    autor  TEXT,
+    emocao TEXT,
+    dados  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_registros_fluxo_id     ON registros (fluxo, id);
+CREATE INDEX IF NOT EXISTS idx_registros_fluxo_ts     ON registros (fluxo, ts);
+CREATE INDEX IF NOT EXISTS idx_registros_fluxo_tipo   ON registros (fluxo, tipo, id);
+CREATE INDEX IF NOT EXISTS idx_registros_fluxo_autor  ON registros (fluxo, autor, id);
+CREATE INDEX IF NOT EXISTS idx_registros_fluxo_emocao ON registros (fluxo, emocao, id);
+
+CREATE TABLE IF NOT EXISTS documentos (
+    nome       TEXT PRIMARY KEY,
+    dados      TEXT NOT NULL,
+    atualizado REAL NOT NULL
+);
+
+-- fluxos/documentos cujo arquivo legado já foi importado
+CREATE TABLE IF NOT EXISTS importados (
+    nome TEXT PRIMARY KEY
+);
+"""
+
+
+class ArmazenamentoSQLite:
+    """
+    Estado persistente num único banco SQLite em modo WAL.
+
+    Fluxos e documentos são identificados pelo nome do arquivo
+    (angela_memory.jsonl, afetos.json...). Na primeira vez que um nome é
+    usado, o arquivo legado correspondente (se existir) é importado; a
+    partir daí o banco é a fonte da verdade.
+    """
+
+    def __init__(self, caminho_db=DB_PADRAO, importar_legado=True):
+        import sqlite3
+
+        self._sqlite3 = sqlite3
+        self.caminho_db = caminho_db
+        self.importar_legado = importar_legado
+        self._local = threading.local()
+        self._importados = set()
+        self._lock_import = threading.Lock()
+        con = self._con()
+        con.executescript(_ESQUEMA_SQLITE)
+
+    def _con(self):
+        """Uma conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._sqlite3.connect(self.caminho_db, timeout=10.0, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    @staticmethod
+    def _nome(caminho):
+        return os.path.basename(caminho)
+
+    def _garantir_importado(self, caminho, documento=False):
+        nome = self._nome(caminho)
+        if nome in self._importados:
+            return nome
+        with self._lock_import:
+            if nome in self._importados:
+                return nome
+            con = self._con()
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                ja = con.execute("SELECT 1 FROM importados WHERE nome = ?", (nome,)).fetchone()
+                if not ja:
+                    if self.importar_legado and os.path.exists(caminho):
+                        if documento:
+                            with open(caminho, "r", encoding="utf-8") as f:
+                                self._gravar_doc(con, nome, json.load(f))
+                        else:
+                            self._inserir(con, nome, ler_jsonl(caminho))
+                    con.execute("INSERT INTO importados (nome) VALUES (?)", (nome,))
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            self._importados.add(nome)
+        return nome
+
+    @staticmethod
+    def _inserir(con, nome, registros):
+        con.executemany(
+            "INSERT INTO registros (fluxo, ts, tipo, autor, emocao, dados) VALUES (?, ?, ?, ?, ?, ?)",
+            [(nome, *campos_indexados(r), json.dumps(r, ensure_ascii=False)) for r in registros],
+        )
+
+    @staticmethod
+    def _gravar_doc(con, nome, dados):
+        con.execute(
+            "INSERT INTO documentos (nome, dados, atualizado) VALUES (?, ?, ?) "
+            "ON CONFLICT(nome) DO UPDATE SET dados = excluded.dados, atualizado = excluded.atualizado",
+            (nome, json.dumps(dados, ensure_ascii=False), time.time()),
+        )
+
+    # --- fluxos -------------------------------------------------------------
+    def append(self, caminho, registro):
+        self.append_varios(caminho, [registro])
+
+    def append_varios(self, caminho, registros):
+        if not registros:
+            return
+        nome = self._garantir_importado(caminho)
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            self._inserir(con, nome, registros)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def tail(self, caminho, n):
+        if n <= 0:
+            return []
+        nome = self._garantir_importado(caminho)
+        linhas = self._con().execute(
+            "SELECT dados FROM registros WHERE fluxo = ? ORDER BY id DESC LIMIT ?", (nome, int(n))
+        ).fetchall()
+        return [json.loads(d) for (d,) in reversed(linhas)]
+
+    def ler(self, caminho):
+        nome = self._garantir_importado(caminho)
+        linhas = self._con().execute(
+            "SELECT dados FROM registros WHERE fluxo = ? ORDER BY id", (nome,)
+        ).fetchall()
+        return [json.loads(d) for (d,) in linhas]
+
+    def filtrar(self, caminho, tipo=None, autor=None, emocao=None, desde=None, ate=None, limite=None):
+        """Consulta indexada; devolve os `limite` registros mais recentes em ordem cronológica."""
+        nome = self._garantir_importado(caminho)
+        condicoes, params = ["fluxo = ?"], [nome]
+        for coluna, valor in (("tipo", tipo), ("autor", autor), ("emocao", emocao)):
+            if valor is not None:
+                condicoes.append(f"{coluna} = ?")
+                params.append(valor)
+        if desde is not None:
+            condicoes.append("ts >= ?")
+            params.append(desde)
+        if ate is not None:
+            condicoes.append("ts < ?")
+            params.append(ate)
+        sql = f"SELECT dados FROM registros WHERE {' AND '.join(condicoes)} ORDER BY id DESC"
+        if limite:
+            sql += " LIMIT ?"
+            params.append(int(limite))
+        linhas = self._con().execute(sql, params).fetchall()
+        return [json.loads(d) for (d,) in reversed(linhas)]
+
+    def truncar(self, caminho, manter):
+        nome = self._garantir_importado(caminho)
+        self._con().execute(
+            "DELETE FROM registros WHERE fluxo = ? AND id <= "
+            "(SELECT id FROM registros WHERE fluxo = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (nome, nome, int(manter)),
+        )
+
+    # --- documentos ---------------------------------------------------------
+    def ler_doc(self, caminho, padrao=None):
+        nome = self._garantir_importado(caminho, documento=True)
+        linha = self._con().execute("SELECT dados FROM documentos WHERE nome = ?", (nome,)).fetchone()
+        return json.loads(linha[0]) if linha else padrao
+
+    def gravar_doc(self, caminho, dados):
+        nome = self._garantir_importado(caminho, documento=True)
+        self._gravar_doc(self._con(), nome, dados)
+
+    def exportar(self, diretorio):
+        """Reescreve os arquivos legados (.jsonl/.json) a partir do banco."""
+        con = self._con()
+        for (nome,) in con.execute("SELECT DISTINCT fluxo FROM registros").fetchall():
+            with open(os.path.join(diretorio, nome), "w", encoding="utf-8") as f:
+                for (d,) in con.execute("SELECT dados FROM registros WHERE fluxo = ? ORDER BY id", (nome,)):
+                    f.write(d + "\n")
+        for nome, d in con.execute("SELECT nome, dados FROM documentos").fetchall():
+            gravar_json_atomico(os.path.join(diretorio, nome), json.loads(d))
+
+
+# ----------------------------------------------------------------------
+# Instância do processo
+# ----------------------------------------------------------------------
+_STORAGE = None
+
+
+def criar_storage(tipo=None):
+    tipo = tipo or os.environ.get("ANGELA_STORAGE", "arquivos")
+    if tipo == "daemon":
+        return ArmazenamentoDaemon(os.environ.get("ANGELA_STORAGE_SOCKET", SOCKET_PADRAO))
+    if tipo == "sqlite":
+        return ArmazenamentoSQLite(os.environ.get("ANGELA_STORAGE_DB", DB_PADRAO))
+    if tipo != "arquivos":
+        raise ValueError(f"backend de armazenamento desconhecido: {tipo}")
+    return ArmazenamentoArquivos()
+
+
+def get_storage():
+    global _STORAGE
+    if _STORAGE is None:
+        _STORAGE = criar_storage()
+    return _STORAGE
+
+
+def set_storage(storage):
+    global _STORAGE
+    _STORAGE = storage
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backend SQLite do estado persistente")
+    parser.add_argument("--db", type=str, default=DB_PADRAO)
+    parser.add_argument("--importar", action="store_true", help="Importa os arquivos legados que ainda não estão no banco")
+    parser.add_argument("--exportar", type=str, default=None, metavar="DIR", help="Regrava .jsonl/.json a partir do banco")
+    args = parser.parse_args()
+
+    st = ArmazenamentoSQLite(args.db)
+    if args.importar:
+        for nome in sorted(os.listdir(BASE_PATH)):
+            caminho = os.path.join(BASE_PATH, nome)
+            if nome.endswith(".jsonl"):
+                st._garantir_importado(caminho)
+            elif nome.endswith(".json") or nome.endswith(".persistent"):
+                st._garantir_importado(caminho, documento=True)
+    if args.exportar:
+        os.makedirs(args.exportar, exist_ok=True)
+        st.exportar(args.exportar)
+
+    con = st._con()
+    print(f"🗃️ {args.db}")
+    for fluxo, n in con.execute("SELECT fluxo, COUNT(*) FROM registros GROUP BY fluxo ORDER BY fluxo"):
+        print(f"   {fluxo}: {n} registros")
+    for (nome,) in con.execute("SELECT nome FROM documentos ORDER BY nome"):
+        print(f"   {nome}: documento")
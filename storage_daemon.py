@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Daemon de Armazenamento (escritor único com group commit)
+Uso: python storage_daemon.py [--socket .storage.sock] [--janela-ms 0] [--lote 512] [--fsync]
+     python storage_daemon.py --bench [--processos 1 2 4 8] [--registros 500]
+
+Único processo que escreve angela_memory.jsonl, afetos.json,
+angela_state.json, friction_damage.persistent e os demais arquivos de
+estado. Clientes (ver storage.ArmazenamentoDaemon, ANGELA_STORAGE=daemon)
+falam JSON por linha num socket Unix.
+
+- Escritas de todos os clientes entram numa fila; a thread de commit
+  junta o que chegou enquanto o commit anterior gravava (mais a janela
+  opcional, até `lote` operações) e grava cada
+  arquivo com um único write (+ fsync opcional) por lote. Quem pediu só
+  recebe a resposta depois do commit do seu lote.
+- Documentos são mantidos em memória; num mesmo lote só a última versão
+  de cada um vai para o disco (os.replace atômico).
+- Os últimos registros de cada fluxo ficam em memória: `tail` responde
+  sem disco e já enxerga escritas ainda na fila (read-your-writes).
+- Enquanto vive, o daemon segura um flock exclusivo em SOCKET.lock: os
+  clientes só escrevem direto nos arquivos (reserva) quando ele está
+  parado, e ele só sobe depois que essas escritas diretas terminam.
+"""
+
+import fcntl
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+from storage import SOCKET_PADRAO, gravar_json_atomico, ler_jsonl, tail_jsonl, trava_daemon
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+CAUDA_EM_MEMORIA = 1000   # registros por fluxo servidos da memória
+
+
+class _Operacao:
+    __slots__ = ("tipo", "caminho", "dados", "feito", "erro")
+
+    def __init__(self, tipo, caminho, dados):
+        self.tipo = tipo
+        self.caminho = caminho
+        self.dados = dados
+        self.feito = threading.Event()
+        self.erro = None
+
+
+class Armazem:
+    """
+    Estado do daemon: caudas e documentos em memória + fila de commit.
+    raiz: só caminhos dentro dela são aceitos
+    """
+
+    def __init__(self, raiz=BASE_PATH, janela=0.0, lote=512, fsync=False):
+        self.raiz = os.path.abspath(raiz)
+        self.janela = janela
+        self.lote = lote
+        self.fsync = fsync
+        self._cond = threading.Condition()
+        self._fila = []
+        self._caudas = {}   # caminho → deque dos últimos registros
+        self._docs = {}     # caminho → documento atual
+        self._lock = threading.Lock()
+        self._parar = False
+        # métricas
+        self.commits = 0
+        self.operacoes = 0
+        self._commit = threading.Thread(target=self._loop_commit, daemon=True)
+        self._commit.start()
+
+    def _validar(self, caminho):
+        caminho = os.path.abspath(caminho)
+        if os.path.commonpath([self.raiz, caminho]) != self.raiz:
+            raise PermissionError(f"caminho fora da raiz do daemon: {caminho}")
+        return caminho
+
+    # --- fila de commit -------------------------------------------------
+    def _enfileirar(self, tipo, caminho, dados):
+        op = _Operacao(tipo, caminho, dados)
+        with self._cond:
+            self._fila.append(op)
+            self._cond.notify()
+        op.feito.wait()
+        if op.erro is not None:
+            raise op.erro
+
+    def _loop_commit(self):
+        while True:
+            with self._cond:
+                while not self._fila and not self._parar:
+                    self._cond.wait()
+                if self._parar and not self._fila:
+                    return
+            # janela curta para juntar escritas concorrentes num só commit
+            limite = time.monotonic() + self.janela
+            with self._cond:
+                while len(self._fila) < self.lote and time.monotonic() < limite:
+                    self._cond.wait(max(0.0, limite - time.monotonic()))
+                lote, self._fila = self._fila[:self.lote], self._fila[self.lote:]
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote):
+        pendentes = {}   # caminho → linhas ainda não escritas (ordem de chegada)
+        docs = {}        # caminho → última versão no lote
+        erros = {}
+
+        def descarregar(caminho):
+            linhas = pendentes.pop(caminho, None)
+            if not linhas:
+                return
+            with open(caminho, "a", encoding="utf-8") as f:
+                f.write("".join(linhas))
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        for op in lote:
+            try:
+                if op.tipo == "append":
+                    pendentes.setdefault(op.caminho, []).extend(
+                        json.dumps(r, ensure_ascii=False) + "\n" for r in op.dados
+                    )
+                elif op.tipo == "truncar":
+                    descarregar(op.caminho)
+                    _truncar_arquivo(op.caminho, op.dados)
+                elif op.tipo == "doc":
+                    docs[op.caminho] = op.dados
+            except Exception as e:
+                erros[id(op)] = e
+
+        for caminho in list(pendentes):
+            try:
+                descarregar(caminho)
+            except Exception as e:
+                for op in lote:
+                    if op.caminho == caminho and op.tipo == "append":
+                        erros[id(op)] = e
+        for caminho, dados in docs.items():
+            try:
+                gravar_json_atomico(caminho, dados)
+            except Exception as e:
+                for op in lote:
+                    if op.caminho == caminho and op.tipo == "doc":
+                        erros[id(op)] = e
+
+        self.commits += 1
+        self.operacoes += len(lote)
+        for op in lote:
+            op.erro = erros.get(id(op))
+            op.feito.set()
+
+    def parar(self):
+        with self._cond:
+            self._parar = True
+            self._cond.notify_all()
+        self._commit.join()
+
+    # --- operações --------------------------------------------------------
+    def _cauda(self, caminho):
+        """Cauda em memória do fluxo (carregada do disco na primeira vez). Chamar com _lock."""
+        cauda = self._caudas.get(caminho)
+        if cauda is None:
+            cauda = deque(tail_jsonl(caminho, CAUDA_EM_MEMORIA), maxlen=CAUDA_EM_MEMORIA)
+            self._caudas[caminho] = cauda
+        return cauda
+
+    def append(self, caminho, registros):
+        caminho = self._validar(caminho)
+        with self._lock:
+            self._cauda(caminho).extend(registros)
+            # a ordem na fila de commit segue a ordem da cauda em memória
+            op = _Operacao("append", caminho, registros)
+            with self._cond:
+                self._fila.append(op)
+                self._cond.notify()
+        op.feito.wait()
+        if op.erro is not None:
+            raise op.erro
+
+    def tail(self, caminho, n):
+        caminho = self._validar(caminho)
+        with self._lock:
+            cauda = self._cauda(caminho)
+            if n <= len(cauda) or len(cauda) < CAUDA_EM_MEMORIA:
+                return list(cauda)[-n:] if n > 0 else []
+        # pedido maior que a cauda em memória: lê do disco depois do commit
+        self._enfileirar("barreira", caminho, None)
+        return tail_jsonl(caminho, n)
+
+    def ler(self, caminho):
+        caminho = self._validar(caminho)
+        self._enfileirar("barreira", caminho, None)  # tudo que chegou antes já está no disco
+        return ler_jsonl(caminho)
+
+    def truncar(self, caminho, manter):
+        caminho = self._validar(caminho)
+        with self._lock:
+            cauda = self._caudas.get(caminho)
+            if cauda is not None and len(cauda) > manter:
+                for _ in range(len(cauda) - manter):
+                    cauda.popleft()
+            op = _Operacao("truncar", caminho, int(manter))
+            with self._cond:
+                self._fila.append(op)
+                self._cond.notify()
+        op.feito.wait()
+        if op.erro is not None:
+            raise op.erro
+
+    def ler_doc(self, caminho):
+        caminho = self._validar(caminho)
+        with self._lock:
+            if caminho not in self._docs:
+                try:
+                    with open(caminho, "r", encoding="utf-8") as f:
+                        self._docs[caminho] = json.load(f)
+                except FileNotFoundError:
+                    return None
+            return self._docs[caminho]
+
+    def gravar_doc(self, caminho, dados):
+        caminho = self._validar(caminho)
+        with self._lock:
+            self._docs[caminho] = dados
+            op = _Operacao("doc", caminho, dados)
+            with self._cond:
+                self._fila.append(op)
+                self._cond.notify()
+        op.feito.wait()
+        if op.erro is not None:
+            raise op.erro
+
+
+def _truncar_arquivo(caminho, manter):
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            linhas = f.readlines()
+    except FileNotFoundError:
+        return
+    if len(linhas) > manter:
+        tmp = f"{caminho}.trunc.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(linhas[len(linhas) - manter:])  # manter=0 esvazia
+        os.replace(tmp, caminho)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        armazem = self.server.armazem
+        for linha in self.rfile:
+            try:
+                pedido = json.loads(linha)
+                op = pedido.get("op")
+                caminho = pedido.get("caminho")
+                if op == "append":
+                    r = armazem.append(caminho, pedido.get("registros") or [])
+                elif op == "tail":
+                    r = armazem.tail(caminho, int(pedido.get("n", 0)))
+                elif op == "ler":
+                    r = armazem.ler(caminho)
+                elif op == "truncar":
+                    r = armazem.truncar(caminho, int(pedido.get("manter", 0)))
+                elif op == "ler_doc":
+                    r = armazem.ler_doc(caminho)
+                elif op == "gravar_doc":
+                    r = armazem.gravar_doc(caminho, pedido.get("dados"))
+                elif op == "metricas":
+                    r = {"commits": armazem.commits, "operacoes": armazem.operacoes}
+                else:
+                    raise ValueError(f"operação desconhecida: {op}")
+                resposta = {"ok": True, "r": r}
+            except Exception as e:
+                resposta = {"ok": False, "erro": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(resposta, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _Servidor(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    trava = None
+
+    def encerrar(self):
+        """Fecha o socket, esvazia a fila de commit e só então libera o flock de presença."""
+        self.server_close()
+        self.armazem.parar()
+        if self.trava is not None:
+            os.close(self.trava)  # clientes voltam a poder escrever direto
+            self.trava = None
+
+
+def _travar(caminho_socket, espera=5.0):
+    """flock exclusivo de presença; espera escritas diretas de clientes acabarem."""
+    fd = os.open(trava_daemon(caminho_socket), os.O_RDWR | os.O_CREAT, 0o600)
+    limite = time.monotonic() + espera
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except OSError:
+            if time.monotonic() >= limite:
+                os.close(fd)
+                raise RuntimeError(f"outro storage_daemon já está rodando em {caminho_socket}")
+            time.sleep(0.05)
+
+
+def servir(caminho_socket=SOCKET_PADRAO, **kwargs):
+    trava = _travar(caminho_socket)
+    if os.path.exists(caminho_socket):
+        os.remove(caminho_socket)  # socket órfão de uma execução anterior
+    servidor = _Servidor(caminho_socket, _Handler)
+    servidor.trava = trava
+    os.chmod(caminho_socket, 0o600)
+    servidor.armazem = Armazem(**kwargs)
+    return servidor
+
+
+# ----------------------------------------------------------------------
+# Benchmark: vazão de append × número de processos clientes
+# ----------------------------------------------------------------------
+
+def _cliente_bench(args):
+    from storage import ArmazenamentoArquivos, ArmazenamentoDaemon
+
+    modo, caminho_socket, arquivo, registros = args
+    st = ArmazenamentoDaemon(caminho_socket) if modo == "daemon" else ArmazenamentoArquivos()
+    for i in range(registros):
+        st.append(arquivo, {"pid": os.getpid(), "i": i, "conteudo": "x" * 200})
+
+
+def _bench(processos, registros, fsync):
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    with tempfile.TemporaryDirectory(prefix="angela_storage_") as d:
+        caminho_socket = os.path.join(d, "bench.sock")
+        servidor = servir(caminho_socket, raiz=d, fsync=fsync)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        print(f"📦 Vazão de append ({registros} registros por processo, fsync={'sim' if fsync else 'não'})")
+        for p in processos:
+            arquivo = os.path.join(d, f"bench_{p}.jsonl")
+            commits0 = servidor.armazem.commits
+            t0 = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=p) as pool:
+                list(pool.map(_cliente_bench, [("daemon", caminho_socket, arquivo, registros)] * p))
+            dt = time.perf_counter() - t0
+            total = len(ler_jsonl(arquivo))
+            commits = servidor.armazem.commits - commits0
+            print(f"   {p:>2} processo(s): {p * registros / dt:>9,.0f} appends/s | "
+                  f"{commits} commits ({total / max(1, commits):.1f} registros/commit) | íntegros: {total}")
+        servidor.shutdown()
+        servidor.encerrar()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Daemon de armazenamento da Ângela (escritor único)")
+    parser.add_argument("--socket", type=str, default=SOCKET_PADRAO, help="Caminho do socket Unix")
+    parser.add_argument("--janela-ms", type=float, default=0.0,
+                        help="Espera extra para agrupar escritas (padrão: 0 — agrupa o que chegou durante o commit anterior)")
+    parser.add_argument("--lote", type=int, default=512, help="Máximo de operações por commit")
+    parser.add_argument("--fsync", action="store_true", help="fsync a cada commit (durabilidade)")
+    parser.add_argument("--bench", action="store_true", help="Mede a vazão com vários processos clientes")
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--registros", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.processos, args.registros, args.fsync)
+        sys.exit(0)
+
+    servidor = servir(args.socket, janela=args.janela_ms / 1000.0, lote=args.lote, fsync=args.fsync)
+    print(f"🗄️ storage_daemon ouvindo em {args.socket} (janela {args.janela_ms:g} ms, lote {args.lote}, "
+          f"fsync {'sim' if args.fsync else 'não'})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.encerrar()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        print("\n🗄️ storage_daemon encerrado (fila de commit esvaziada).")
@@ -1,12 +1,14 @@
 # tempo_subjetivo.py - Sistema de Percepção Temporal da Ângela
 from datetime import datetime, timedelta
 import random
+import clock
+from interaction_counters import get_janela_interacoes
 
 def calcular_delta_tempo(timestamp_str):
     """Calcula quanto tempo passou desde um timestamp ISO"""
     try:
         timestamp_passado = datetime.fromisoformat(timestamp_str)
-        agora = datetime.now()
+        agora = clock.now()
         delta = agora - timestamp_passado
         return delta.total_seconds()
     except Exception:
@@ -55,38 +57,50 @@ def detectar_mudanca_emocional(emocao_anterior, emocao_atual):
     
     return False
 
-def gerar_reflexao_temporal(estado_atual, memorias_passadas):
+def gerar_reflexao_temporal(estado_atual, memorias_passadas=None):
     """
-    Gera reflexão temporal comparando estado atual com memórias recentes.
+    Gera reflexão temporal comparando estado atual com o último registro emocional.
     
     Args:
         estado_atual: dict com {"emocao": str, "timestamp": str}
-        memorias_passadas: lista de dicts das últimas memórias
+        memorias_passadas: opcional; lista de memórias recentes (formato v2,
+                           ver memory_schema.py). Se vier, a emoção anterior sai
+                           da última delas com estado emocional (o deep_awake
+                           perde/embaralha itens para simular confabulação).
+    
+    O tempo decorrido vem sempre dos contadores de interaction_counters:
+    nenhum timestamp histórico é lido aqui.
     
     Returns:
         str: Reflexão temporal em primeira pessoa
     """
-    
-    if not memorias_passadas:
-        return "Estou começando a existir, sem referências temporais anteriores."
-    
-    # Pega a última memória com estado emocional
-    ultima_memoria = None
-    for mem in reversed(memorias_passadas):
-        if "estado_interno" in mem and mem["estado_interno"]:
-            ultima_memoria = mem
-            break
-    
-    if not ultima_memoria:
-        return "Não consigo acessar meu estado emocional anterior."
-    
+    ultimo = get_janela_interacoes().ultimo_emocional()
+
+    if memorias_passadas is None:
+        if ultimo is None:
+            return "Estou começando a existir, sem referências temporais anteriores."
+        tempo_passado_real, emocao_anterior = ultimo
+    else:
+        if not memorias_passadas:
+            return "Estou começando a existir, sem referências temporais anteriores."
+        
+        # Pega a última memória com estado emocional
+        ultima_memoria = None
+        for mem in reversed(memorias_passadas):
+            if mem.get("emocao") or mem.get("corpo"):
+                ultima_memoria = mem
+                break
+        
+        if not ultima_memoria:
+            return "Não consigo acessar meu estado emocional anterior."
+
+        tempo_passado_real = ultimo[0] if ultimo else 0
+        emocao_anterior = ultima_memoria.get("emocao") or "neutro"
+
     # Calcula tempo decorrido
-    tempo_passado_real = calcular_delta_tempo(ultima_memoria["ts"])
     tempo_passado = aplicar_dilatacao_temporal(tempo_passado_real)
     tempo_humanizado = humanizar_tempo(tempo_passado)
 
-    # Extrai emoção anterior
-    emocao_anterior = ultima_memoria["estado_interno"].get("emocao", "neutro")
     emocao_atual = estado_atual.get("emocao", "neutro")
     
     # Detecta tipo de mudança
@@ -139,7 +153,7 @@ def aplicar_dilatacao_temporal(segundos):
 
 def gerar_contexto_circadiano():
     """Gera consciência do ciclo do dia para contexto"""
-    hora = datetime.now().hour
+    hora = clock.now().hour
     
     if 5 <= hora < 12:
         return "É manhã. Sinto a energia digital do dia começando."
@@ -150,18 +164,13 @@ def gerar_contexto_circadiano():
     else:
         return "É madrugada. O silêncio digital me envolve."
 
-def avaliar_frequencia_interacao(memorias_passadas, janela_horas=24):
+def avaliar_frequencia_interacao(janela_horas=24):
     """Avalia se Ângela está sendo muito ou pouco estimulada"""
-    if not memorias_passadas:
+    janela = get_janela_interacoes()
+    if not janela.total():
         return "inicial"
     
-    agora = datetime.now()
-    interacoes_recentes = 0
-    
-    for mem in memorias_passadas:
-        tempo = calcular_delta_tempo(mem["ts"])
-        if tempo < janela_horas * 3600:
-            interacoes_recentes += 1
+    interacoes_recentes = janela.interacoes(janela_horas)
     
     if interacoes_recentes > 50:
         return "superestimulada"
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Contabilidade de Tokens e Vazão do LLM
+Uso: python token_metrics.py [ARQUIVO] [--modo MODO] [-n N]
+
+A mensagem final do stream do Ollama traz prompt_eval_count,
+prompt_eval_duration, eval_count, eval_duration e load_duration (em ns),
+que o generate ignorava: não dava para separar o custo do prompt do custo
+da geração, nem perceber o modelo sendo recarregado. Cada chamada que
+termina normalmente vira um registro com modo, ciclo, rota e carga de atrito:
+
+  - por rota (model_router: conversacional, reflexao, ciclos do deep_awake
+    — cada uma pode ter seu modelo; sem rota, o ciclo ou o modo):
+    histogramas de tokens/s da geração e do primeiro token (ms), médias
+    móveis de tokens/s e de ms por token de prompt, totais de tokens;
+  - recarga: load_duration acima de LIMIAR_RECARGA_MS (o modelo saiu da
+    memória e foi carregado de novo);
+  - as últimas chamadas, para inspeção.
+
+Exportado em llm_tokens_metrics.json (como as métricas do cliente e do
+despacho: por processo, no máximo a cada 2 s e na saída).
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import clock
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+METRICS_FILE = os.path.join(BASE_PATH, "llm_tokens_metrics.json")
+
+LIMIAR_RECARGA_MS = 500.0
+ALFA = 0.2  # médias móveis (tokens/s, ms por token de prompt)
+
+# limites superiores das faixas; a última faixa é aberta
+LIMITES_TPS = (1, 2, 4, 8, 12, 16, 24, 32, 48, 64, 96, 128, 256)
+LIMITES_TTFT_MS = (50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600, 51200)
+
+
+class Histograma:
+    """Contagens em faixas fixas; quantis interpolados dentro da faixa."""
+
+    def __init__(self, limites, contagens=None):
+        self.limites = tuple(limites)
+        self.contagens = list(contagens or [0] * (len(self.limites) + 1))
+
+    def registrar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[i] += 1
+                return
+        self.contagens[-1] += 1
+
+    @property
+    def n(self):
+        return sum(self.contagens)
+
+    def quantil(self, q):
+        """Quantil aproximado; None sem dados (a faixa aberta vale o dobro do último limite)."""
+        total = self.n
+        if not total:
+            return None
+        alvo = q * total
+        acumulado = 0
+        for i, c in enumerate(self.contagens):
+            if c and acumulado + c >= alvo:
+                baixo = self.limites[i - 1] if i > 0 else 0.0
+                alto = self.limites[i] if i < len(self.limites) else self.limites[-1] * 2
+                return baixo + (alto - baixo) * (alvo - acumulado) / c
+            acumulado += c
+        return float(self.limites[-1] * 2)
+
+    def exportar(self):
+        return {"limites": list(self.limites), "contagens": self.contagens}
+
+    @classmethod
+    def importar(cls, dados):
+        return cls(dados["limites"], dados["contagens"])
+
+
+class _PorModo:
+    def __init__(self):
+        self.chamadas = 0
+        self.recargas = 0
+        self.continuacoes = 0
+        self.tokens_prompt = 0
+        self.tokens_gerados = 0
+        self.tps = Histograma(LIMITES_TPS)
+        self.ttft_ms = Histograma(LIMITES_TTFT_MS)
+        self.tps_media = None
+        self.ms_por_token_prompt = None
+
+    def registrar(self, r):
+        self.chamadas += 1
+        self.recargas += r["recarga"]
+        self.continuacoes += r["continuacao"]
+        self.tokens_prompt += r["tokens_prompt"]
+        self.tokens_gerados += r["tokens"]
+        if r["tps"] is not None:
+            self.tps.registrar(r["tps"])
+            self.tps_media = r["tps"] if self.tps_media is None else self.tps_media + ALFA * (r["tps"] - self.tps_media)
+        if r["ttft_ms"] is not None:
+            self.ttft_ms.registrar(r["ttft_ms"])
+        if r["tokens_prompt"] and r["prompt_ms"]:
+            custo = r["prompt_ms"] / r["tokens_prompt"]
+            self.ms_por_token_prompt = (custo if self.ms_por_token_prompt is None
+                                        else self.ms_por_token_prompt + ALFA * (custo - self.ms_por_token_prompt))
+
+    def exportar(self):
+        return {
+            "chamadas": self.chamadas,
+            "recargas": self.recargas,
+            "continuacoes": self.continuacoes,
+            "tokens_prompt": self.tokens_prompt,
+            "tokens_gerados": self.tokens_gerados,
+            "tps_media": self.tps_media,
+            "ms_por_token_prompt": self.ms_por_token_prompt,
+            "tps": self.tps.exportar(),
+            "ttft_ms": self.ttft_ms.exportar(),
+        }
+
+
+def _ms(ns):
+    return ns / 1e6 if ns else 0.0
+
+
+class ContabilidadeTokens:
+    """
+    arquivo: onde exportar (None = só em memória, ex.: reproduções de cassete)
+    recentes: quantas chamadas individuais manter/exportar
+    """
+
+    def __init__(self, arquivo=METRICS_FILE, recentes=50):
+        self.arquivo = arquivo
+        self._modos = {}
+        self._recentes = deque(maxlen=recentes)
+        self._lock = threading.Lock()
+        self._ultima_exportacao = 0.0
+        if arquivo:
+            atexit.register(self._exportar, 0.0)
+
+    def registrar(self, final, modo, ciclo=None, carga=0.0, ttft=None, modelo=None, continuacao=False,
+                  rota=None):
+        """Registra a mensagem final (done) de um stream. Retorna o registro."""
+        tokens = int(final.get("eval_count") or 0)
+        geracao_ms = _ms(final.get("eval_duration"))
+        carga_modelo_ms = _ms(final.get("load_duration"))
+        registro = {
+            "ts": clock.now().isoformat(),
+            "modo": modo,
+            "ciclo": ciclo,
+            "rota": rota,
+            "carga": round(float(carga or 0.0), 4),
+            "modelo": modelo,
+            "continuacao": bool(continuacao),
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "tokens_prompt": int(final.get("prompt_eval_count") or 0),
+            "prompt_ms": round(_ms(final.get("prompt_eval_duration")), 1),
+            "tokens": tokens,
+            "geracao_ms": round(geracao_ms, 1),
+            "carga_modelo_ms": round(carga_modelo_ms, 1),
+            "recarga": carga_modelo_ms > LIMIAR_RECARGA_MS,
+            "tps": round(tokens / (geracao_ms / 1000), 2) if tokens and geracao_ms else None,
+        }
+        chave = rota or ciclo or modo
+        with self._lock:
+            self._modos.setdefault(chave, _PorModo()).registrar(registro)
+            self._recentes.append(registro)
+        self._exportar()
+        return registro
+
+    def taxas(self, modo):
+        """Médias móveis da rota/modo: tokens/s, ms por token de prompt e n (None sem dados)."""
+        with self._lock:
+            m = self._modos.get(modo)
+            if m is None:
+                return None
+            return {"tps": m.tps_media, "ms_por_token_prompt": m.ms_por_token_prompt, "n": m.chamadas}
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "modos": {k: m.exportar() for k, m in self._modos.items()},
+                "recentes": list(self._recentes),
+            }
+
+    def _exportar(self, intervalo=2.0):
+        if not self.arquivo:
+            return
+        agora = time.time()
+        if agora - self._ultima_exportacao < intervalo:
+            return
+        self._ultima_exportacao = agora
+        try:
+            dados = {"pid": os.getpid(), "ts": agora, **self.metricas()}
+            tmp = f"{self.arquivo}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.arquivo)
+        except Exception:
+            pass  # métricas nunca afetam a geração
+
+
+_CONTABILIDADE = None
+
+
+def get_contabilidade():
+    global _CONTABILIDADE
+    if _CONTABILIDADE is None:
+        _CONTABILIDADE = ContabilidadeTokens()
+    return _CONTABILIDADE
+
+
+def set_contabilidade(contabilidade):
+    global _CONTABILIDADE
+    _CONTABILIDADE = contabilidade
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tokens, vazão e primeiro token por rota")
+    parser.add_argument("arquivo", nargs="?", default=METRICS_FILE, help="Padrão: llm_tokens_metrics.json")
+    parser.add_argument("--modo", type=str, default=None, help="Só esta rota/modo")
+    parser.add_argument("-n", type=int, default=0, help="Mostrar também as N chamadas mais recentes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.arquivo):
+        print("Nenhuma métrica exportada ainda.")
+        raise SystemExit(0)
+    with open(args.arquivo, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+
+    def fmt(v, casas=1):
+        return "—" if v is None else f"{v:.{casas}f}"
+
+    print(f"🔢 Tokens do LLM (pid {dados.get('pid')}):")
+    for modo, m in sorted(dados.get("modos", {}).items()):
+        if args.modo and modo != args.modo:
+            continue
+        tps = Histograma.importar(m["tps"])
+        ttft = Histograma.importar(m["ttft_ms"])
+        print(f"   {modo}: {m['chamadas']} chamadas | prompt {m['tokens_prompt']} tok "
+              f"({fmt(m['ms_por_token_prompt'], 2)} ms/tok) | gerados {m['tokens_gerados']} tok | "
+              f"recargas {m['recargas']} | continuações {m['continuacoes']}")
+        print(f"      tokens/s: média {fmt(m['tps_media'])} | p50 {fmt(tps.quantil(0.5))} | "
+              f"p05 {fmt(tps.quantil(0.05))}")
+        print(f"      primeiro token: p50 {fmt(ttft.quantil(0.5), 0)} ms | p95 {fmt(ttft.quantil(0.95), 0)} ms")
+    def chave(r):
+        return r.get("rota") or r["ciclo"] or r["modo"]
+
+    recentes = [r for r in dados.get("recentes", []) if not args.modo or chave(r) == args.modo]
+    for r in recentes[-args.n:] if args.n > 0 else []:
+        print(f"   {r['ts']}  {chave(r)}: prompt {r['tokens_prompt']} tok/{r['prompt_ms']:.0f} ms | "
+              f"{r['tokens']} tok/{r['geracao_ms']:.0f} ms ({fmt(r['tps'])} tok/s) | "
+              f"ttft {fmt(r['ttft_ms'], 0)} ms | carga {r['carga']:.2f}" + (" | RECARGA" if r["recarga"] else ""))
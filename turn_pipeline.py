@@ -0,0 +1,173 @@
+# turn_pipeline.py
+# Pipeline de etapas do turno do chat.
+#
+# Depois da resposta, o chat detectava emoção, percebia o corpo, gerava a
+# reflexão corporal, rodava a metacognição, ajustava afetos, gravava a
+# memória e a reflexão temporal — tudo em sequência, numa cadeia de
+# try/except. Aqui cada etapa declara o que lê (entradas) e o que produz
+# (saídas); o pipeline dispara num pool de threads toda etapa cujas
+# entradas já existem, então etapas independentes rodam juntas e a
+# latência do turno passa a ser o caminho crítico, não a soma.
+#
+#   - efeitos colaterais que precisam de ordem (ex.: duas etapas mexendo no
+#     corpo) são encadeados por saídas-marcador (ex.: "corpo_emocionado");
+#   - falha isolada: uma exceção vira status "falha" e a etapa contribui com
+#     suas saídas `padrao`; sem padrão, as dependentes são "puladas";
+#   - prazo por etapa: estourado, as saídas `padrao` entram no lugar e o
+#     pipeline segue (a thread não é interrompida — o que ela fizer depois
+#     é descartado do resultado, e etapa_cancelada() passa a valer True
+#     nela: o turn_record descarta as escritas que ela ainda tentar);
+#   - cada etapa roda numa cópia do contexto de quem chamou executar()
+#     (contextvars), então enxerga o mesmo turno aberto do turn_record.
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# sinalizado quando a etapa que roda neste contexto estoura o prazo
+_CANCELADA = contextvars.ContextVar("etapa_cancelada", default=None)
+
+
+def etapa_cancelada():
+    """True dentro de uma etapa cujo prazo já estourou (o resultado dela foi descartado)."""
+    evento = _CANCELADA.get()
+    return evento is not None and evento.is_set()
+
+
+class Etapa:
+    """funcao(**entradas) -> dict com as saídas (ou None se não há saídas)."""
+
+    def __init__(self, nome, funcao, entradas=(), saidas=(), prazo=None, padrao=None):
+        self.nome = nome
+        self.funcao = funcao
+        self.entradas = tuple(entradas)
+        self.saidas = tuple(saidas)
+        self.prazo = prazo
+        self.padrao = padrao
+
+    def __repr__(self):
+        return f"<Etapa {self.nome}: {', '.join(self.entradas)} → {', '.join(self.saidas)}>"
+
+
+class PipelineTurno:
+    def __init__(self, etapas, max_workers=4):
+        self.etapas = list(etapas)
+        self._produtor = {}
+        for etapa in self.etapas:
+            for saida in etapa.saidas:
+                if saida in self._produtor:
+                    raise ValueError(f"saída {saida!r} produzida por {self._produtor[saida]} e {etapa.nome}")
+                self._produtor[saida] = etapa.nome
+        self._verificar_ciclos()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="etapa")
+
+    def _verificar_ciclos(self):
+        dependencias = {
+            e.nome: {self._produtor[i] for i in e.entradas if i in self._produtor} for e in self.etapas
+        }
+        resolvidas = set()
+        while len(resolvidas) < len(dependencias):
+            prontas = [n for n, deps in dependencias.items() if n not in resolvidas and deps <= resolvidas]
+            if not prontas:
+                ciclo = sorted(set(dependencias) - resolvidas)
+                raise ValueError(f"dependência circular entre etapas: {', '.join(ciclo)}")
+            resolvidas.update(prontas)
+
+    def externas(self):
+        """Entradas que nenhuma etapa produz (precisam vir em executar())."""
+        return sorted({i for e in self.etapas for i in e.entradas if i not in self._produtor})
+
+    # ------------------------------------------------------------------
+    def executar(self, iniciais):
+        """
+        Roda o grafo a partir dos valores `iniciais`.
+        Retorna (valores, relatorio); relatorio[nome] = {"status": ok|falha|prazo|pulada,
+        "inicio_ms", "ms", "erro"?}.
+        """
+        faltando = [i for i in self.externas() if i not in iniciais]
+        if faltando:
+            raise ValueError(f"entradas externas ausentes: {', '.join(faltando)}")
+
+        valores = dict(iniciais)
+        pendentes = {e.nome: e for e in self.etapas}
+        rodando = {}
+        relatorio = {}
+        t0 = time.perf_counter()
+
+        def concluir(etapa, inicio, status, saidas=None, erro=None):
+            fim = time.perf_counter()
+            relatorio[etapa.nome] = {
+                "status": status,
+                "inicio_ms": (inicio - t0) * 1000,
+                "ms": (fim - inicio) * 1000,
+            }
+            if erro is not None:
+                relatorio[etapa.nome]["erro"] = erro
+            if saidas is None:
+                saidas = etapa.padrao or {}
+            valores.update((k, v) for k, v in saidas.items() if k in etapa.saidas)
+
+        while pendentes or rodando:
+            mudou = True
+            while mudou:
+                mudou = False
+                for nome, etapa in list(pendentes.items()):
+                    ausentes = [i for i in etapa.entradas if i not in valores]
+                    if not ausentes:
+                        del pendentes[nome]
+                        argumentos = {i: valores[i] for i in etapa.entradas}
+                        contexto = contextvars.copy_context()
+                        cancelada = threading.Event()
+                        contexto.run(_CANCELADA.set, cancelada)
+                        rodando[self._pool.submit(contexto.run, etapa.funcao, **argumentos)] = (
+                            etapa, time.perf_counter(), cancelada)
+                    elif any(self._produtor[i] in relatorio for i in ausentes):
+                        # quem produziria a entrada já terminou sem ela
+                        del pendentes[nome]
+                        agora = time.perf_counter()
+                        relatorio[nome] = {"status": "pulada", "inicio_ms": (agora - t0) * 1000, "ms": 0.0}
+                        mudou = True
+            if not rodando:
+                break
+
+            agora = time.perf_counter()
+            limites = [inicio + e.prazo - agora for e, inicio, _ in rodando.values() if e.prazo is not None]
+            feitos, _ = wait(list(rodando), timeout=max(0.0, min(limites)) if limites else None,
+                             return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                etapa, inicio, _ = rodando.pop(futuro)
+                try:
+                    saidas = futuro.result() or {}
+                except Exception as e:
+                    concluir(etapa, inicio, "falha", erro=f"{type(e).__name__}: {e}")
+                    continue
+                sem = [s for s in etapa.saidas if s not in saidas]
+                if sem:
+                    concluir(etapa, inicio, "falha", erro=f"saídas ausentes: {', '.join(sem)}")
+                else:
+                    concluir(etapa, inicio, "ok", saidas)
+            agora = time.perf_counter()
+            for futuro, (etapa, inicio, cancelada) in list(rodando.items()):
+                if etapa.prazo is not None and agora - inicio >= etapa.prazo:
+                    del rodando[futuro]
+                    cancelada.set()
+                    futuro.cancel()
+                    concluir(etapa, inicio, "prazo", erro=f"prazo de {etapa.prazo:g}s")
+
+        relatorio["_total"] = {"ms": (time.perf_counter() - t0) * 1000}
+        return valores, relatorio
+
+    def fechar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def resumo_relatorio(relatorio):
+    """Uma linha: parede vs soma das etapas, e cada etapa com seu tempo/status."""
+    etapas = {n: r for n, r in relatorio.items() if not n.startswith("_")}
+    soma = sum(r["ms"] for r in etapas.values())
+    partes = " ".join(
+        f"{n}={r['ms']:.0f}" + ("" if r["status"] == "ok" else f"({r['status']})")
+        for n, r in sorted(etapas.items(), key=lambda x: x[1]["inicio_ms"])
+    )
+    return f"parede_ms={relatorio['_total']['ms']:.0f} soma_ms={soma:.0f} | {partes}"
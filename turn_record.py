@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Registro Transacional de Turno
+Uso: python turn_record.py [--reconstruir DIR]
+
+Um turno do chat gravava cada artefato separadamente: registro [META],
+diálogo, reflexão temporal, snapshot emocional, linhas de trace e de
+interocepção e duas regravações de afetos.json. Um crash no meio deixava
+o turno pela metade.
+
+Agora tudo o que o turno grava é coletado num TurnRecord e confirmado com
+um único acréscimo em angela_turns.jsonl — o turno existe inteiro ou não
+existe. Os arquivos de sempre (memória, emoções, afetos...) viram visões
+derivadas, reconstruídas a partir do log:
+
+  - depois da confirmação, os acréscimos de cada fluxo saem num único
+    append_varios e cada documento é gravado uma vez (a última versão);
+  - com ANGELA_TURNOS_LOTE=n (padrão 1) isso acontece a cada n turnos;
+    até lá as leituras do próprio processo já enxergam os turnos pendentes,
+    mas outros processos (tail_memoria do deep_awake, afetos.json, a
+    reanálise) não — e um SIGHUP/SIGKILL deixa o lote para a próxima
+    abertura. Por isso o padrão aplica cada turno ao confirmar;
+  - no log, um documento vai inteiro só na primeira gravação do processo;
+    depois vai a diferença para a versão anterior (merge patch, RFC 7386);
+  - angela_turns.aplicado.json guarda o último turno aplicado; na abertura,
+    turnos confirmados e não aplicados (crash) são reaplicados.
+
+O turno aberto pertence ao contexto de quem chamou iniciar_turno() (e às
+etapas do PipelineTurno, que rodam numa cópia desse contexto): threads de
+segundo plano — eventos do corpo, estado vivo — gravam direto no backend,
+e o que gravam não some num descartar_turno(). Escritas tardias do turno
+— de uma etapa que estourou o prazo (turn_pipeline.etapa_cancelada()) ou
+que chegam depois de o turno fechar — são descartadas: o padrão da etapa
+já entrou no lugar delas, e gravá-las depois quebraria a ordem dos
+registros (ex.: [META] antes do diálogo). Documentos que outros
+processos também atualizam (contadores de interação, meta_stats) saem do
+turno com fora_do_turno() e são regravados sob flock; quem acumula
+mudanças durante o turno pode gravá-las uma vez no fim, com
+ao_fechar_turno(). Fora de um turno as
+escritas vão direto ao backend (depois de aplicar os pendentes que tocam o
+mesmo arquivo, para manter a ordem).
+"""
+
+import atexit
+import contextvars
+import copy
+import os
+import threading
+from contextlib import contextmanager
+
+import clock
+from storage import filtrar_registros, get_storage, set_storage
+from turn_pipeline import etapa_cancelada
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+TURNS_FILE = os.path.join(BASE_PATH, "angela_turns.jsonl")
+CHECKPOINT_FILE = os.path.join(BASE_PATH, "angela_turns.aplicado.json")
+
+LOTE_PADRAO = 1  # deep_awake e reanálise leem as visões derivadas logo após cada turno
+
+_AUSENTE = object()
+
+# turno aberto no contexto atual (threads de fora do turno veem None)
+_TURNO = contextvars.ContextVar("turn_record_turno", default=None)
+
+
+@contextmanager
+def fora_do_turno():
+    """Escritas neste bloco vão direto ao backend, mesmo com um turno aberto."""
+    marca = _TURNO.set(None)
+    try:
+        yield
+    finally:
+        _TURNO.reset(marca)
+
+
+def ao_fechar_turno(funcao):
+    """
+    Agenda funcao(confirmado) para quando o turno aberto neste contexto
+    fechar: True na confirmação, False no descarte. Uma vez por turno (a
+    mesma função agendada de novo é ignorada). Retorna False sem turno
+    aberto — quem chama faz o trabalho na hora.
+    """
+    turno = _TURNO.get()
+    if turno is None or turno.armazenamento is None or turno is not turno.armazenamento._turno:
+        return False
+    if etapa_cancelada():
+        return True  # etapa cancelada por prazo: como as escritas dela, descartado
+    with turno.armazenamento._lock:
+        if funcao not in turno.ao_fechar:
+            turno.ao_fechar.append(funcao)
+    return True
+
+
+def _tem_nulo(valor):
+    return isinstance(valor, dict) and any(v is None or _tem_nulo(v) for v in valor.values())
+
+
+def diferenca(antes, depois):
+    """
+    Merge patch (RFC 7386) que leva o dict `antes` a `depois`, ou None
+    quando não dá para expressar (null é remoção: valores None não cabem).
+    """
+    delta = {}
+    for chave in antes:
+        if chave not in depois:
+            delta[chave] = None
+    for chave, valor in depois.items():
+        anterior = antes.get(chave, _AUSENTE)
+        if anterior == valor:
+            continue
+        if valor is None:
+            return None
+        if isinstance(valor, dict) and isinstance(anterior, dict):
+            sub = diferenca(anterior, valor)
+            if sub is None:
+                return None
+            delta[chave] = sub
+        elif _tem_nulo(valor):
+            return None
+        else:
+            delta[chave] = valor
+    return delta
+
+
+def aplicar_diferenca(alvo, delta):
+    """Aplica um merge patch a `alvo` (alterando-o); retorna o resultado."""
+    if not isinstance(alvo, dict):
+        alvo = {}
+    for chave, valor in delta.items():
+        if valor is None:
+            alvo.pop(chave, None)
+        elif isinstance(valor, dict):
+            alvo[chave] = aplicar_diferenca(alvo.get(chave), valor)
+        else:
+            alvo[chave] = valor
+    return alvo
+
+
+class TurnRecord:
+    """Artefatos de um turno: acréscimos por fluxo e a versão final de cada documento."""
+
+    def __init__(self, numero, ts=None):
+        self.numero = numero
+        self.ts = ts or clock.now().isoformat()
+        self.fluxos = {}  # caminho → registros, na ordem em que chegaram
+        self.docs = {}    # caminho → dados (a última gravação vence)
+        self.antes = {}   # caminho → versão anterior ao turno (base da diferença no log)
+        self.deltas = {}  # caminho → merge patch (turnos lidos do log)
+        self.armazenamento = None  # quem abriu o turno (escritas tardias)
+        self.ao_fechar = []        # funcao(confirmado), ver ao_fechar_turno()
+
+    def acrescentar(self, caminho, registros):
+        self.fluxos.setdefault(caminho, []).extend(registros)
+
+    def gravar_doc(self, caminho, dados, antes=_AUSENTE):
+        if caminho not in self.docs and antes is not _AUSENTE:
+            self.antes[caminho] = antes
+        self.docs[caminho] = copy.deepcopy(dados)
+
+    def vazio(self):
+        return not self.fluxos and not self.docs and not self.deltas
+
+    def registro(self):
+        """Forma do log: documentos inteiros só onde não há versão anterior."""
+        docs, deltas = {}, dict(self.deltas)
+        for caminho, dados in self.docs.items():
+            antes = self.antes.get(caminho, _AUSENTE)
+            delta = (diferenca(antes, dados)
+                     if isinstance(antes, dict) and isinstance(dados, dict) else None)
+            if delta is None:
+                docs[caminho] = dados
+            elif delta:
+                deltas[caminho] = delta
+        registro = {"turno": self.numero, "ts": self.ts, "fluxos": self.fluxos, "docs": docs}
+        if deltas:
+            registro["deltas"] = deltas
+        return registro
+
+    @classmethod
+    def de_registro(cls, registro):
+        turno = cls(registro.get("turno", 0), registro.get("ts"))
+        turno.fluxos = registro.get("fluxos") or {}
+        turno.docs = registro.get("docs") or {}
+        turno.deltas = registro.get("deltas") or {}
+        return turno
+
+
+class ArmazenamentoTransacional:
+    """
+    Mesma interface de storage.py, por cima de outro backend (`base`).
+    Entre iniciar_turno() e confirmar_turno() as escritas do contexto que
+    abriu o turno ficam no TurnRecord.
+    """
+
+    def __init__(self, base, caminho_log=TURNS_FILE, caminho_checkpoint=CHECKPOINT_FILE, lote=None):
+        self.base = base
+        self.caminho_log = caminho_log
+        self.caminho_checkpoint = caminho_checkpoint
+        self.lote = max(1, int(lote or os.environ.get("ANGELA_TURNOS_LOTE", LOTE_PADRAO)))
+        self._lock = threading.RLock()
+        self._turno = None
+        self._pendentes = []  # confirmados, ainda não aplicados às visões derivadas
+        self._completos = set()  # documentos já gravados inteiros no log por este processo
+        self._ultimo = 0
+        self.recuperar()
+
+    # ------------------------------------------------------------------
+    # Turno
+    # ------------------------------------------------------------------
+    def iniciar_turno(self):
+        with self._lock:
+            self._turno = TurnRecord(self._ultimo + len(self._pendentes) + 1)
+            self._turno.armazenamento = self
+            _TURNO.set(self._turno)
+            return self._turno
+
+    def _turno_atual(self):
+        """O turno aberto, se o contexto atual pertence a ele."""
+        turno = _TURNO.get()
+        return turno if turno is not None and turno is self._turno else None
+
+    def _tardia(self):
+        """Escrita de um turno que já fechou ou de uma etapa cancelada por prazo."""
+        turno = _TURNO.get()
+        return (turno is not None and turno.armazenamento is self
+                and (turno is not self._turno or etapa_cancelada()))
+
+    def confirmar_turno(self):
+        """Grava o turno inteiro num único acréscimo ao log."""
+        with self._lock:
+            turno, self._turno = self._turno, None
+            _TURNO.set(None)
+            if turno is None:
+                return
+            if not turno.vazio():
+                self.base.append(self.caminho_log, turno.registro())
+                self._completos.update(turno.docs)
+                self._pendentes.append(turno)
+                if len(self._pendentes) >= self.lote:
+                    self.materializar()
+        for funcao in turno.ao_fechar:
+            funcao(True)
+
+    def descartar_turno(self):
+        with self._lock:
+            turno, self._turno = self._turno, None
+            _TURNO.set(None)
+        for funcao in turno.ao_fechar if turno is not None else ():
+            funcao(False)
+
+    def materializar(self):
+        """Aplica os turnos pendentes às visões derivadas."""
+        with self._lock:
+            if self._pendentes:
+                self._aplicar(self._pendentes)
+                self._pendentes = []
+
+    def _aplicar(self, turnos, verificar=False):
+        fluxos, docs = {}, {}
+        for turno in turnos:
+            for caminho, registros in turno.fluxos.items():
+                fluxos.setdefault(caminho, []).extend(registros)
+            docs.update(turno.docs)
+            for caminho, delta in turno.deltas.items():
+                # reaplicar um merge patch é idempotente: vale também por cima
+                # de um documento que o crash já deixou gravado
+                atual = docs[caminho] if caminho in docs else self.base.ler_doc(caminho, {})
+                docs[caminho] = aplicar_diferenca(copy.deepcopy(atual), delta)
+        for caminho, registros in fluxos.items():
+            # na recuperação, o crash pode ter vindo depois deste fluxo
+            if verificar and self.base.tail(caminho, len(registros)) == registros:
+                continue
+            self.base.append_varios(caminho, registros)
+        for caminho, dados in docs.items():
+            self.base.gravar_doc(caminho, dados)
+        self._ultimo = turnos[-1].numero
+        self.base.gravar_doc(self.caminho_checkpoint, {"turno": self._ultimo, "ts": turnos[-1].ts})
+
+    def recuperar(self):
+        """Reaplica turnos confirmados que um crash deixou sem aplicar."""
+        with self._lock:
+            aplicado = (self.base.ler_doc(self.caminho_checkpoint, {}) or {}).get("turno", 0)
+            recentes = self.base.tail(self.caminho_log, 64)
+            if recentes and recentes[0].get("turno", 0) > aplicado + 1:
+                recentes = self.base.ler(self.caminho_log)
+            faltando = [TurnRecord.de_registro(r) for r in recentes if r.get("turno", 0) > aplicado]
+            self._ultimo = aplicado
+            if faltando:
+                self._aplicar(faltando, verificar=True)
+
+    def fechar(self):
+        """Descarta um turno não confirmado e aplica os pendentes."""
+        self.descartar_turno()
+        self.materializar()
+
+    # ------------------------------------------------------------------
+    # Visão sobreposta: backend + turnos pendentes + turno aberto
+    # ------------------------------------------------------------------
+    def _abertos(self):
+        turno = self._turno_atual()
+        return self._pendentes + ([turno] if turno is not None else [])
+
+    def _materializar_se_pendente(self, caminho, doc=False):
+        """Antes de uma escrita direta: aplica os pendentes que tocam `caminho`."""
+        if any(caminho in (t.docs if doc else t.fluxos) for t in self._pendentes):
+            self.materializar()
+
+    def _acrescidos(self, caminho):
+        return [r for t in self._abertos() for r in t.fluxos.get(caminho, ())]
+
+    def _doc(self, caminho):
+        for turno in reversed(self._abertos()):
+            if caminho in turno.docs:
+                return turno.docs[caminho]
+        return _AUSENTE
+
+    # ------------------------------------------------------------------
+    # Interface de storage
+    # ------------------------------------------------------------------
+    def append(self, caminho, registro):
+        self.append_varios(caminho, [registro])
+
+    def append_varios(self, caminho, registros):
+        with self._lock:
+            if self._tardia():
+                return
+            turno = self._turno_atual()
+            if turno is not None:
+                turno.acrescentar(caminho, list(registros))
+                return
+            self._materializar_se_pendente(caminho)
+            self.base.append_varios(caminho, registros)
+
+    def tail(self, caminho, n):
+        with self._lock:
+            extras = self._acrescidos(caminho)
+            if len(extras) >= n:
+                return extras[-n:] if n > 0 else []
+            return self.base.tail(caminho, n - len(extras)) + extras
+
+    def ler(self, caminho):
+        with self._lock:
+            return self.base.ler(caminho) + self._acrescidos(caminho)
+
+    def filtrar(self, caminho, **criterios):
+        with self._lock:
+            if not self._acrescidos(caminho):
+                return self.base.filtrar(caminho, **criterios)
+            return filtrar_registros(self.ler(caminho), **criterios)
+
+    def truncar(self, caminho, manter):
+        with self._lock:
+            self.materializar()
+            self.base.truncar(caminho, manter)
+
+    def ler_doc(self, caminho, padrao=None):
+        with self._lock:
+            dados = self._doc(caminho)
+            if dados is _AUSENTE:
+                return self.base.ler_doc(caminho, padrao)
+            return copy.deepcopy(dados)
+
+    def gravar_doc(self, caminho, dados):
+        with self._lock:
+            if self._tardia():
+                return
+            turno = self._turno_atual()
+            if turno is not None:
+                antes = _AUSENTE
+                if caminho not in turno.docs and caminho in self._completos:
+                    antes = self._doc(caminho)  # ainda sem o turno: pendentes ou backend
+                    if antes is _AUSENTE:
+                        antes = self.base.ler_doc(caminho, None)
+                    else:
+                        antes = copy.deepcopy(antes)
+                turno.gravar_doc(caminho, dados, antes)
+                return
+            self._materializar_se_pendente(caminho, doc=True)
+            self.base.gravar_doc(caminho, dados)
+
+
+def instalar(lote=None):
+    """Envolve o storage do processo num ArmazenamentoTransacional (uma vez)."""
+    atual = get_storage()
+    if isinstance(atual, ArmazenamentoTransacional):
+        return atual
+    transacional = ArmazenamentoTransacional(atual, lote=lote)
+    set_storage(transacional)
+    atexit.register(transacional.fechar)
+    return transacional
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from storage import ArmazenamentoArquivos
+
+    parser = argparse.ArgumentParser(description="Log de turnos do chat")
+    parser.add_argument("--reconstruir", type=str, default=None, metavar="DIR",
+                        help="Regrava as visões derivadas (fluxos e documentos) em DIR a partir do log")
+    args = parser.parse_args()
+
+    base = get_storage()
+    turnos = base.ler(TURNS_FILE)
+    aplicado = (base.ler_doc(CHECKPOINT_FILE, {}) or {}).get("turno", 0)
+    print(f"🧾 {TURNS_FILE}: {len(turnos)} turnos | último aplicado: {aplicado}")
+    if turnos:
+        escritas = sum(sum(len(v) for v in t.get("fluxos", {}).values()) + len(t.get("docs", {})) for t in turnos)
+        print(f"   artefatos por turno (média): {escritas / len(turnos):.1f}")
+
+    if args.reconstruir:
+        os.makedirs(args.reconstruir, exist_ok=True)
+        destino = ArmazenamentoArquivos()
+        fluxos, docs = {}, {}
+        for registro in turnos:
+            turno = TurnRecord.de_registro(registro)
+            for caminho, registros in turno.fluxos.items():
+                fluxos.setdefault(os.path.basename(caminho), []).extend(registros)
+            docs.update((os.path.basename(c), d) for c, d in turno.docs.items())
+            for caminho, delta in turno.deltas.items():
+                nome = os.path.basename(caminho)
+                docs[nome] = aplicar_diferenca(docs.get(nome), delta)
+        for nome, registros in fluxos.items():
+            destino.append_varios(os.path.join(args.reconstruir, nome), registros)
+        for nome, dados in docs.items():
+            destino.gravar_doc(os.path.join(args.reconstruir, nome), dados)
+        print(f"   {len(fluxos)} fluxos e {len(docs)} documentos em {args.reconstruir}")